@@ -3,6 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 from db.supabase import db
 from utils.embeds import GameEmbeds
+from utils.autocomplete import country_autocomplete
 from config import ADMIN_ROLE_IDS
 from utils.helpers import GameHelpers
 import asyncio
@@ -62,8 +63,7 @@ class AdminCog(commands.Cog):
                     await interaction.response.send_message(embed=GameEmbeds.error_embed(f"Joueur {target_user.mention} introuvable."), ephemeral=True)
                     return
                 
-                new_balance = (target_player.get('balance', 0) or 0) + amount
-                await db.update_player(target_player['discord_id'], {'balance': new_balance})
+                updated = await db.bulk_add_player_balance(amount, [target_player['id']])
             elif target_type in ['country', 'all_countries']:
                 if resource not in ['money','food','metal','oil','energy','materials']:
                     await interaction.response.send_message(embed=GameEmbeds.error_embed("Ressource invalide pour un pays."), ephemeral=True)
@@ -82,30 +82,23 @@ class AdminCog(commands.Cog):
                     if not country:
                         await interaction.response.send_message(embed=GameEmbeds.error_embed("Pays introuvable."), ephemeral=True)
                         return
-                    res = country.get('resources', {}).copy()
-                    res[resource] = (res.get(resource, 0) or 0) + amount
-                    await db.update_country(country['id'], {'resources': res})
+                    updated = await db.bulk_add_country_resource(resource, amount, [country['id']])
                 else:
-                    countries = await db.get_all_countries()
-                    for c in countries:
-                        res = c.get('resources', {}).copy()
-                        res[resource] = (res.get(resource, 0) or 0) + amount
-                        await db.update_country(c['id'], {'resources': res})
+                    # Une seule requête pour tous les pays
+                    updated = await db.bulk_add_country_resource(resource, amount)
             elif target_type == 'all_players':
                 if resource not in ['balance','money']:
                     await interaction.response.send_message(embed=GameEmbeds.error_embed("Ressource invalide pour joueurs."), ephemeral=True)
                     return
-                players_result = db.supabase.table('players').select('discord_id,balance').execute()
-                for p in (players_result.data or []):
-                    new_balance = (p.get('balance', 0) or 0) + amount
-                    await db.update_player(p['discord_id'], {'balance': new_balance})
+                # Une seule requête pour tous les joueurs
+                updated = await db.bulk_add_player_balance(amount)
             else:
                 await interaction.response.send_message(embed=GameEmbeds.error_embed("target_type invalide."), ephemeral=True)
                 return
             
             # Embed amélioré
             target_name = target_user.mention if target_user else target_type
-            embed = discord.Embed(title="🎁 Don effectué", description=f"{amount} {resource} → {target_name} ({target_type})", color=0x00ff00)
+            embed = discord.Embed(title="🎁 Don effectué", description=f"{amount} {resource} → {target_name} ({target_type})\n{updated} ligne(s) modifiée(s)", color=0x00ff00)
             await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(embed=GameEmbeds.error_embed("Erreur lors du don."), ephemeral=True)
@@ -139,26 +132,9 @@ class AdminCog(commands.Cog):
         
         # Créer le pays sans leader (sera assigné avec /own)
         try:
-            result = db.supabase.table('countries').insert({
-                'name': country_name.strip(),
-                'leader_id': None,
-                'population': 1000000,
-                'economy': 50,
-                'army_strength': 20,
-                'resources': {
-                    'money': 5000,
-                    'food': 200,
-                    'metal': 50,
-                    'oil': 80,
-                    'energy': 100,
-                    'materials': 30
-                },
-                'stability': 80,
-                'is_locked': False
-            }).execute()
+            country = await db.create_country(country_name.strip())
             
-            if result.data:
-                country = result.data[0]
+            if country:
                 embed = discord.Embed(
                     title="🏳️ Pays Créé",
                     description=f"Le pays '{country_name}' a été créé avec succès !",
@@ -198,6 +174,7 @@ class AdminCog(commands.Cog):
         country_name="Nom du pays à assigner",
         user="Utilisateur à qui assigner le pays"
     )
+    @app_commands.autocomplete(country_name=country_autocomplete)
     async def assign_country(self, interaction: discord.Interaction, country_name: str, user: discord.Member):
         """Assigner un pays à un joueur (Admin seulement)"""
         if not await self.is_admin(interaction):
@@ -416,8 +393,7 @@ class CountryDeleteSelect(discord.ui.Select):
         active_wars = await db.get_active_wars(country['id'])
         
         # Récupérer les joueurs du pays
-        players_result = db.supabase.table('players').select('username, role').eq('country_id', country['id']).execute()
-        players = players_result.data if players_result.data else []
+        players = await db.get_country_players(country['id'], 'username, role')
         
         embed = discord.Embed(
             title=f"🗑️ Suppression - {country['name']}",
@@ -562,10 +538,7 @@ class DeleteElementsSelect(discord.ui.Select):
     async def delete_players(self, interaction: discord.Interaction):
         """Expulser tous les joueurs"""
         # Mettre à jour tous les joueurs du pays
-        db.supabase.table('players').update({
-            'country_id': None,
-            'role': 'recruit'
-        }).eq('country_id', self.country['id']).execute()
+        await db.expel_country_players(self.country['id'])
         
         # Supprimer le leader du pays
         await db.update_country(self.country['id'], {
@@ -582,10 +555,7 @@ class DeleteElementsSelect(discord.ui.Select):
     async def delete_wars(self, interaction: discord.Interaction):
         """Terminer toutes les guerres"""
         # Terminer toutes les guerres actives
-        db.supabase.table('wars').update({
-            'ended_at': 'now()',
-            'summary': 'Terminée par un administrateur'
-        }).or_(f'attacker_id.eq.{self.country["id"]},defender_id.eq.{self.country["id"]}').is_('ended_at', 'null').execute()
+        await db.end_country_wars(self.country['id'], 'Terminée par un administrateur')
         
         embed = discord.Embed(
             title="⚔️ Guerres Terminées",
@@ -645,14 +615,8 @@ class ConfirmDeleteView(discord.ui.View):
             )
             return
         
-        # Expulser tous les joueurs
-        db.supabase.table('players').update({
-            'country_id': None,
-            'role': 'recruit'
-        }).eq('country_id', self.country['id']).execute()
-        
-        # Supprimer le pays
-        db.supabase.table('countries').delete().eq('id', self.country['id']).execute()
+        # Expulser tous les joueurs puis supprimer le pays
+        await db.delete_country(self.country['id'])
         
         embed = discord.Embed(
             title="🏳️ Pays Supprimé",
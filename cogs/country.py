@@ -3,6 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 from db.supabase import db
 from utils.embeds import GameEmbeds
+from utils.autocomplete import country_autocomplete
 from utils.helpers import GameHelpers
 from config import GAME_CONFIG
 import asyncio
@@ -13,6 +14,7 @@ class CountryCog(commands.Cog):
     
     @app_commands.command(name="pays", description="Consulter les informations d'un pays")
     @app_commands.describe(country_name="Nom du pays (optionnel, affiche votre pays par défaut)")
+    @app_commands.autocomplete(country_name=country_autocomplete)
     async def country_info(self, interaction: discord.Interaction, country_name: str = None):
         """Consulter les informations d'un pays"""
         if country_name:
@@ -3,6 +3,7 @@ from discord.ext import commands
 from discord import app_commands
 from db.supabase import db
 from utils.embeds import GameEmbeds
+from utils.autocomplete import country_autocomplete
 from utils.helpers import GameHelpers
 from config import GAME_CONFIG
 import asyncio
@@ -23,6 +24,7 @@ class DiplomacyCog(commands.Cog):
         app_commands.Choice(name="Quitter", value="leave"),
         app_commands.Choice(name="Liste", value="list")
     ])
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def alliance(self, interaction: discord.Interaction, action: str, name: str = None, target_country: str = None):
         """Gérer les alliances"""
         # Vérifier le joueur
@@ -164,6 +166,7 @@ class DiplomacyCog(commands.Cog):
         target_country="Pays avec lequel négocier",
         proposal="Votre proposition"
     )
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def negotiate(self, interaction: discord.Interaction, target_country: str, proposal: str):
         """Négocier avec un autre pays"""
         # Vérifier le joueur
@@ -229,6 +232,7 @@ class DiplomacyCog(commands.Cog):
     
     @app_commands.command(name="embargo", description="Mettre un embargo sur un pays")
     @app_commands.describe(target_country="Pays à mettre sous embargo")
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def embargo(self, interaction: discord.Interaction, target_country: str):
         """Mettre un embargo sur un pays"""
         # Vérifier le joueur
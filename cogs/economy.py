@@ -1,10 +1,11 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from db.supabase import db
+from db.supabase import db, OutcomeUnknownError
 from utils.embeds import GameEmbeds
+from utils.autocomplete import country_autocomplete
 from utils.helpers import GameHelpers
-from utils.ai_helper_gemini import generate_element_details
+from utils.ai_helper_gemini import generate_element_details_async, generate_economic_analysis_async
 from config import GAME_CONFIG
 import asyncio
 
@@ -90,13 +91,20 @@ class EconomyCog(commands.Cog):
             )
             return
         
-        # Effectuer la production
-        resources = country.get('resources', {}).copy()
-        resources['energy'] -= energy_cost
-        resources[resource] = resources.get(resource, 0) + amount
-        
-        # Mettre à jour le pays
-        await db.update_country(country['id'], {'resources': resources})
+        # Effectuer la production (delta atomique, refusé si l'énergie a été consommée entre-temps)
+        deltas = {'energy': -energy_cost}
+        deltas[resource] = deltas.get(resource, 0) + amount
+        try:
+            resources = await db.apply_resource_delta(country['id'], deltas)
+        except OutcomeUnknownError as e:
+            await interaction.response.send_message(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+            return
+        if resources is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Pas assez d'énergie pour cette production."),
+                ephemeral=True
+            )
+            return
         # Log transaction
         if GAME_CONFIG.get('economy_rules', {}).get('transaction_log_enabled'):
             await db.log_transaction({
@@ -136,6 +144,7 @@ class EconomyCog(commands.Cog):
         app_commands.Choice(name="⚡ Énergie", value="energy"),
         app_commands.Choice(name="🧱 Matériaux", value="materials")
     ])
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def trade(self, interaction: discord.Interaction, target_country: str, 
                    give_resource: str, give_amount: int, receive_resource: str, receive_amount: int):
         """Échanger des ressources"""
@@ -214,24 +223,14 @@ class EconomyCog(commands.Cog):
         fee_percent = rules.get('trade_fee_percent', 2)
         fee = GameHelpers.apply_trade_fee(give_amount, fee_percent)
 
-        # Effectuer l'échange
-        my_resources[give_resource] -= give_amount
-        my_resources[receive_resource] = my_resources.get(receive_resource, 0) + receive_amount
-        
-        target_resources[receive_resource] -= receive_amount
-        target_resources[give_resource] = target_resources.get(give_resource, 0) + give_amount
-        
-        # Appliquer frais (déduit de l'argent du pays initiateur si applicable)
-        if give_resource == 'money' and fee > 0:
-            my_resources['money'] = max(0, my_resources.get('money', 0) - fee)
-
-        # Mettre à jour les pays
-        await db.update_country(my_country['id'], {'resources': my_resources})
-        await db.update_country(target_country_data['id'], {'resources': target_resources})
-
-        # Log transaction
+        # Effectuer l'échange : débit, crédit, frais et journal en une seule transaction serveur
+        deltas = {give_resource: give_amount}
+        deltas[receive_resource] = deltas.get(receive_resource, 0) - receive_amount
+        # Frais déduits de l'argent du pays initiateur si applicable
+        trade_fee = fee if give_resource == 'money' else 0
+        tx = None
         if GAME_CONFIG.get('economy_rules', {}).get('transaction_log_enabled'):
-            await db.log_transaction({
+            tx = {
                 'type': 'trade',
                 'player_id': player.get('id'),
                 'country_id': my_country['id'],
@@ -240,7 +239,18 @@ class EconomyCog(commands.Cog):
                 'receive': {receive_resource: receive_amount},
                 'fee': fee,
                 'value': trade_value
-            })
+            }
+        try:
+            transfer = await db.transfer(my_country['id'], target_country_data['id'], deltas, fee=trade_fee, tx=tx)
+        except OutcomeUnknownError as e:
+            await interaction.response.send_message(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+            return
+        if transfer is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Échange refusé : ressources insuffisantes de l'une des deux parties."),
+                ephemeral=True
+            )
+            return
         
         embed = discord.Embed(
             title="🤝 Échange Commercial",
@@ -299,19 +309,18 @@ class EconomyCog(commands.Cog):
         
         # Calculer l'impact sur la satisfaction
         satisfaction_impact = GameHelpers.calculate_tax_satisfaction_impact(tax_rate)
-        new_stability = max(0, min(100, country.get('stability', 0) + satisfaction_impact))
+        current = await db.get_country(country['id'], fresh=True) or country
+        new_stability = max(0, min(100, current.get('stability', 0) + satisfaction_impact))
         
         # Calculer les revenus fiscaux
         tax_revenue = GameHelpers.calculate_tax_revenue(country.get('population', 0), tax_rate)
         
         # Mettre à jour le pays
-        resources = country.get('resources', {}).copy()
-        resources['money'] = resources.get('money', 0) + tax_revenue
-        
-        await db.update_country(country['id'], {
-            'stability': new_stability,
-            'resources': resources
-        })
+        try:
+            await db.apply_resource_delta(country['id'], {'money': tax_revenue})
+        except OutcomeUnknownError as e:
+            print(f"Erreur revenus fiscaux: {e}")
+        await db.update_country(country['id'], {'stability': new_stability})
         
         embed = discord.Embed(
             title="💰 Impôts Fixés",
@@ -398,10 +407,10 @@ class EconomyCog(commands.Cog):
             inline=True
         )
         
-        # NOUVEAU : Analyse IA
+        # NOUVEAU : Analyse IA (hors de la boucle, peut dépasser le délai de réponse de 3 s)
+        await interaction.response.defer()
         try:
-            from utils.ai_helper_gemini import generate_economic_analysis
-            ai_analysis = generate_economic_analysis(country)
+            ai_analysis = await generate_economic_analysis_async(country)
             
             embed.add_field(
                 name="🤖 Analyse IA",
@@ -411,7 +420,7 @@ class EconomyCog(commands.Cog):
         except Exception as e:
             print(f"Erreur génération analyse IA: {e}")
         
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
     
     @app_commands.command(name="travail", description="Travailler pour gagner de l'argent personnel")
     async def work(self, interaction: discord.Interaction):
@@ -490,16 +499,22 @@ class EconomyCog(commands.Cog):
         tax_amount = int(salary * tax_rate)
         net_salary = salary - tax_amount
         
-        # Mettre à jour le solde du joueur avec le salaire NET
-        new_balance = player.get('balance', 0) + net_salary
-        await db.update_player(str(interaction.user.id), {'balance': new_balance, 'last_work_time': current_time.isoformat()})
+        # Créditer le salaire NET (delta atomique : un don du panel entre-temps n'est pas écrasé)
+        updated_player = await db.add_player_balance(player, net_salary, {'last_work_time': current_time.isoformat()})
+        if updated_player is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Erreur lors du versement du salaire."),
+                ephemeral=True
+            )
+            return
+        new_balance = updated_player.get('balance', 0)
         
         # NOUVEAU : Ajouter la taxe à la banque du pays
-        country = await db.get_country(player['country_id'])
-        if country:
-            country_resources = country.get('resources', {})
-            country_resources['money'] = country_resources.get('money', 0) + tax_amount
-            await db.update_country(country['id'], {'resources': country_resources})
+        if player.get('country_id') and tax_amount:
+            try:
+                await db.apply_resource_delta(player['country_id'], {'money': tax_amount})
+            except OutcomeUnknownError as e:
+                print(f"Erreur taxe sur salaire: {e}")
 
         # Log transaction
         if GAME_CONFIG.get('economy_rules', {}).get('transaction_log_enabled'):
@@ -591,7 +606,7 @@ class EconomyCog(commands.Cog):
                 'resources': country.get('resources', {})
             }
             
-            element_details = generate_element_details(element_type, element_name, context)
+            element_details = await generate_element_details_async(element_type, element_name, context)
             
             # Vérifier si le pays a les ressources nécessaires
             country_resources = country.get('resources', {})
@@ -627,7 +642,7 @@ class EconomyCog(commands.Cog):
                     return
             
             # Déduire le coût
-            country_resources['money'] = country_resources.get('money', 0) - cost
+            deltas = {'money': -cost}
             
             # Déduire les matériaux de base (10 de chaque)
             for material in required_materials:
@@ -639,10 +654,20 @@ class EconomyCog(commands.Cog):
                     'food': 'food'
                 }
                 resource_key = material_map.get(material.lower(), 'materials')
-                country_resources[resource_key] = max(0, country_resources.get(resource_key, 0) - 10)
+                deltas[resource_key] = deltas.get(resource_key, 0) - 10
             
-            # Mettre à jour le pays
-            await db.update_country(country['id'], {'resources': country_resources})
+            # Mettre à jour le pays (atomique : refusé si les soldes ont changé entre-temps)
+            try:
+                resources = await db.apply_resource_delta(country['id'], deltas)
+            except OutcomeUnknownError as e:
+                await interaction.followup.send(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+                return
+            if resources is None:
+                await interaction.followup.send(
+                    embed=GameEmbeds.error_embed("Ressources insuffisantes pour cette construction."),
+                    ephemeral=True
+                )
+                return
             
             # Créer l'élément dans la DB
             element_db = await db.create_element(element_details, player['id'], country['id'])
@@ -709,16 +734,17 @@ class EconomyCog(commands.Cog):
                         inline=False
                     )
             
-            # Appliquer les effets au pays
+            # Appliquer les effets au pays (valeurs relues : le panel a pu le modifier)
+            current = await db.get_country(country['id'], fresh=True) or country
             updates = {}
             if effects.get('economy'):
-                new_economy = max(0, min(100, country.get('economy', 50) + effects['economy']))
+                new_economy = max(0, min(100, current.get('economy', 50) + effects['economy']))
                 updates['economy'] = new_economy
             if effects.get('stability'):
-                new_stability = max(0, min(100, country.get('stability', 80) + effects['stability']))
+                new_stability = max(0, min(100, current.get('stability', 80) + effects['stability']))
                 updates['stability'] = new_stability
             if effects.get('army_strength'):
-                new_army = max(0, min(100, country.get('army_strength', 20) + effects['army_strength']))
+                new_army = max(0, min(100, current.get('army_strength', 20) + effects['army_strength']))
                 updates['army_strength'] = new_army
             
             if updates:
@@ -5,20 +5,42 @@ from db.supabase import db
 from utils.embeds import GameEmbeds
 from utils.helpers import GameHelpers
 from utils.logger import logger
+from config import DB_BACKUP_INTERVAL
 import asyncio
 import random
+import time
 from datetime import datetime, timedelta
 
 class EventsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.last_tick_stats = {}
         self.event_task = asyncio.create_task(self.event_loop())
+        self.backup_task = asyncio.create_task(self.backup_loop()) if DB_BACKUP_INTERVAL > 0 else None
         logger.info("Système d'événements démarré")
 
     async def cog_unload(self):
         if self.event_task:
             self.event_task.cancel()
             logger.info("Système d'événements arrêté")
+        if self.backup_task:
+            self.backup_task.cancel()
+
+    async def backup_loop(self):
+        """Sauvegarde incrémentale périodique (complète tous les DB_BACKUP_FULL_EVERY deltas)"""
+        while True:
+            try:
+                await asyncio.sleep(DB_BACKUP_INTERVAL)
+                entry = await db.backup()
+                if entry:
+                    logger.info(
+                        f"Sauvegarde {entry['kind']} {entry['file']}: {entry['rows']} lignes, "
+                        f"{entry['deleted']} suppressions, {entry['bytes']} octets en {entry['ms']} ms"
+                    )
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Erreur dans la boucle de sauvegarde: {e}")
 
     async def event_loop(self):
         while True:
@@ -51,6 +73,8 @@ class EventsCog(commands.Cog):
         effects = event.get('effects', {})
         if not effects:
             return
+        # Valeurs relues : le panel a pu modifier le pays depuis la mise en cache
+        country = await db.get_country(country['id'], fresh=True) or country
         updates = {}
         for stat, change in effects.items():
             if stat == 'economy':
@@ -66,21 +90,20 @@ class EventsCog(commands.Cog):
             await db.update_country(country['id'], updates)
 
     async def save_event(self, country: dict, event: dict):
-        try:
-            db.supabase.table('events').insert({
-                'type': event['type'],
-                'description': f"{event['name']} - {event['description']}",
-                'target_country': country['id'],
-                'impact': event.get('effects', {}),
-                'created_at': datetime.utcnow().isoformat()
-            }).execute()
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde événement: {e}")
+        saved = await db.create_event({
+            'type': event['type'],
+            'description': f"{event['name']} - {event['description']}",
+            'target_country': country['id'],
+            'impact': event.get('effects', {}),
+            'created_at': datetime.utcnow().isoformat()
+        })
+        if not saved:
+            logger.error(f"Erreur sauvegarde événement pour {country['id']}")
 
     async def notify_country_players(self, country: dict, event: dict):
         try:
-            players_result = db.supabase.table('players').select('discord_id').eq('country_id', country['id']).execute()
-            if not players_result.data:
+            players = await db.get_country_players(country['id'], 'discord_id')
+            if not players:
                 return
             embed = discord.Embed(
                 title=f"📢 Événement dans {country['name']}",
@@ -103,7 +126,7 @@ class EventsCog(commands.Cog):
                     value=effects_text,
                     inline=False
                 )
-            for player in players_result.data:
+            for player in players:
                 try:
                     user = self.bot.get_user(int(player['discord_id']))
                     if user:
@@ -123,8 +146,8 @@ class EventsCog(commands.Cog):
             )
             return
         try:
-            events_result = db.supabase.table('events').select('*').eq('target_country', player['country_id']).order('created_at', desc=True).limit(5).execute()
-            if not events_result.data:
+            events = await db.get_country_events(player['country_id'], limit=5)
+            if not events:
                 await interaction.response.send_message(
                     embed=GameEmbeds.error_embed("Aucun événement récent trouvé."),
                     ephemeral=True
@@ -134,7 +157,7 @@ class EventsCog(commands.Cog):
                 title="📢 Événements Récents",
                 color=0x0099ff
             )
-            for event in events_result.data:
+            for event in events:
                 event_type_emoji = {
                     'economic': '💰',
                     'crisis': '⚠️',
@@ -158,33 +181,49 @@ class EventsCog(commands.Cog):
     async def apply_economic_tick(self):
         try:
             from config import GAME_CONFIG
+            from utils.economy_tick import compute_economic_tick
+            started = time.perf_counter()
             rules = GAME_CONFIG.get('economy_rules', {})
-            inflation = rules.get('inflation_percent_daily', 0)
-            interest = rules.get('interest_percent_daily', 0)
-            maintenance_per = rules.get('army_maintenance_per_strength', 0)
             countries = await db.get_all_countries()
             if not countries:
                 return
-            for c in countries:
-                resources = c.get('resources', {}) or {}
-                money = resources.get('money', 0) or 0
-                if interest > 0 and money > 0:
-                    gain = int(money * interest / 100)
-                    money += gain
-                if inflation > 0 and money > 0:
-                    loss = int(money * inflation / 100)
-                    money = max(0, money - loss)
-                maintenance_cost = max(0, int((c.get('army_strength', 0) or 0) * maintenance_per))
-                money = max(0, money - maintenance_cost)
-                resources['money'] = money
-                await db.update_country(c['id'], {'resources': resources})
-                await db.log_transaction({
+            loaded = time.perf_counter()
+
+            # Calcul vectoriel pour tout le monde en un passage
+            tick = compute_economic_tick(countries, rules)
+            computed = time.perf_counter()
+
+            # Persistance : un appel groupé pour les soldes + une insertion groupée du journal
+            deltas = {
+                c['id']: {'money': int(delta)}
+                for c, delta in zip(countries, tick['delta']) if delta
+            }
+            updated = await db.apply_resource_deltas_bulk(deltas)
+            await db.insert_transactions([
+                {
                     'type': 'tick',
                     'country_id': c['id'],
-                    'amount': -maintenance_cost,
+                    'amount': -int(maintenance),
                     'value': 0,
                     'fee': 0
-                })
+                }
+                for c, maintenance in zip(countries, tick['maintenance'])
+            ])
+            finished = time.perf_counter()
+
+            self.last_tick_stats = {
+                'countries': len(countries),
+                'updated': updated,
+                'load_ms': round((loaded - started) * 1000, 2),
+                'compute_ms': round((computed - loaded) * 1000, 2),
+                'persist_ms': round((finished - computed) * 1000, 2),
+                'total_ms': round((finished - started) * 1000, 2),
+                'at': datetime.utcnow().isoformat()
+            }
+            logger.info(
+                f"Tick économique: {updated}/{len(countries)} pays mis à jour en "
+                f"{self.last_tick_stats['total_ms']:.0f} ms (calcul {self.last_tick_stats['compute_ms']:.1f} ms)"
+            )
         except Exception as e:
             logger.error(f"Erreur tick économique: {e}")
 
@@ -1,9 +1,12 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from db.supabase import db
+from db.supabase import db, OutcomeUnknownError
 from utils.embeds import GameEmbeds
+from utils.autocomplete import country_autocomplete
 from utils.helpers import GameHelpers
+from utils.combat import CombatEngine, combat_engine
+from utils.war_simulation import DEFAULT_TRIALS, MAX_TRIALS, simulate_war
 from config import GAME_CONFIG
 import asyncio
 import random
@@ -11,6 +14,8 @@ import random
 class MilitaryCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Récits IA en cours (référence gardée jusqu'à la fin de la tâche)
+        self._narrative_tasks = set()
     
     @app_commands.command(name="armée", description="Consulter les forces armées de votre pays")
     async def army(self, interaction: discord.Interaction):
@@ -41,16 +46,11 @@ class MilitaryCog(commands.Cog):
             )
             return
         
-        # Simuler des unités militaires basées sur la force militaire
+        # Unités déduites de la force militaire et des ressources (mêmes que pour les combats)
         army_strength = country.get('army_strength', 0)
-        resources = country.get('resources', {})
-        
-        # Calculer les unités disponibles
-        soldiers = min(army_strength * 10, resources.get('money', 0) // 100)
-        vehicles = min(army_strength * 2, resources.get('metal', 0) // 50)
-        aircraft = min(army_strength, resources.get('materials', 0) // 20)
-        missiles = min(army_strength // 2, resources.get('materials', 0) // 50)
-        navy = min(army_strength // 3, resources.get('materials', 0) // 30)
+        units = CombatEngine.army_units(country)
+        soldiers, vehicles, aircraft = units['soldiers'], units['vehicles'], units['aircraft']
+        missiles, navy = units['missiles'], units['navy']
         
         embed = discord.Embed(
             title=f"🪖 Forces Armées de {country['name']}",
@@ -108,6 +108,7 @@ class MilitaryCog(commands.Cog):
     
     @app_commands.command(name="attaquer", description="Attaquer un autre pays (Chef d'État seulement)")
     @app_commands.describe(target_country="Pays à attaquer")
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def attack(self, interaction: discord.Interaction, target_country: str):
         """Attaquer un autre pays"""
         # Vérifier le joueur
@@ -156,7 +157,7 @@ class MilitaryCog(commands.Cog):
         
         # Vérifier les ressources pour la guerre
         attacker_resources = attacker_country.get('resources', {})
-        war_cost = 1000  # Coût minimum pour déclarer la guerre
+        war_cost = GAME_CONFIG['war_rules']['declaration_cost']
         
         if attacker_resources.get('money', 0) < war_cost:
             await interaction.response.send_message(
@@ -165,94 +166,86 @@ class MilitaryCog(commands.Cog):
             )
             return
         
+        # Déduire le coût de la guerre (atomique, refusé si le solde a changé entre-temps)
+        try:
+            resources = await db.apply_resource_delta(attacker_country['id'], {'money': -war_cost})
+        except OutcomeUnknownError as e:
+            await interaction.response.send_message(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+            return
+        if resources is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed(f"Pas assez d'argent pour déclarer la guerre. Nécessaire: {war_cost:,} 💵"),
+                ephemeral=True
+            )
+            return
+        
         # Créer la guerre
         war = await db.create_war(attacker_country['id'], defender_country['id'])
         if not war:
+            try:
+                await db.apply_resource_delta(attacker_country['id'], {'money': war_cost})
+            except OutcomeUnknownError as e:
+                print(f"Erreur remboursement guerre: {e}")
             await interaction.response.send_message(
                 embed=GameEmbeds.error_embed("Erreur lors de la création de la guerre."),
                 ephemeral=True
             )
             return
         
-        # Déduire le coût de la guerre
-        attacker_resources['money'] -= war_cost
-        await db.update_country(attacker_country['id'], {'resources': attacker_resources})
-        
-        # NOUVEAU : Calculer avec l'IA les dégâts de guerre (missiles)
-        from utils.ai_helper_gemini import calculate_war_damages
-        war_result = calculate_war_damages(attacker_country, defender_country)
+        # Résolution locale (moteur de combat, reproductible avec la graine) ; la réponse
+        # est différée pour les écritures en base qui suivent
+        await interaction.response.defer(thinking=True)
+        war_result = combat_engine.resolve(attacker_country, defender_country)
         
         # Appliquer les dégâts selon le gagnant
         if war_result['winner'] == 'attacker':
-            # Attaquant gagne - NOUVEAU SYSTÈME
-            defender_resources = defender_country.get('resources', {}).copy()
-            defender_population = defender_country.get('population', 0)
-            
-            damage = war_result['damage_percentage']
-            defender_population = max(0, defender_population - war_result['population_loss'])
-            defender_resources['money'] = max(0, defender_resources.get('money', 0) - war_result['gold_stolen'])
-            defender_resources['food'] = max(0, defender_resources.get('food', 0) - war_result['resources_stolen'].get('food', 0))
-            defender_resources['metal'] = max(0, defender_resources.get('metal', 0) - war_result['resources_stolen'].get('metal', 0))
-            
-            defender_army = max(0, defender_country.get('army_strength', 0) - damage // 2)
-            defender_stability = max(0, defender_country.get('stability', 0) - damage)
-            defender_economy = max(0, defender_country.get('economy', 0) - damage // 3)
-            
-            await db.update_country(defender_country['id'], {
-                'resources': defender_resources,
-                'population': defender_population,
-                'army_strength': defender_army,
-                'stability': defender_stability,
-                'economy': defender_economy
-            })
-            
-            attacker_resources['money'] += war_result['gold_stolen']
-            attacker_resources['food'] += war_result['resources_stolen'].get('food', 0)
-            attacker_resources['metal'] += war_result['resources_stolen'].get('metal', 0)
-            await db.update_country(attacker_country['id'], {'resources': attacker_resources})
-            
-            winner_name = attacker_country['name']
-            loser_name = defender_country['name']
-            gold_stolen = war_result['gold_stolen']
+            winner_country, loser_country = attacker_country, defender_country
         else:
-            # Défenseur gagne
-            attacker_resources = attacker_country.get('resources', {}).copy()
-            attacker_population = attacker_country.get('population', 0)
-            
-            damage = war_result['damage_percentage']
-            attacker_population = max(0, attacker_population - war_result['population_loss'])
-            attacker_resources['money'] = max(0, attacker_resources.get('money', 0) - war_result['gold_stolen'])
-            attacker_resources['food'] = max(0, attacker_resources.get('food', 0) - war_result['resources_stolen'].get('food', 0))
-            attacker_resources['metal'] = max(0, attacker_resources.get('metal', 0) - war_result['resources_stolen'].get('metal', 0))
-            
-            attacker_army = max(0, attacker_country.get('army_strength', 0) - damage // 2)
-            attacker_stability = max(0, attacker_country.get('stability', 0) - damage)
-            attacker_economy = max(0, attacker_country.get('economy', 0) - damage // 3)
-            
-            await db.update_country(attacker_country['id'], {
-                'resources': attacker_resources,
-                'population': attacker_population,
-                'army_strength': attacker_army,
-                'stability': attacker_stability,
-                'economy': attacker_economy
-            })
-            
-            defender_resources = defender_country.get('resources', {}).copy()
-            defender_resources['money'] += war_result['gold_stolen']
-            defender_resources['food'] += war_result['resources_stolen'].get('food', 0)
-            defender_resources['metal'] += war_result['resources_stolen'].get('metal', 0)
-            await db.update_country(defender_country['id'], {'resources': defender_resources})
-            
-            winner_name = defender_country['name']
-            loser_name = attacker_country['name']
-            gold_stolen = war_result['gold_stolen']
+            winner_country, loser_country = defender_country, attacker_country
+        
+        damage = war_result['damage_percentage']
+        # Pertes appliquées à l'état actuel du perdant (tick économique ou panel entre-temps)
+        current_loser = await db.get_country(loser_country['id'], fresh=True) or loser_country
+        await db.update_country(loser_country['id'], {
+            'population': max(0, current_loser.get('population', 0) - war_result['population_loss']),
+            'army_strength': max(0, current_loser.get('army_strength', 0) - damage // 2),
+            'stability': max(0, current_loser.get('stability', 0) - damage),
+            'economy': max(0, current_loser.get('economy', 0) - damage // 3)
+        })
+        
+        # Butin : débit du perdant, crédit du vainqueur et journal en une seule transaction
+        # (clamp : le vainqueur ne reçoit que ce que le perdant possède réellement)
+        spoils = {
+            'money': war_result['gold_stolen'],
+            'food': war_result['resources_stolen'].get('food', 0),
+            'metal': war_result['resources_stolen'].get('metal', 0)
+        }
+        # Journal : 'receive' rempli par le transfert avec le butin réellement déplacé
+        tx = None
+        if GAME_CONFIG.get('economy_rules', {}).get('transaction_log_enabled'):
+            tx = {
+                'type': 'war',
+                'player_id': player.get('id'),
+                'country_id': winner_country['id'],
+                'target_country_id': loser_country['id']
+            }
+        try:
+            transfer = await db.transfer(loser_country['id'], winner_country['id'], spoils, clamp=True, tx=tx)
+        except OutcomeUnknownError as e:
+            print(f"Erreur butin de guerre: {e}")
+            transfer = None
+        moved = transfer['moved'] if transfer else {}
+        
+        winner_name = winner_country['name']
+        loser_name = loser_country['name']
+        gold_stolen = moved.get('money', 0)
         
         # Mettre à jour la guerre avec le résultat
-        await db.supabase.table('wars').update({
-            'ended_at': 'now()',
-            'winner_id': attacker_country['id'] if war_result['winner'] == 'attacker' else defender_country['id'],
-            'summary': f"{winner_name} a vaincu {loser_name}"
-        }).eq('id', war['id']).execute()
+        await db.end_war(
+            war['id'],
+            attacker_country['id'] if war_result['winner'] == 'attacker' else defender_country['id'],
+            f"{winner_name} a vaincu {loser_name} (graine {war_result['seed']})"
+        )
         
         embed = discord.Embed(
             title="🚀 Guerre aux Missiles Terminée",
@@ -281,14 +274,122 @@ class MilitaryCog(commands.Cog):
         )
         embed.add_field(
             name="📦 Ressources volées",
-            value=f"🍞 {war_result['resources_stolen'].get('food', 0)} | ⚒️ {war_result['resources_stolen'].get('metal', 0)}",
+            value=f"🍞 {moved.get('food', 0):,} | ⚒️ {moved.get('metal', 0):,}",
             inline=False
         )
         
-        await interaction.response.send_message(embed=embed)
+        message = await interaction.followup.send(embed=embed, wait=True)
+        
+        # Récit réécrit par l'IA en arrière-plan (le résultat est déjà appliqué et affiché)
+        if GAME_CONFIG['war_rules'].get('ai_narrative'):
+            task = asyncio.create_task(self._narrate_war(message, embed, attacker_country, defender_country, war_result))
+            self._narrative_tasks.add(task)
+            task.add_done_callback(self._narrative_tasks.discard)
     
+    async def _narrate_war(self, message: discord.Message, embed: discord.Embed, attacker_country, defender_country, war_result):
+        """Remplacer le récit du moteur par celui de l'IA s'il arrive à temps"""
+        from utils.ai_helper_gemini import generate_war_narrative_async
+        narrative = await generate_war_narrative_async(attacker_country, defender_country, war_result)
+        if not narrative or narrative == war_result['narrative']:
+            return
+        embed.description = narrative[:4000]
+        try:
+            await message.edit(embed=embed)
+        except discord.HTTPException as e:
+            print(f"Erreur mise à jour récit de guerre: {e}")
+
+    @app_commands.command(name="simuler-guerre", description="Estimer les chances de victoire avant d'attaquer un pays")
+    @app_commands.describe(target_country="Pays à attaquer", essais=f"Nombre de guerres simulées (max {MAX_TRIALS:,})")
+    @app_commands.autocomplete(target_country=country_autocomplete)
+    async def simulate(self, interaction: discord.Interaction, target_country: str,
+                       essais: app_commands.Range[int, 100, MAX_TRIALS] = DEFAULT_TRIALS):
+        """Simuler une guerre (Monte-Carlo) sans la déclarer"""
+        player = await db.get_player(str(interaction.user.id))
+        if not player or not player.get('country_id'):
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Vous n'appartenez à aucun pays."),
+                ephemeral=True
+            )
+            return
+
+        if not GameHelpers.can_player_use_command(player.get('role', 'recruit'), 'army'):
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Vous n'avez pas les permissions pour consulter l'armée."),
+                ephemeral=True
+            )
+            return
+
+        attacker_country = await db.get_country(player['country_id'])
+        defender_country = await db.get_country_by_name(target_country)
+
+        if not attacker_country or not defender_country:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Pays introuvable."),
+                ephemeral=True
+            )
+            return
+
+        if attacker_country['id'] == defender_country['id']:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed("Vous ne pouvez pas vous attaquer vous-même."),
+                ephemeral=True
+            )
+            return
+
+        # Quelques ms pour 10 000 essais, hors de la boucle d'événements malgré tout
+        simulation = await asyncio.to_thread(
+            simulate_war, attacker_country, defender_country, essais,
+            war_cost=GAME_CONFIG['war_rules']['declaration_cost']
+        )
+
+        win_probability = simulation['attacker_win_probability']
+        low, high = simulation['confidence_95']
+        embed = discord.Embed(
+            title=f"🎲 Simulation : {attacker_country['name']} ⚔️ {defender_country['name']}",
+            description=(
+                f"Victoire estimée : **{win_probability:.1%}** "
+                f"(IC 95 % : {low:.1%} – {high:.1%})"
+            ),
+            color=0x00FF00 if win_probability >= 0.5 else 0xFF0000
+        )
+        embed.add_field(
+            name="💪 Puissance de base",
+            value=f"{simulation['attacker_base_power']:.1f} contre {simulation['defender_base_power']:.1f}",
+            inline=False
+        )
+        damage_win, damage_defeat = simulation['damage_on_win'], simulation['damage_on_defeat']
+        embed.add_field(
+            name="💥 Dégâts infligés si victoire",
+            value=f"{damage_win['p50']}% (p10 {damage_win['p10']}% – p90 {damage_win['p90']}%)",
+            inline=True
+        )
+        embed.add_field(
+            name="🩸 Dégâts subis si défaite",
+            value=f"{damage_defeat['p50']}% (p10 {damage_defeat['p10']}% – p90 {damage_defeat['p90']}%)",
+            inline=True
+        )
+
+        spoils_text = ""
+        for resource, spoils in simulation['spoils'].items():
+            resource_info = GAME_CONFIG['resources'].get(resource, {})
+            gained, lost = spoils['gained_on_win'], spoils['lost_on_defeat']
+            spoils_text += (
+                f"{resource_info.get('name', resource)} : "
+                f"+{gained['p50']:,} (p90 +{gained['p90']:,}) / -{lost['p50']:,}\n"
+            )
+        embed.add_field(name="💰 Butin (gagné / perdu, médiane)", value=spoils_text or "Aucun", inline=False)
+        embed.add_field(
+            name="📊 Gain net moyen en argent",
+            value=f"{simulation['expected_net_money']:,.0f} 💵 (déclaration : {simulation['war_cost']:,} 💵)",
+            inline=False
+        )
+        embed.set_footer(text=f"{simulation['trials']:,} guerres simulées en {simulation['elapsed_ms']:.1f} ms")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="espionner", description="Espionner un autre pays pour obtenir des informations")
     @app_commands.describe(target_country="Pays à espionner")
+    @app_commands.autocomplete(target_country=country_autocomplete)
     async def spy(self, interaction: discord.Interaction, target_country: str):
         """Espionner un autre pays"""
         # Vérifier le joueur
@@ -338,34 +439,48 @@ class MilitaryCog(commands.Cog):
             return
         
         # Déduire le coût
-        spy_resources['money'] -= spy_cost
-        await db.update_country(spy_country['id'], {'resources': spy_resources})
+        try:
+            resources = await db.apply_resource_delta(spy_country['id'], {'money': -spy_cost})
+        except OutcomeUnknownError as e:
+            await interaction.response.send_message(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+            return
+        if resources is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed(f"Pas assez d'argent pour espionner. Nécessaire: {spy_cost:,} 💵"),
+                ephemeral=True
+            )
+            return
         
         # Calculer le succès de l'espionnage
         spy_success = random.random() < 0.7  # 70% de chance de succès
         
         if spy_success:
             # NOUVEAU : Vol de ressources !
-            target_resources = target_country_data.get('resources', {}).copy()
+            target_resources = target_country_data.get('resources', {})
             stolen_resources = {}
             
             # Voler 5-10% de chaque ressource
             for res_type, amount in target_resources.items():
                 if amount > 0:
                     steal_percent = random.uniform(0.05, 0.10)  # 5-10%
-                    stolen_amount = int(amount * steal_percent)
-                    stolen_resources[res_type] = stolen_amount
-                    # Retirer au pays cible
-                    target_resources[res_type] = max(0, amount - stolen_amount)
+                    stolen_resources[res_type] = int(amount * steal_percent)
             
-            # Appliquer …
-            await db.update_country(target_country_data['id'], {'resources': target_resources})
-            
-            # … et ajouter au pays espion
-            spy_resources_final = spy_country.get('resources', {}).copy()
-            for res_type, amount in stolen_resources.items():
-                spy_resources_final[res_type] = spy_resources_final.get(res_type, 0) + amount
-            await db.update_country(spy_country['id'], {'resources': spy_resources_final})
+            # Retirer au pays cible et ajouter au pays espion (transfert et journal atomiques)
+            tx = None
+            if GAME_CONFIG.get('economy_rules', {}).get('transaction_log_enabled'):
+                tx = {
+                    'type': 'spy',
+                    'player_id': player.get('id'),
+                    'country_id': spy_country['id'],
+                    'target_country_id': target_country_data['id']
+                }
+            try:
+                transfer = await db.transfer(target_country_data['id'], spy_country['id'], stolen_resources,
+                                             clamp=True, tx=tx)
+            except OutcomeUnknownError as e:
+                print(f"Erreur vol d'espionnage: {e}")
+                transfer = None
+            stolen_resources = transfer['moved'] if transfer else {}
             
             # Créer l'embed de succès
             embed = discord.Embed(
@@ -406,9 +521,10 @@ class MilitaryCog(commands.Cog):
         else:
             # Échec : malus au pays espion
             penalty = 200
-            spy_resources_penalty = spy_country.get('resources', {}).copy()
-            spy_resources_penalty['money'] = max(0, spy_resources_penalty.get('money', 0) - penalty)
-            await db.update_country(spy_country['id'], {'resources': spy_resources_penalty})
+            try:
+                await db.apply_resource_delta(spy_country['id'], {'money': -penalty}, clamp=True)
+            except OutcomeUnknownError as e:
+                print(f"Erreur malus d'espionnage: {e}")
             
             embed = discord.Embed(
                 title="🕵️ Mission d'Espionnage Échouée",
@@ -469,12 +585,23 @@ class MilitaryCog(commands.Cog):
             return
         
         # Déduire le coût et améliorer les défenses
-        resources['money'] -= defense_cost
-        new_army_strength = min(100, country.get('army_strength', 0) + 5)
-        new_stability = min(100, country.get('stability', 0) + 3)
+        try:
+            resources = await db.apply_resource_delta(country['id'], {'money': -defense_cost})
+        except OutcomeUnknownError as e:
+            await interaction.response.send_message(embed=GameEmbeds.error_embed(str(e)), ephemeral=True)
+            return
+        if resources is None:
+            await interaction.response.send_message(
+                embed=GameEmbeds.error_embed(f"Pas assez d'argent pour renforcer les défenses. Nécessaire: {defense_cost:,} 💵"),
+                ephemeral=True
+            )
+            return
+        # Valeurs actuelles (le panel a pu modifier le pays depuis la mise en cache)
+        current = await db.get_country(country['id'], fresh=True) or country
+        new_army_strength = min(100, current.get('army_strength', 0) + 5)
+        new_stability = min(100, current.get('stability', 0) + 3)
         
         await db.update_country(country['id'], {
-            'resources': resources,
             'army_strength': new_army_strength,
             'stability': new_stability
         })
@@ -11,6 +11,48 @@ DISCORD_GUILD_ID = int(os.getenv('DISCORD_GUILD_ID', 0))
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# Moteur de stockage : 'supabase' (défaut) ou 'sqlite' (local, mode WAL)
+DB_BACKEND = os.getenv('DB_BACKEND', 'supabase')
+DB_SQLITE_PATH = os.getenv('DB_SQLITE_PATH', 'data/world_dominion.db')
+
+# Configuration accès base de données (pool de threads + timeout par requête)
+DB_MAX_CONCURRENCY = int(os.getenv('DB_MAX_CONCURRENCY', 8))
+DB_QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', 10))
+# Seuil (ms) au-delà duquel une requête est journalisée comme lente
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 500))
+# Taille des résultats mesurée (sérialisation JSON) sur 1 appel sur N par opération
+DB_PAYLOAD_SAMPLE_EVERY = int(os.getenv('DB_PAYLOAD_SAMPLE_EVERY', 50))
+# Cache joueurs/pays en mémoire (LRU + TTL en secondes)
+DB_CACHE_TTL = float(os.getenv('DB_CACHE_TTL', 30))
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', 2048))
+# Âge maximal (secondes) de l'index des noms de pays avant rechargement en arrière-plan
+DB_NAME_INDEX_TTL = float(os.getenv('DB_NAME_INDEX_TTL', 300))
+# Durée (secondes) avant resynchronisation du miroir mémoire des compteurs journaliers
+DB_DAILY_COUNTERS_TTL = float(os.getenv('DB_DAILY_COUNTERS_TTL', 300))
+# Journal des transactions en écriture différée (taille de lot, intervalle de vidage en secondes)
+DB_TX_BATCH_SIZE = int(os.getenv('DB_TX_BATCH_SIZE', 50))
+DB_TX_FLUSH_INTERVAL = float(os.getenv('DB_TX_FLUSH_INTERVAL', 2))
+DB_TX_MAX_QUEUE = int(os.getenv('DB_TX_MAX_QUEUE', 10000))
+# Sauvegardes incrémentales (db/backup.py) : répertoire, intervalle en secondes (0 = désactivé),
+# une sauvegarde complète tous les N deltas, nombre de chaînes complètes conservées
+DB_BACKUP_DIR = os.getenv('DB_BACKUP_DIR', 'backups')
+DB_BACKUP_INTERVAL = float(os.getenv('DB_BACKUP_INTERVAL', 3600))
+DB_BACKUP_FULL_EVERY = int(os.getenv('DB_BACKUP_FULL_EVERY', 24))
+DB_BACKUP_KEEP = int(os.getenv('DB_BACKUP_KEEP', 3))
+
+# Panel web Socket.IO : mode asynchrone ('threading' si le bot partage le processus,
+# 'eventlet'/'gevent' sous gunicorn) et transports autorisés (WebSocket, repli long-polling)
+PANEL_ASYNC_MODE = os.getenv('PANEL_ASYNC_MODE', 'threading')
+PANEL_TRANSPORTS = [t.strip() for t in os.getenv('PANEL_TRANSPORTS', 'websocket,polling').split(',') if t.strip()]
+# Panel web : âge maximal (secondes) de l'instantané partagé avant relecture de la base
+PANEL_SNAPSHOT_MAX_AGE = float(os.getenv('PANEL_SNAPSHOT_MAX_AGE', 5))
+# Nombre de changements conservés par le flux Socket.IO avant de renvoyer un instantané complet
+PANEL_FEED_LOG_SIZE = int(os.getenv('PANEL_FEED_LOG_SIZE', 5000))
+# Limitation de débit du panel ('requêtes/secondes') : limite par défaut par clé (admin connecté
+# ou IP) et limites propres à certains endpoints ('endpoint=N/W,...')
+PANEL_RATE_LIMIT = os.getenv('PANEL_RATE_LIMIT', '100/60')
+PANEL_RATE_LIMITS = os.getenv('PANEL_RATE_LIMITS', 'api_backup=2/300,api_export_table=10/60,generate_element=10/60,api_give=30/60,api_simulate_war=20/60')
+
 # Configuration Admin
 ADMIN_ROLE_IDS = [int(x) for x in os.getenv('ADMIN_ROLE_IDS', '').split(',') if x.strip()]
 
@@ -55,5 +97,26 @@ GAME_CONFIG = {
         'inflation_percent_daily': 1,
         'interest_percent_daily': 1,
         'army_maintenance_per_strength': 50
+    },
+    # Résolution locale des guerres (utils/combat.py)
+    'war_rules': {
+        # Poids des facteurs dans la puissance d'un pays (sur 100)
+        'weights': {'army_strength': 0.25, 'units': 0.15, 'economy': 0.3, 'stability': 0.3},
+        # Puissance d'unités correspondant à un score d'unités de 100 (échelle logarithmique)
+        'units_reference_power': 100000,
+        # Aléa appliqué à chaque camp (±20 %)
+        'randomness': 0.2,
+        'min_damage_percent': 5,
+        'max_damage_percent': 40,
+        # Part de la population du perdant perdue par point de dégâts
+        'population_loss_per_damage': 0.002,
+        'max_population_loss': 100000,
+        # Part des pertes du perdant récupérée par le vainqueur
+        'spoils_ratio': (0.30, 0.45),
+        'spoils_resources': ['money', 'food', 'metal'],
+        # Coût de la déclaration de guerre (débité à l'attaquant)
+        'declaration_cost': 1000,
+        # Récit de la guerre réécrit par l'IA après coup (le résultat ne dépend jamais de l'IA)
+        'ai_narrative': True
     }
 }
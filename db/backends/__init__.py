@@ -0,0 +1,16 @@
+"""
+Moteurs de stockage de DatabaseManager (sélection via DB_BACKEND)
+"""
+from db.backends.base import StorageBackend, merge_resource_deltas, split_transfer, transfer_tx
+
+def create_backend(name: str = None) -> StorageBackend:
+    """Instancier le moteur configuré : 'supabase' (défaut) ou 'sqlite'"""
+    from config import DB_BACKEND, DB_SQLITE_PATH
+    name = (name or DB_BACKEND).lower()
+    if name == 'sqlite':
+        from db.backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(DB_SQLITE_PATH)
+    if name == 'supabase':
+        from db.backends.supabase_backend import SupabaseBackend
+        return SupabaseBackend()
+    raise ValueError(f"Moteur de stockage inconnu: {name}")
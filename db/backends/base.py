@@ -0,0 +1,167 @@
+"""
+Interface commune des moteurs de stockage utilisés par DatabaseManager
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+Rows = List[Dict[str, Any]]
+# Filtres : {colonne: valeur} (égalité), {colonne: None} (IS NULL), {colonne: ('neq', None)}
+# (IS NOT NULL), {colonne: ('gte'|'lte'|'gt'|'lt'|'neq'|'in'|'ilike', valeur)}
+Filters = Optional[Dict[str, Any]]
+# any_of : liste de clauses combinées en OU, chaque clause étant un dict de filtres combinés
+# en ET (ex. [{'attacker_id': x}, {'defender_id': x}] : attaquant OU défenseur)
+AnyOf = Optional[Sequence[Dict[str, Any]]]
+
+def merge_resource_deltas(resources: Dict[str, Any], deltas: Dict[str, Any], floor: float = 0,
+                          clamp: bool = False) -> Optional[Dict[str, Any]]:
+    """Appliquer des deltas à un dict de ressources (None si un solde passerait sous floor)"""
+    merged = dict(resources or {})
+    for key, delta in deltas.items():
+        value = (merged.get(key, 0) or 0) + delta
+        if value < floor:
+            if not clamp:
+                return None
+            value = floor
+        merged[key] = value
+    return merged
+
+def split_transfer(from_resources: Dict[str, Any], to_resources: Dict[str, Any], deltas: Dict[str, Any],
+                   fee: float = 0, clamp: bool = False) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Calculer un transfert (miroir Python de transfer_resources dans db/functions.sql)"""
+    src, dst, moved = dict(from_resources or {}), dict(to_resources or {}), {}
+    for key, delta in deltas.items():
+        have_src, have_dst = src.get(key, 0) or 0, dst.get(key, 0) or 0
+        if delta >= 0 and have_src < delta:
+            if not clamp:
+                return None
+            delta = have_src
+        elif delta < 0 and have_dst < -delta:
+            if not clamp:
+                return None
+            delta = -have_dst
+        src[key], dst[key], moved[key] = have_src - delta, have_dst + delta, delta
+    if fee > 0:
+        money = src.get('money', 0) or 0
+        if money < fee and not clamp:
+            return None
+        src['money'] = max(0, money - fee)
+    return {'from': src, 'to': dst, 'moved': moved}
+
+def transfer_tx(tx: Dict[str, Any], moved: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne de transactions d'un transfert : sans 'receive' fourni, les montants réellement
+    transférés (après clamp), comme transfer_resources dans db/functions.sql"""
+    return tx if 'receive' in tx else {**tx, 'receive': moved}
+
+class StorageBackend:
+    """Moteur de stockage : méthodes synchrones, exécutées dans le pool de DatabaseManager.
+
+    Les opérations atomiques sur les ressources ont une implémentation par défaut en
+    lecture-écriture sérialisée par pays dans ce processus ; les moteurs qui savent faire
+    mieux (fonction Postgres, transaction SQLite) les redéfinissent.
+    """
+    name = 'base'
+
+    def __init__(self):
+        self._row_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._row_locks_guard = threading.Lock()
+
+    # ===== CRUD =====
+    def select(self, table: str, columns: str = '*', filters: Filters = None, any_of: AnyOf = None,
+               order: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> Rows:
+        """order : une ou plusieurs colonnes ('rarity,id'), NULL en dernier en croissant et en
+        premier en décroissant (ordre par défaut de Postgres)"""
+        raise NotImplementedError
+
+    def insert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        raise NotImplementedError
+
+    def update(self, table: str, values: Dict[str, Any], filters: Filters = None, any_of: AnyOf = None) -> Rows:
+        raise NotImplementedError
+
+    def delete(self, table: str, filters: Filters = None) -> Rows:
+        raise NotImplementedError
+
+    def upsert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # ===== OPÉRATIONS ATOMIQUES SUR LES RESSOURCES =====
+    def _lock_for(self, row_key: str) -> threading.Lock:
+        with self._row_locks_guard:
+            return self._row_locks[row_key]
+
+    def apply_resource_delta(self, country_id: str, deltas: Dict[str, Any], floor: float = 0,
+                             clamp: bool = False) -> Optional[Dict[str, Any]]:
+        """Nouvelles ressources, ou None si un solde passerait sous floor (rien n'est modifié)"""
+        with self._lock_for(country_id):
+            rows = self.select('countries', 'resources', {'id': country_id})
+            if not rows:
+                return None
+            resources = merge_resource_deltas(rows[0].get('resources'), deltas, floor, clamp)
+            if resources is not None:
+                self.update('countries', {'resources': resources}, {'id': country_id})
+            return resources
+
+    def apply_resource_deltas_bulk(self, items: Rows, floor: float = 0) -> int:
+        """items = [{'id', 'deltas'}] ; soldes ramenés à floor ; retourne le nombre de pays modifiés"""
+        return sum(
+            1 for item in items
+            if self.apply_resource_delta(item['id'], item['deltas'], floor, clamp=True) is not None
+        )
+
+    def bulk_add_country_resource(self, resource: str, amount: float, ids: Optional[Sequence[str]] = None,
+                                  floor: float = 0) -> int:
+        """Ajouter amount à une ressource de tous les pays (ou de ids) ; retourne le nombre de pays modifiés"""
+        filters = {'id': ('in', list(ids))} if ids is not None else None
+        items = [{'id': row['id'], 'deltas': {resource: amount}} for row in self.select('countries', 'id', filters)]
+        return self.apply_resource_deltas_bulk(items, floor) if items else 0
+
+    def bulk_add_player_balance(self, amount: float, ids: Optional[Sequence[str]] = None,
+                                country_id: Optional[str] = None, floor: float = 0) -> int:
+        """Ajouter amount au solde des joueurs (tous, ids, ou ceux de country_id) ; retourne le nombre modifié.
+
+        Repli générique : lecture-écriture du seul solde, ligne par ligne sous verrou (les
+        autres colonnes, écrites en parallèle par le bot ou le panel, ne sont jamais réécrites).
+        """
+        filters = {}
+        if ids is not None:
+            filters['id'] = ('in', list(ids))
+        if country_id is not None:
+            filters['country_id'] = country_id
+        updated = 0
+        for row in self.select('players', 'id', filters or None):
+            with self._lock_for(f"player:{row['id']}"):
+                current = self.select('players', 'balance', {'id': row['id']})
+                if not current:
+                    continue
+                balance = max(floor, (current[0].get('balance') or 0) + amount)
+                self.update('players', {'balance': balance}, {'id': row['id']})
+                updated += 1
+        return updated
+
+    def transfer_resources(self, from_country: str, to_country: str, deltas: Dict[str, Any], fee: float = 0,
+                           clamp: bool = False, tx: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Transfert entre deux pays ; retourne {'from', 'to', 'moved'} ou None.
+
+        La ligne `tx` est insérée sous les mêmes verrous, avant les écritures de ressources :
+        si elle échoue, rien n'est modifié.
+        """
+        if from_country == to_country:
+            return None
+        first, second = sorted((from_country, to_country))
+        with self._lock_for(first), self._lock_for(second):
+            rows = self.select('countries', 'id,resources', {'id': ('in', [from_country, to_country])})
+            by_id = {row['id']: row.get('resources') for row in rows}
+            if from_country not in by_id or to_country not in by_id:
+                return None
+            result = split_transfer(by_id[from_country], by_id[to_country], deltas, fee, clamp)
+            if result is None:
+                return None
+            if tx:
+                self.insert('transactions', transfer_tx(tx, result['moved']))
+            self.update('countries', {'resources': result['from']}, {'id': from_country})
+            self.update('countries', {'resources': result['to']}, {'id': to_country})
+        return result
@@ -0,0 +1,471 @@
+"""
+Moteur de stockage SQLite local (mode WAL) : benchmarks, tests de charge, jeu hors ligne
+ou petit déploiement mono-nœud
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from db.backends.base import StorageBackend, Rows, Filters, AnyOf, merge_resource_deltas, split_transfer, transfer_tx
+
+NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f', 'now'))"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    discord_id TEXT NOT NULL UNIQUE,
+    username TEXT,
+    role TEXT DEFAULT 'recruit',
+    balance INTEGER DEFAULT 0,
+    inventory TEXT DEFAULT '[]',
+    country_id TEXT,
+    last_work_time TEXT,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_players_country ON players(country_id);
+
+CREATE TABLE IF NOT EXISTS countries (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    leader_id TEXT,
+    population INTEGER DEFAULT 0,
+    economy INTEGER DEFAULT 50,
+    army_strength INTEGER DEFAULT 0,
+    resources TEXT DEFAULT '{{}}',
+    stability INTEGER DEFAULT 80,
+    is_locked INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_countries_name ON countries(name);
+CREATE INDEX IF NOT EXISTS idx_countries_locked ON countries(is_locked);
+
+CREATE TABLE IF NOT EXISTS wars (
+    id TEXT PRIMARY KEY,
+    attacker_id TEXT,
+    defender_id TEXT,
+    winner_id TEXT,
+    summary TEXT,
+    started_at TEXT DEFAULT {NOW_SQL},
+    ended_at TEXT,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_wars_attacker ON wars(attacker_id, ended_at);
+CREATE INDEX IF NOT EXISTS idx_wars_defender ON wars(defender_id, ended_at);
+
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    description TEXT,
+    target_country TEXT,
+    impact TEXT DEFAULT '{{}}',
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_events_created ON events(created_at);
+CREATE INDEX IF NOT EXISTS idx_events_country ON events(target_country, created_at);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    player_id TEXT,
+    country_id TEXT,
+    target_country_id TEXT,
+    resource TEXT,
+    amount REAL DEFAULT 0,
+    cost_energy REAL DEFAULT 0,
+    value REAL DEFAULT 0,
+    fee REAL DEFAULT 0,
+    give TEXT,
+    receive TEXT,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_created ON transactions(created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_player ON transactions(player_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_country ON transactions(country_id, created_at);
+
+CREATE TABLE IF NOT EXISTS elements (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    category TEXT,
+    description TEXT,
+    materials TEXT DEFAULT '[]',
+    cost INTEGER DEFAULT 0,
+    rarity TEXT DEFAULT 'commun',
+    time_to_build TEXT,
+    effects TEXT DEFAULT '{{}}',
+    creator_id TEXT,
+    country_id TEXT,
+    built INTEGER DEFAULT 0,
+    built_at TEXT,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+CREATE INDEX IF NOT EXISTS idx_elements_country ON elements(country_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_elements_created ON elements(created_at);
+CREATE INDEX IF NOT EXISTS idx_elements_rarity ON elements(rarity, created_at);
+
+CREATE TABLE IF NOT EXISTS alliances (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    members TEXT DEFAULT '[]',
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS daily_counters (
+    day TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    scope_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, scope, scope_id, key)
+);
+
+-- Même logique que bump_daily_counters() dans db/functions.sql
+CREATE TRIGGER IF NOT EXISTS transactions_daily_counters
+AFTER INSERT ON transactions
+WHEN NEW.type IN ('work', 'produce', 'trade')
+BEGIN
+    INSERT INTO daily_counters (day, scope, scope_id, key, value)
+    SELECT substr(NEW.created_at, 1, 10), scope, scope_id,
+           CASE NEW.type WHEN 'work' THEN 'work'
+                         WHEN 'produce' THEN 'produce:' || COALESCE(NEW.resource, '')
+                         ELSE 'trade_value' END,
+           CASE NEW.type WHEN 'trade' THEN abs(COALESCE(NEW.value, 0)) ELSE COALESCE(NEW.amount, 0) END
+    FROM (SELECT 'player' AS scope, NEW.player_id AS scope_id
+          UNION ALL SELECT 'country', NEW.country_id)
+    WHERE scope_id IS NOT NULL
+    ON CONFLICT (day, scope, scope_id, key) DO UPDATE SET value = value + excluded.value;
+END;
+"""
+
+# Colonnes stockées en JSON (texte) et booléennes (entier), par table
+JSON_COLUMNS = {
+    'players': {'inventory'},
+    'countries': {'resources'},
+    'events': {'impact'},
+    'transactions': {'give', 'receive'},
+    'elements': {'materials', 'effects'},
+    'alliances': {'members'},
+}
+BOOL_COLUMNS = {
+    'countries': {'is_locked'},
+    'elements': {'built'},
+}
+TABLES_WITH_ID = {'players', 'countries', 'wars', 'events', 'transactions', 'elements', 'alliances'}
+OPERATORS = {'gte': '>=', 'lte': '<=', 'gt': '>', 'lt': '<', 'neq': '!=', 'ilike': 'LIKE'}
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def _ident(name: str) -> str:
+    """Valider un nom de table/colonne (jamais interpolé sans contrôle)"""
+    name = name.strip()
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Identifiant invalide: {name!r}")
+    return f'"{name}"'
+
+class SQLiteBackend(StorageBackend):
+    name = 'sqlite'
+
+    def __init__(self, path: str = 'data/world_dominion.db'):
+        super().__init__()
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Une connexion par thread du pool (WAL : lectures concurrentes, un seul écrivain)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ===== CONVERSIONS =====
+    def _encode(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        json_cols = JSON_COLUMNS.get(table, set())
+        encoded = {}
+        for key, value in row.items():
+            if key in json_cols and value is not None and not isinstance(value, str):
+                value = json.dumps(value)
+            elif isinstance(value, bool):
+                value = int(value)
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value)
+            encoded[key] = value
+        return encoded
+
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        json_cols = JSON_COLUMNS.get(table, set())
+        bool_cols = BOOL_COLUMNS.get(table, set())
+        decoded = {}
+        for key in row.keys():
+            value = row[key]
+            if key in json_cols and isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            elif key in bool_cols and value is not None:
+                value = bool(value)
+            elif isinstance(value, float) and value.is_integer():
+                value = int(value)
+            decoded[key] = value
+        return decoded
+
+    def _condition(self, table: str, column: str, value: Any, params: List[Any]) -> str:
+        col = _ident(column)
+        if value is None:
+            return f'{col} IS NULL'
+        if isinstance(value, tuple):
+            op, arg = value
+            if op == 'neq' and arg is None:
+                return f'{col} IS NOT NULL'
+            if op == 'in':
+                arg = list(arg)
+                if not arg:
+                    return '0'
+                params.extend(arg)
+                return f"{col} IN ({', '.join('?' * len(arg))})"
+            params.append(self._encode(table, {column: arg})[column])
+            return f'{col} {OPERATORS[op]} ?'
+        params.append(self._encode(table, {column: value})[column])
+        return f'{col} = ?'
+
+    def _where(self, table: str, filters: Filters, any_of: AnyOf) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (filters or {}).items():
+            clauses.append(self._condition(table, column, value, params))
+        if any_of:
+            ors = [
+                '(' + ' AND '.join(self._condition(table, column, value, params) for column, value in clause.items()) + ')'
+                for clause in any_of
+            ]
+            clauses.append(f"({' OR '.join(ors)})")
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _prepare_rows(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        rows = [rows] if isinstance(rows, dict) else list(rows)
+        prepared = []
+        for row in rows:
+            row = dict(row)
+            if table in TABLES_WITH_ID and not row.get('id'):
+                row['id'] = str(uuid.uuid4())
+            prepared.append(self._encode(table, row))
+        return prepared
+
+    def _fetch_by_ids(self, conn: sqlite3.Connection, table: str, ids: List[Any]) -> Rows:
+        if not ids:
+            return []
+        cursor = conn.execute(
+            f"SELECT * FROM {_ident(table)} WHERE id IN ({', '.join('?' * len(ids))})", ids
+        )
+        by_id = {row['id']: self._decode(table, row) for row in cursor.fetchall()}
+        return [by_id[i] for i in ids if i in by_id]
+
+    # ===== CRUD =====
+    def select(self, table: str, columns: str = '*', filters: Filters = None, any_of: AnyOf = None,
+               order: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> Rows:
+        cols = '*' if columns.strip() == '*' else ', '.join(_ident(c) for c in columns.split(','))
+        where, params = self._where(table, filters, any_of)
+        sql = f'SELECT {cols} FROM {_ident(table)}{where}'
+        if order:
+            direction = 'DESC NULLS FIRST' if desc else 'ASC NULLS LAST'
+            sql += ' ORDER BY ' + ', '.join(f'{_ident(column)} {direction}' for column in order.split(','))
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        cursor = self._conn().execute(sql, params)
+        return [self._decode(table, row) for row in cursor.fetchall()]
+
+    def _write_rows(self, table: str, rows: Union[Dict[str, Any], Rows], upsert: bool) -> Rows:
+        prepared = self._prepare_rows(table, rows)
+        if not prepared:
+            return []
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for row in prepared:
+                cols = list(row)
+                sql = (f"INSERT INTO {_ident(table)} ({', '.join(_ident(c) for c in cols)}) "
+                       f"VALUES ({', '.join('?' * len(cols))})")
+                if upsert:
+                    updates = [c for c in cols if c != 'id']
+                    sql += (' ON CONFLICT(id) DO UPDATE SET '
+                            + ', '.join(f'{_ident(c)} = excluded.{_ident(c)}' for c in updates)
+                            if updates else ' ON CONFLICT(id) DO NOTHING')
+                conn.execute(sql, [row[c] for c in cols])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if table not in TABLES_WITH_ID:
+            return [dict(row) for row in prepared]
+        return self._fetch_by_ids(conn, table, [row['id'] for row in prepared])
+
+    def insert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        return self._write_rows(table, rows, upsert=False)
+
+    def upsert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        return self._write_rows(table, rows, upsert=True)
+
+    def update(self, table: str, values: Dict[str, Any], filters: Filters = None, any_of: AnyOf = None) -> Rows:
+        if not values:
+            return []
+        encoded = self._encode(table, values)
+        where, params = self._where(table, filters, any_of)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ids = [row['id'] for row in conn.execute(f'SELECT id FROM {_ident(table)}{where}', params)]
+            if ids:
+                assignments = ', '.join(f'{_ident(c)} = ?' for c in encoded)
+                conn.execute(
+                    f"UPDATE {_ident(table)} SET {assignments} WHERE id IN ({', '.join('?' * len(ids))})",
+                    list(encoded.values()) + ids
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return self._fetch_by_ids(conn, table, ids)
+
+    def delete(self, table: str, filters: Filters = None) -> Rows:
+        where, params = self._where(table, filters, None)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            deleted = [self._decode(table, row) for row in conn.execute(f'SELECT * FROM {_ident(table)}{where}', params)]
+            conn.execute(f'DELETE FROM {_ident(table)}{where}', params)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return deleted
+
+    # ===== OPÉRATIONS ATOMIQUES (transaction IMMEDIATE) =====
+    def _read_resources(self, conn: sqlite3.Connection, country_id: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute('SELECT resources FROM countries WHERE id = ?', (country_id,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row['resources'] or '{}')
+
+    def _apply_locked(self, conn: sqlite3.Connection, country_id: str, deltas: Dict[str, Any], floor: float,
+                      clamp: bool) -> Optional[Dict[str, Any]]:
+        current = self._read_resources(conn, country_id)
+        if current is None:
+            return None
+        resources = merge_resource_deltas(current, deltas, floor, clamp)
+        if resources is not None:
+            conn.execute('UPDATE countries SET resources = ? WHERE id = ?', (json.dumps(resources), country_id))
+        return resources
+
+    def apply_resource_delta(self, country_id: str, deltas: Dict[str, Any], floor: float = 0,
+                             clamp: bool = False) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            resources = self._apply_locked(conn, country_id, deltas, floor, clamp)
+            conn.execute('COMMIT')
+            return resources
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def apply_resource_deltas_bulk(self, items: Rows, floor: float = 0) -> int:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            count = sum(
+                1 for item in items
+                if self._apply_locked(conn, item['id'], item['deltas'], floor, True) is not None
+            )
+            conn.execute('COMMIT')
+            return count
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _bulk_update(self, sql: str, params: List[Any]) -> int:
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            count = conn.execute(sql, params).rowcount
+            conn.execute('COMMIT')
+            return count
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def bulk_add_country_resource(self, resource: str, amount: float, ids: Optional[Sequence[str]] = None,
+                                  floor: float = 0) -> int:
+        # Une seule instruction UPDATE ; les ids passent en un paramètre JSON (pas de limite de variables)
+        _ident(resource)
+        path = f'$.{resource}'
+        sql = ("UPDATE countries SET resources = json_set(coalesce(resources, '{}'), ?, "
+               "max(?, coalesce(json_extract(resources, ?), 0) + ?))")
+        params: List[Any] = [path, floor, path, amount]
+        if ids is not None:
+            sql += ' WHERE id IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps(list(ids)))
+        return self._bulk_update(sql, params)
+
+    def bulk_add_player_balance(self, amount: float, ids: Optional[Sequence[str]] = None,
+                                country_id: Optional[str] = None, floor: float = 0) -> int:
+        sql = 'UPDATE players SET balance = max(?, coalesce(balance, 0) + ?)'
+        params: List[Any] = [floor, amount]
+        conditions = []
+        if ids is not None:
+            conditions.append('id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(ids)))
+        if country_id is not None:
+            conditions.append('country_id = ?')
+            params.append(country_id)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self._bulk_update(sql, params)
+
+    def transfer_resources(self, from_country: str, to_country: str, deltas: Dict[str, Any], fee: float = 0,
+                           clamp: bool = False, tx: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        if from_country == to_country:
+            return None
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            src = self._read_resources(conn, from_country)
+            dst = self._read_resources(conn, to_country)
+            result = split_transfer(src, dst, deltas, fee, clamp) if src is not None and dst is not None else None
+            if result is None:
+                conn.execute('ROLLBACK')
+                return None
+            conn.execute('UPDATE countries SET resources = ? WHERE id = ?', (json.dumps(result['from']), from_country))
+            conn.execute('UPDATE countries SET resources = ? WHERE id = ?', (json.dumps(result['to']), to_country))
+            if tx:
+                row = self._prepare_rows('transactions', transfer_tx(tx, result['moved']))[0]
+                cols = list(row)
+                conn.execute(
+                    f"INSERT INTO transactions ({', '.join(_ident(c) for c in cols)}) VALUES ({', '.join('?' * len(cols))})",
+                    [row[c] for c in cols]
+                )
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
@@ -0,0 +1,169 @@
+"""
+Moteur de stockage Supabase (PostgREST) + fonctions RPC de db/functions.sql
+"""
+from typing import Any, Dict, Optional, Sequence, Union
+from db.backends.base import StorageBackend, Rows, Filters, AnyOf
+
+def _is_missing_rpc(error: Exception) -> bool:
+    """La fonction Postgres n'est pas déployée (voir db/functions.sql)"""
+    message = str(error)
+    return 'PGRST202' in message or 'Could not find the function' in message
+
+def _filter_value(value: Any) -> str:
+    """Valeur littérale PostgREST d'un filtre or=() (guillemets pour les virgules/parenthèses)"""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+def _or_condition(column: str, value: Any) -> str:
+    """Condition d'une clause any_of au format PostgREST"""
+    if value is None:
+        return f'{column}.is.null'
+    if isinstance(value, tuple):
+        op, arg = value
+        if op == 'neq' and arg is None:
+            return f'{column}.not.is.null'
+        if op == 'in':
+            return f"{column}.in.({','.join(_filter_value(v) for v in arg)})"
+        return f'{column}.{op}.{_filter_value(arg)}'
+    return f'{column}.eq.{_filter_value(value)}'
+
+class SupabaseBackend(StorageBackend):
+    name = 'supabase'
+
+    def __init__(self, client=None):
+        super().__init__()
+        if client is None:
+            from supabase import create_client
+            from config import SUPABASE_URL, SUPABASE_KEY
+            client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.client = client
+        # Fonctions de db/functions.sql absentes : repli pour celles-ci seulement
+        self.missing_rpcs = set()
+
+    def _filtered(self, query, filters: Filters, any_of: AnyOf):
+        for column, value in (filters or {}).items():
+            if value is None:
+                query = query.is_(column, 'null')
+            elif isinstance(value, tuple):
+                op, arg = value
+                if op == 'neq' and arg is None:
+                    query = query.not_.is_(column, 'null')
+                elif op == 'in':
+                    query = query.in_(column, list(arg))
+                else:
+                    query = getattr(query, op)(column, arg)
+            else:
+                query = query.eq(column, value)
+        if any_of:
+            clauses = []
+            for clause in any_of:
+                conditions = [_or_condition(column, value) for column, value in clause.items()]
+                clauses.append(conditions[0] if len(conditions) == 1 else f"and({','.join(conditions)})")
+            query = query.or_(','.join(clauses))
+        return query
+
+    # ===== CRUD =====
+    def select(self, table: str, columns: str = '*', filters: Filters = None, any_of: AnyOf = None,
+               order: Optional[str] = None, desc: bool = False, limit: Optional[int] = None) -> Rows:
+        query = self._filtered(self.client.table(table).select(columns), filters, any_of)
+        for column in (order.split(',') if order else []):
+            query = query.order(column.strip(), desc=desc)
+        if limit:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def insert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        return self.client.table(table).insert(rows).execute().data or []
+
+    def update(self, table: str, values: Dict[str, Any], filters: Filters = None, any_of: AnyOf = None) -> Rows:
+        query = self._filtered(self.client.table(table).update(values), filters, any_of)
+        return query.execute().data or []
+
+    def delete(self, table: str, filters: Filters = None) -> Rows:
+        return self._filtered(self.client.table(table).delete(), filters, None).execute().data or []
+
+    def upsert(self, table: str, rows: Union[Dict[str, Any], Rows]) -> Rows:
+        return self.client.table(table).upsert(rows).execute().data or []
+
+    # ===== OPÉRATIONS ATOMIQUES (RPC) =====
+    def _rpc(self, name: str, params: Dict[str, Any]):
+        """Appeler une fonction Postgres ; lève LookupError si elle n'est pas déployée"""
+        if name in self.missing_rpcs:
+            raise LookupError(name)
+        try:
+            return self.client.rpc(name, params).execute().data
+        except Exception as e:
+            if _is_missing_rpc(e):
+                print(f"RPC {name} absente, repli lecture-écriture (voir db/functions.sql)")
+                self.missing_rpcs.add(name)
+                raise LookupError(name) from e
+            raise
+
+    def apply_resource_delta(self, country_id: str, deltas: Dict[str, Any], floor: float = 0,
+                             clamp: bool = False) -> Optional[Dict[str, Any]]:
+        try:
+            return self._rpc('apply_resource_delta', {
+                'p_country_id': country_id,
+                'p_deltas': deltas,
+                'p_floor': floor,
+                'p_clamp': clamp
+            })
+        except LookupError:
+            pass
+        return super().apply_resource_delta(country_id, deltas, floor, clamp)
+
+    def apply_resource_deltas_bulk(self, items: Rows, floor: float = 0) -> int:
+        try:
+            return self._rpc('apply_resource_deltas_bulk', {'p_items': items, 'p_floor': floor}) or 0
+        except LookupError:
+            pass
+        # Repli : delta par pays sous verrou (RPC apply_resource_delta si déployée), jamais
+        # d'upsert des lignes complètes qui écraserait les colonnes modifiées entre-temps
+        return super().apply_resource_deltas_bulk(items, floor)
+
+    def bulk_add_country_resource(self, resource: str, amount: float, ids: Optional[Sequence[str]] = None,
+                                  floor: float = 0) -> int:
+        try:
+            return self._rpc('bulk_add_country_resource', {
+                'p_resource': resource,
+                'p_amount': amount,
+                'p_ids': list(ids) if ids is not None else None,
+                'p_floor': floor
+            }) or 0
+        except LookupError:
+            pass
+        return super().bulk_add_country_resource(resource, amount, ids, floor)
+
+    def bulk_add_player_balance(self, amount: float, ids: Optional[Sequence[str]] = None,
+                                country_id: Optional[str] = None, floor: float = 0) -> int:
+        try:
+            return self._rpc('bulk_add_player_balance', {
+                'p_amount': amount,
+                'p_ids': list(ids) if ids is not None else None,
+                'p_country_id': country_id,
+                'p_floor': floor
+            }) or 0
+        except LookupError:
+            pass
+        return super().bulk_add_player_balance(amount, ids, country_id, floor)
+
+    def transfer_resources(self, from_country: str, to_country: str, deltas: Dict[str, Any], fee: float = 0,
+                           clamp: bool = False, tx: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            return self._rpc('transfer_resources', {
+                'p_from': from_country,
+                'p_to': to_country,
+                'p_deltas': deltas,
+                'p_fee': fee,
+                'p_clamp': clamp,
+                'p_tx': tx
+            })
+        except LookupError:
+            pass
+        return super().transfer_resources(from_country, to_country, deltas, fee, clamp, tx)
@@ -0,0 +1,410 @@
+"""
+Sauvegardes incrémentales et restauration, indépendantes du moteur de stockage.
+
+Format : fichier NDJSON compressé gzip, une section par table.
+    {"format": "world-dominion-backup", "version": 1, "kind": "full"|"delta", ...}   en-tête
+    {"section": "countries"}                                                          début de section
+    {"v": "<version>", "row": {...}}                                                  ligne (version = empreinte du contenu)
+    {"deleted": "<id>"}                                                               suppression (deltas)
+    {"end": true, "counts": {...}}                                                    fin (absente = fichier tronqué)
+
+Un delta ne contient que les lignes ajoutées/modifiées/supprimées depuis la sauvegarde précédente ;
+une restauration applique la dernière sauvegarde complète puis ses deltas dans l'ordre.
+
+    python -m db.backup snapshot|delta|list [--dir backups]
+    python -m db.backup restore [--dir backups] [--backend sqlite] [--until FICHIER] [--prune] [FICHIERS...]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from db.backends.base import StorageBackend
+
+FORMAT = 'world-dominion-backup'
+FORMAT_VERSION = 1
+BACKUP_TABLES = ('players', 'countries', 'wars', 'alliances', 'elements', 'events', 'transactions')
+# Tables en ajout seul : les deltas ne relisent que les lignes récentes (created_at)
+APPEND_ONLY_TABLES = {'events', 'transactions'}
+# Marge (secondes) sur created_at : une transaction du journal différé peut être insérée en retard
+APPEND_LAG_SECONDS = 300
+PAGE_SIZE = 1000
+RESTORE_BATCH_SIZE = 500
+STATE_FILE = 'state.json.gz'
+MANIFEST_FILE = 'manifest.json'
+
+def row_version(row: Dict[str, Any]) -> str:
+    """Version d'une ligne : empreinte de son contenu"""
+    raw = json.dumps(row, sort_keys=True, default=str, separators=(',', ':')).encode()
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+def shift_timestamp(value: str, seconds: float) -> str:
+    """Décaler un horodatage ISO en conservant son format (comparaison texte côté base)"""
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return value
+    shifted = (moment + timedelta(seconds=seconds)).isoformat()
+    return shifted.replace('T', ' ', 1) if len(value) > 10 and value[10] == ' ' else shifted
+
+def iter_rows(backend: StorageBackend, table: str, filters: Optional[Dict[str, Any]] = None,
+              columns: str = '*', page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Parcourir une table par pages keyset sur id"""
+    last_id = None
+    while True:
+        page_filters = dict(filters or {})
+        if last_id is not None:
+            page_filters['id'] = ('gt', last_id)
+        rows = backend.select(table, columns, page_filters, order='id', limit=page_size)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+class BackupWriter:
+    """Écriture d'un fichier de sauvegarde (fichier temporaire renommé à la fermeture)"""
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        self.path = path
+        self._tmp = f'{path}.tmp'
+        self._file = gzip.open(self._tmp, 'wt', encoding='utf-8', compresslevel=6)
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._table = None
+        self._write({'format': FORMAT, 'version': FORMAT_VERSION, **header})
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str, separators=(',', ':')))
+        self._file.write('\n')
+
+    def section(self, table: str):
+        self._table = table
+        self.counts[table] = {'rows': 0, 'deleted': 0}
+        self._write({'section': table})
+
+    def row(self, row: Dict[str, Any], version: str):
+        self.counts[self._table]['rows'] += 1
+        self._write({'v': version, 'row': row})
+
+    def delete(self, row_id: str):
+        self.counts[self._table]['deleted'] += 1
+        self._write({'deleted': row_id})
+
+    def close(self):
+        self._write({'end': True, 'counts': self.counts})
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+def read_backup(path: str) -> Iterator[Tuple[str, Optional[str], Any]]:
+    """Lire un fichier : ('header', None, dict), ('row', table, row), ('delete', table, id), ('end', None, dict)"""
+    table = None
+    ended = False
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != FORMAT:
+            raise ValueError(f"{path} n'est pas une sauvegarde World Dominion")
+        if header.get('version', 0) > FORMAT_VERSION:
+            raise ValueError(f"{path} : version de format {header['version']} non supportée")
+        yield 'header', None, header
+        for line in f:
+            record = json.loads(line)
+            if 'row' in record:
+                yield 'row', table, record['row']
+            elif 'deleted' in record:
+                yield 'delete', table, record['deleted']
+            elif 'section' in record:
+                table = record['section']
+            elif record.get('end'):
+                ended = True
+                yield 'end', None, record
+    if not ended:
+        raise ValueError(f"{path} est incomplet (fin de fichier manquante)")
+
+class BackupManager:
+    """Sauvegardes complètes et deltas dans un répertoire (manifeste + état des versions)"""
+
+    def __init__(self, backend: StorageBackend, directory: str = 'backups', full_every: int = 24,
+                 keep_full: int = 3, tables=BACKUP_TABLES):
+        self.backend = backend
+        self.directory = directory
+        self.full_every = full_every
+        self.keep_full = keep_full
+        self.tables = tables
+
+    # ===== ÉTAT / MANIFESTE =====
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load_manifest(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self._path(MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _save_manifest(self, manifest: List[Dict[str, Any]]):
+        tmp = self._path(MANIFEST_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self._path(MANIFEST_FILE))
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self._path(STATE_FILE), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def _save_state(self, state: Dict[str, Any]):
+        tmp = self._path(STATE_FILE + '.tmp')
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp, self._path(STATE_FILE))
+
+    # ===== SAUVEGARDE =====
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Sauvegarde planifiée : delta, ou complète si demandé / pas de base / trop de deltas"""
+        state = self._load_state()
+        if full or state is None or state.get('deltas_since_full', 0) >= self.full_every:
+            return self.snapshot()
+        return self.delta(state)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._write_backup('full', None)
+
+    def delta(self, state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        state = state or self._load_state()
+        if state is None:
+            return self.snapshot()
+        return self._write_backup('delta', state)
+
+    def _write_backup(self, kind: str, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.perf_counter()
+        created_at = datetime.utcnow()
+        name = f"{kind}_{created_at.strftime('%Y%m%d_%H%M%S_%f')}.wdb.gz"
+        base = name if kind == 'full' else state['base']
+        parent = None if kind == 'full' else state['latest']
+        writer = BackupWriter(self._path(name), {
+            'kind': kind, 'created_at': created_at.isoformat(), 'base': base, 'parent': parent,
+            'tables': list(self.tables)
+        })
+        new_tables = {}
+        try:
+            for table in self.tables:
+                writer.section(table)
+                previous = (state or {}).get('tables', {}).get(table) if kind == 'delta' else None
+                try:
+                    if table in APPEND_ONLY_TABLES:
+                        new_tables[table] = self._backup_append_only(writer, table, previous)
+                    else:
+                        new_tables[table] = self._backup_versioned(writer, table, previous)
+                except Exception as e:
+                    # Table absente de ce moteur : conserver l'état précédent
+                    print(f"Erreur sauvegarde {table}: {e}")
+                    if previous is not None:
+                        new_tables[table] = previous
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+
+        self._save_state({
+            'latest': name,
+            'base': base,
+            'deltas_since_full': 0 if kind == 'full' else state.get('deltas_since_full', 0) + 1,
+            'tables': new_tables
+        })
+        entry = {
+            'file': name,
+            'kind': kind,
+            'base': base,
+            'parent': parent,
+            'created_at': created_at.isoformat(),
+            'rows': sum(c['rows'] for c in writer.counts.values()),
+            'deleted': sum(c['deleted'] for c in writer.counts.values()),
+            'bytes': os.path.getsize(self._path(name)),
+            'ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        manifest = self.load_manifest()
+        manifest.append(entry)
+        self._save_manifest(self._prune(manifest))
+        return entry
+
+    def _backup_versioned(self, writer: BackupWriter, table: str,
+                          previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Table modifiable : comparer la version de chaque ligne à l'état précédent"""
+        old_versions = (previous or {}).get('versions', {})
+        versions = {}
+        for row in iter_rows(self.backend, table):
+            row_id = str(row['id'])
+            versions[row_id] = version = row_version(row)
+            if previous is None or old_versions.get(row_id) != version:
+                writer.row(row, version)
+        if previous is not None:
+            for row_id in old_versions.keys() - versions.keys():
+                writer.delete(row_id)
+        return {'versions': versions}
+
+    def _backup_append_only(self, writer: BackupWriter, table: str,
+                            previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Table en ajout seul : relire depuis le dernier created_at (moins la marge)"""
+        filters = None
+        seen = set()
+        watermark = None
+        if previous is not None and previous.get('watermark'):
+            watermark = previous['watermark']
+            filters = {'created_at': ('gte', shift_timestamp(watermark, -APPEND_LAG_SECONDS))}
+            seen = set(previous.get('recent', []))
+        recent_rows: List[Tuple[str, str]] = []
+        for row in iter_rows(self.backend, table, filters):
+            row_id = str(row['id'])
+            created = row.get('created_at')
+            if created and (watermark is None or str(created) > watermark):
+                watermark = str(created)
+            recent_rows.append((row_id, str(created or '')))
+            if row_id not in seen:
+                writer.row(row, row_version(row))
+        # Identifiants dans la marge : ne pas les réécrire au prochain delta
+        floor = shift_timestamp(watermark, -APPEND_LAG_SECONDS) if watermark else ''
+        recent = [row_id for row_id, created in recent_rows if created >= floor]
+        return {'watermark': watermark, 'recent': recent}
+
+    def _prune(self, manifest: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Garder les keep_full dernières chaînes (complète + deltas), supprimer les fichiers plus anciens"""
+        bases = [e['file'] for e in manifest if e['kind'] == 'full']
+        if len(bases) <= self.keep_full:
+            return manifest
+        kept_bases = set(bases[-self.keep_full:])
+        kept = []
+        for entry in manifest:
+            if entry['base'] in kept_bases:
+                kept.append(entry)
+                continue
+            try:
+                os.remove(self._path(entry['file']))
+            except FileNotFoundError:
+                pass
+        return kept
+
+    def chain(self, until: Optional[str] = None) -> List[str]:
+        """Fichiers à restaurer : dernière sauvegarde complète puis ses deltas (jusqu'à until inclus)"""
+        manifest = self.load_manifest()
+        if until:
+            names = [e['file'] for e in manifest]
+            if until not in names:
+                raise ValueError(f"Sauvegarde inconnue: {until}")
+            manifest = manifest[:names.index(until) + 1]
+        fulls = [i for i, e in enumerate(manifest) if e['kind'] == 'full']
+        if not fulls:
+            return []
+        start = fulls[-1]
+        base = manifest[start]['file']
+        return [self._path(e['file']) for e in manifest[start:] if e['base'] == base]
+
+def _flush(backend: StorageBackend, table: str, rows: List[Dict[str, Any]], deletes: List[str]):
+    if rows:
+        backend.upsert(table, rows)
+        rows.clear()
+    if deletes:
+        backend.delete(table, {'id': ('in', list(deletes))})
+        deletes.clear()
+
+def restore(backend: StorageBackend, paths: List[str], prune: bool = False,
+            batch_size: int = RESTORE_BATCH_SIZE) -> Dict[str, Dict[str, int]]:
+    """Charger une sauvegarde complète puis ses deltas par lots d'upsert/delete.
+
+    prune=True supprime aussi les lignes du moteur cible absentes de la sauvegarde complète.
+    """
+    counts: Dict[str, Dict[str, int]] = {}
+    for index, path in enumerate(paths):
+        rows: List[Dict[str, Any]] = []
+        deletes: List[str] = []
+        current = None
+        full_ids: Dict[str, set] = {}
+        header = {}
+        for kind, table, payload in read_backup(path):
+            if kind == 'header':
+                header = payload
+                if index == 0 and header.get('kind') != 'full':
+                    raise ValueError(f"{path} : la restauration doit commencer par une sauvegarde complète")
+                continue
+            if table != current:
+                if current is not None:
+                    _flush(backend, current, rows, deletes)
+                current = table
+            bucket = counts.setdefault(table or '', {'rows': 0, 'deleted': 0})
+            if kind == 'row':
+                rows.append(payload)
+                bucket['rows'] += 1
+                if prune and header.get('kind') == 'full':
+                    full_ids.setdefault(table, set()).add(str(payload['id']))
+            elif kind == 'delete':
+                deletes.append(payload)
+                bucket['deleted'] += 1
+            if len(rows) >= batch_size or len(deletes) >= batch_size:
+                _flush(backend, table, rows, deletes)
+        if current is not None:
+            _flush(backend, current, rows, deletes)
+        if prune and header.get('kind') == 'full':
+            for table in header.get('tables', []):
+                keep = full_ids.get(table, set())
+                extra = [str(r['id']) for r in iter_rows(backend, table, columns='id') if str(r['id']) not in keep]
+                for i in range(0, len(extra), batch_size):
+                    backend.delete(table, {'id': ('in', extra[i:i + batch_size])})
+                counts.setdefault(table, {'rows': 0, 'deleted': 0})['deleted'] += len(extra)
+    counts.pop('', None)
+    return counts
+
+def _manager_from_config(backend: Optional[StorageBackend] = None, directory: Optional[str] = None) -> BackupManager:
+    from config import DB_BACKUP_DIR, DB_BACKUP_FULL_EVERY, DB_BACKUP_KEEP
+    from db.backends import create_backend
+    return BackupManager(backend or create_backend(), directory or DB_BACKUP_DIR, DB_BACKUP_FULL_EVERY, DB_BACKUP_KEEP)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m db.backup', description='Sauvegardes World Dominion')
+    parser.add_argument('command', choices=['snapshot', 'delta', 'list', 'restore'])
+    parser.add_argument('files', nargs='*', help='fichiers à restaurer (par défaut : dernière chaîne du répertoire)')
+    parser.add_argument('--dir', help='répertoire des sauvegardes (DB_BACKUP_DIR)')
+    parser.add_argument('--backend', help='moteur cible de la restauration (supabase, sqlite)')
+    parser.add_argument('--until', help='restaurer jusqu\'à ce fichier inclus')
+    parser.add_argument('--prune', action='store_true', help='supprimer les lignes absentes de la sauvegarde complète')
+    args = parser.parse_args(argv)
+
+    from db.backends import create_backend
+    backend = create_backend(args.backend) if args.backend else None
+    manager = _manager_from_config(backend, args.dir)
+    try:
+        if args.command == 'list':
+            for entry in manager.load_manifest():
+                print(f"{entry['file']}  {entry['kind']:5}  {entry['rows']} lignes  {entry['deleted']} suppr.  "
+                      f"{entry['bytes']} o  {entry['ms']} ms")
+            return 0
+        if args.command in ('snapshot', 'delta'):
+            entry = manager.snapshot() if args.command == 'snapshot' else manager.delta()
+            print(f"✅ {entry['file']} : {entry['rows']} lignes, {entry['deleted']} suppressions, {entry['ms']} ms")
+            return 0
+        paths = args.files or manager.chain(args.until)
+        if not paths:
+            print("❌ Aucune sauvegarde complète à restaurer")
+            return 1
+        started = time.perf_counter()
+        counts = restore(manager.backend, paths, prune=args.prune)
+        for table, c in counts.items():
+            print(f"   {table}: {c['rows']} lignes, {c['deleted']} suppressions")
+        print(f"✅ {len(paths)} fichier(s) restauré(s) en {time.perf_counter() - started:.1f} s")
+        return 0
+    finally:
+        manager.backend.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Cache mémoire LRU avec expiration (TTL) pour la couche base de données
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class TTLCache:
+    """Cache LRU borné, avec TTL par entrée et compteurs de hits/misses"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Temps passé sur les requêtes distantes lors des misses (pour estimer le gain)
+        self.miss_seconds = 0.0
+
+    def _get_fresh(self, key: Hashable):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Lire une entrée (copie) et compter le hit/miss"""
+        with self._lock:
+            item = self._get_fresh(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(item[1])
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Lire une entrée sans toucher aux compteurs ni à l'ordre LRU"""
+        with self._lock:
+            item = self._get_fresh(key)
+            return copy.deepcopy(item[1]) if item else None
+
+    def set(self, key: Hashable, value: Any):
+        """Insérer/remplacer une entrée"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def update(self, key: Hashable, changes: Dict[str, Any]) -> bool:
+        """Fusionner des changements dans une entrée existante (write-through)"""
+        with self._lock:
+            item = self._get_fresh(key)
+            if item is None:
+                return False
+            item[1].update(copy.deepcopy(changes))
+            return True
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def record_miss_latency(self, seconds: float):
+        with self._lock:
+            self.miss_seconds += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache (taille, hits/misses, gain estimé)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = (self.miss_seconds / self.misses * 1000) if self.misses else 0.0
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'avg_miss_ms': round(avg_miss_ms, 2),
+                'estimated_saved_ms': round(self.hits * avg_miss_ms, 2)
+            }
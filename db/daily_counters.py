@@ -0,0 +1,81 @@
+"""
+Miroir mémoire des compteurs journaliers (caps de production/travail/commerce)
+Les valeurs de référence sont dans la table daily_counters (trigger sur transactions)
+"""
+import copy
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+def empty_totals() -> Dict[str, Any]:
+    return {'work': 0, 'produce': {}, 'trade_value': 0}
+
+def utc_day() -> str:
+    return datetime.utcnow().date().isoformat()
+
+def add_transaction(totals: Dict[str, Any], tx: Dict[str, Any]):
+    """Ajouter une transaction aux totaux (mêmes règles que bump_daily_counters)"""
+    ttype = tx.get('type')
+    if ttype == 'work':
+        totals['work'] += (tx.get('amount', 0) or 0)
+    elif ttype == 'produce':
+        res_name = tx.get('resource')
+        totals['produce'][res_name] = totals['produce'].get(res_name, 0) + (tx.get('amount', 0) or 0)
+    elif ttype == 'trade':
+        totals['trade_value'] += abs(tx.get('value', 0) or 0)
+
+def totals_from_counters(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convertir des lignes (key, value) de daily_counters en totaux"""
+    totals = empty_totals()
+    for row in rows:
+        key, value = row.get('key', ''), row.get('value', 0) or 0
+        if key == 'work':
+            totals['work'] = value
+        elif key == 'trade_value':
+            totals['trade_value'] = value
+        elif key.startswith('produce:'):
+            totals['produce'][key[len('produce:'):]] = value
+    return totals
+
+class DailyCounters:
+    """Totaux du jour par (portée, id), incrémentés localement à chaque transaction"""
+
+    def __init__(self, ttl: float = 300.0):
+        # Resynchronisation périodique avec la base (autres écrivains, ex. panel web)
+        self.ttl = ttl
+        self._day = utc_day()
+        self._data: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _roll_day_locked(self):
+        today = utc_day()
+        if today != self._day:
+            # Changement de jour UTC : tous les compteurs repartent de zéro
+            self._day = today
+            self._data.clear()
+
+    def get(self, scope: str, scope_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._roll_day_locked()
+            item = self._data.get((scope, scope_id))
+            if item is None or item[0] < time.monotonic():
+                return None
+            return copy.deepcopy(item[1])
+
+    def load(self, scope: str, scope_id: str, totals: Dict[str, Any], day: str):
+        """Installer les totaux lus en base (ignorés s'ils datent de la veille)"""
+        with self._lock:
+            self._roll_day_locked()
+            if day == self._day:
+                self._data[(scope, scope_id)] = (time.monotonic() + self.ttl, copy.deepcopy(totals))
+
+    def record(self, tx: Dict[str, Any]):
+        """Répercuter une transaction journalisée sur les compteurs déjà chargés"""
+        with self._lock:
+            self._roll_day_locked()
+            for scope, key in (('player', 'player_id'), ('country', 'country_id')):
+                if tx.get(key):
+                    item = self._data.get((scope, str(tx[key])))
+                    if item is not None:
+                        add_transaction(item[1], tx)
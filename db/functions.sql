@@ -0,0 +1,253 @@
+-- Fonctions Postgres (RPC Supabase) pour les mutations atomiques de ressources
+-- À exécuter une fois dans l'éditeur SQL Supabase. Sans elles, DatabaseManager
+-- retombe sur une lecture-écriture côté Python (sérialisée par pays, mais non atomique
+-- entre plusieurs processus).
+
+-- Applique des deltas {ressource: delta} au JSON countries.resources en une seule
+-- instruction, sous verrou de ligne. Si une ressource passerait sous p_floor :
+--   * p_clamp = false : rien n'est modifié et la fonction renvoie NULL
+--   * p_clamp = true  : la valeur est ramenée à p_floor
+-- Renvoie le nouveau JSON des ressources.
+create or replace function apply_resource_delta(
+    p_country_id uuid,
+    p_deltas jsonb,
+    p_floor numeric default 0,
+    p_clamp boolean default false
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_resources jsonb;
+    v_key text;
+    v_delta numeric;
+    v_value numeric;
+begin
+    select coalesce(resources, '{}'::jsonb) into v_resources
+    from countries where id = p_country_id
+    for update;
+
+    if not found then
+        return null;
+    end if;
+
+    for v_key, v_delta in select key, value::numeric from jsonb_each_text(p_deltas) loop
+        v_value := coalesce((v_resources ->> v_key)::numeric, 0) + v_delta;
+        if v_value < p_floor then
+            if not p_clamp then
+                return null;
+            end if;
+            v_value := p_floor;
+        end if;
+        v_resources := jsonb_set(v_resources, array[v_key], to_jsonb(v_value), true);
+    end loop;
+
+    update countries set resources = v_resources where id = p_country_id;
+    return v_resources;
+end;
+$$;
+
+-- Transfert entre deux pays en une seule transaction : p_deltas (positifs) quittent
+-- p_from pour p_to, p_fee (argent) est prélevé en plus chez p_from et disparaît.
+-- Les deltas négatifs vont dans l'autre sens (échange : ce que p_from reçoit).
+-- p_clamp = true : ce qui manque chez la partie débitée n'est pas transféré (butin de guerre),
+-- sinon la fonction renvoie NULL sans rien modifier.
+-- p_tx : ligne à insérer dans transactions (optionnelle) ; sans clé "receive", elle reçoit
+-- les montants réellement transférés (après clamp).
+-- Renvoie {"from": resources, "to": resources, "moved": deltas réellement transférés}.
+create or replace function transfer_resources(
+    p_from uuid,
+    p_to uuid,
+    p_deltas jsonb,
+    p_fee numeric default 0,
+    p_clamp boolean default false,
+    p_tx jsonb default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_from jsonb;
+    v_to jsonb;
+    v_moved jsonb := '{}'::jsonb;
+    v_key text;
+    v_delta numeric;
+    v_src numeric;
+    v_dst numeric;
+begin
+    if p_from = p_to then
+        return null;
+    end if;
+
+    -- Verrouiller les deux lignes dans un ordre stable (pas d'interblocage)
+    perform 1 from countries where id in (p_from, p_to) order by id for update;
+    select coalesce(resources, '{}'::jsonb) into v_from from countries where id = p_from;
+    select coalesce(resources, '{}'::jsonb) into v_to from countries where id = p_to;
+    if v_from is null or v_to is null then
+        return null;
+    end if;
+
+    for v_key, v_delta in select key, value::numeric from jsonb_each_text(p_deltas) loop
+        v_src := coalesce((v_from ->> v_key)::numeric, 0);
+        v_dst := coalesce((v_to ->> v_key)::numeric, 0);
+        if v_delta >= 0 and v_src < v_delta then
+            if not p_clamp then
+                return null;
+            end if;
+            v_delta := v_src;
+        elsif v_delta < 0 and v_dst < -v_delta then
+            if not p_clamp then
+                return null;
+            end if;
+            v_delta := -v_dst;
+        end if;
+        v_from := jsonb_set(v_from, array[v_key], to_jsonb(v_src - v_delta), true);
+        v_to := jsonb_set(v_to, array[v_key], to_jsonb(v_dst + v_delta), true);
+        v_moved := jsonb_set(v_moved, array[v_key], to_jsonb(v_delta), true);
+    end loop;
+
+    if p_fee > 0 then
+        v_src := coalesce((v_from ->> 'money')::numeric, 0);
+        if v_src < p_fee and not p_clamp then
+            return null;
+        end if;
+        v_from := jsonb_set(v_from, array['money'], to_jsonb(greatest(0, v_src - p_fee)), true);
+    end if;
+
+    update countries set resources = v_from where id = p_from;
+    update countries set resources = v_to where id = p_to;
+    if p_tx is not null then
+        if not p_tx ? 'receive' then
+            p_tx := p_tx || jsonb_build_object('receive', v_moved);
+        end if;
+        -- Seules les colonnes fournies sont insérées (id/created_at gardent leurs valeurs par défaut)
+        select string_agg(quote_ident(k), ', ') into v_key from jsonb_object_keys(p_tx) as k;
+        execute format(
+            'insert into transactions (%1$s) select %1$s from jsonb_populate_record(null::transactions, $1)',
+            v_key
+        ) using p_tx;
+    end if;
+    return jsonb_build_object('from', v_from, 'to', v_to, 'moved', v_moved);
+end;
+$$;
+
+-- Compteurs journaliers (caps /produire, /commerce, /travail) maintenus par trigger :
+-- une ligne par (jour UTC, portée player/country, id, clé). Un nouveau jour repart de zéro.
+create table if not exists daily_counters (
+    day date not null,
+    scope text not null,
+    scope_id text not null,
+    key text not null,
+    value numeric not null default 0,
+    primary key (day, scope, scope_id, key)
+);
+
+create or replace function bump_daily_counters() returns trigger
+language plpgsql
+as $$
+declare
+    v_day date := (coalesce(new.created_at, now()) at time zone 'utc')::date;
+    v_key text;
+    v_amount numeric;
+begin
+    if new.type = 'work' then
+        v_key := 'work';
+        v_amount := coalesce(new.amount, 0);
+    elsif new.type = 'produce' then
+        v_key := 'produce:' || coalesce(new.resource, '');
+        v_amount := coalesce(new.amount, 0);
+    elsif new.type = 'trade' then
+        v_key := 'trade_value';
+        v_amount := abs(coalesce(new.value, 0));
+    else
+        return new;
+    end if;
+
+    if new.player_id is not null then
+        insert into daily_counters (day, scope, scope_id, key, value)
+        values (v_day, 'player', new.player_id::text, v_key, v_amount)
+        on conflict (day, scope, scope_id, key) do update set value = daily_counters.value + excluded.value;
+    end if;
+    if new.country_id is not null then
+        insert into daily_counters (day, scope, scope_id, key, value)
+        values (v_day, 'country', new.country_id::text, v_key, v_amount)
+        on conflict (day, scope, scope_id, key) do update set value = daily_counters.value + excluded.value;
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists transactions_daily_counters on transactions;
+create trigger transactions_daily_counters
+    after insert on transactions
+    for each row execute function bump_daily_counters();
+
+-- Purge optionnelle des anciens jours
+-- delete from daily_counters where day < current_date - 7;
+
+-- Application groupée de deltas (tick économique) : p_items = [{"id": ..., "deltas": {...}}, ...]
+-- Une seule transaction pour tous les pays ; chaque solde est ramené à p_floor au besoin.
+-- Renvoie le nombre de pays mis à jour.
+create or replace function apply_resource_deltas_bulk(
+    p_items jsonb,
+    p_floor numeric default 0
+) returns integer
+language plpgsql
+as $$
+declare
+    v_item jsonb;
+    v_count integer := 0;
+begin
+    for v_item in select value from jsonb_array_elements(p_items) loop
+        if apply_resource_delta((v_item ->> 'id')::uuid, v_item -> 'deltas', p_floor, true) is not null then
+            v_count := v_count + 1;
+        end if;
+    end loop;
+    return v_count;
+end;
+$$;
+
+-- Outils admin : don groupé d'une ressource à tous les pays (ou à p_ids) en une seule requête.
+-- Les soldes sont ramenés à p_floor (montants négatifs = retrait). Renvoie le nombre de pays modifiés.
+create or replace function bulk_add_country_resource(
+    p_resource text,
+    p_amount numeric,
+    p_ids uuid[] default null,
+    p_floor numeric default 0
+) returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    update countries
+       set resources = jsonb_set(
+               coalesce(resources, '{}'::jsonb),
+               array[p_resource],
+               to_jsonb(greatest(p_floor, coalesce((resources ->> p_resource)::numeric, 0) + p_amount))
+           )
+     where p_ids is null or id = any(p_ids);
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
+
+-- Outils admin : ajout groupé au solde des joueurs (tous, p_ids, ou ceux de p_country_id).
+-- Renvoie le nombre de joueurs modifiés.
+create or replace function bulk_add_player_balance(
+    p_amount numeric,
+    p_ids uuid[] default null,
+    p_country_id uuid default null,
+    p_floor numeric default 0
+) returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    update players
+       set balance = greatest(p_floor, coalesce(balance, 0) + p_amount)
+     where (p_ids is null or id = any(p_ids))
+       and (p_country_id is null or country_id = p_country_id);
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
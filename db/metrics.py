@@ -0,0 +1,201 @@
+"""
+Instrumentation des requêtes : histogrammes de latence, lignes, taille des réponses
+(échantillonnée) et journal des requêtes lentes (partagé par le bot et le panel web)
+"""
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Bornes supérieures des seaux de l'histogramme (ms), le dernier seau est +inf
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+def payload_size(data: Any) -> int:
+    """Taille approximative (octets JSON) d'un résultat"""
+    if data is None:
+        return 0
+    try:
+        return len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+def row_count(data: Any) -> int:
+    if isinstance(data, list):
+        return len(data)
+    return 0 if data is None else 1
+
+class OperationStats:
+    """Compteurs d'une opération (méthode DatabaseManager ou requête du panel)"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        # Taille mesurée sur un échantillon d'appels seulement (voir QueryMetrics.timed)
+        self.payload_samples = 0
+        self.sampled_bytes = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms: float, rows: int, payload: Optional[int], error: bool):
+        self.count += 1
+        self.errors += int(error)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        if payload is not None:
+            self.payload_samples += 1
+            self.sampled_bytes += payload
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Estimation par seau (borne supérieure du seau contenant le quantile)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+            'rows': self.rows,
+            'avg_rows': round(self.rows / self.count, 1) if self.count else 0.0,
+            # Total estimé : taille moyenne de l'échantillon × nombre d'appels
+            'payload_bytes': round(self.sampled_bytes / self.payload_samples * self.count) if self.payload_samples else 0,
+            'payload_samples': self.payload_samples,
+            'histogram': dict(zip([f'le_{b}' for b in LATENCY_BUCKETS_MS] + ['inf'], self.buckets))
+        }
+
+class QueryMetrics:
+    """Registre thread-safe des métriques par opération"""
+
+    def __init__(self, slow_query_ms: float = 500, slow_log_size: int = 100, payload_sample_every: int = 50):
+        self.slow_query_ms = slow_query_ms
+        self.payload_sample_every = max(1, payload_sample_every)
+        self._ops: Dict[str, OperationStats] = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, operation: str, elapsed_ms: float, rows: int = 0, payload: Optional[int] = None,
+               error: bool = False, detail: Optional[str] = None):
+        with self._lock:
+            stats = self._ops.get(operation)
+            if stats is None:
+                stats = self._ops[operation] = OperationStats()
+            stats.add(elapsed_ms, rows, payload, error)
+            slow = elapsed_ms >= self.slow_query_ms
+            if slow:
+                self._slow.append({
+                    'operation': operation,
+                    'detail': detail,
+                    'ms': round(elapsed_ms, 2),
+                    'rows': rows,
+                    'payload_bytes': payload,
+                    'error': error,
+                    'at': datetime.utcnow().isoformat()
+                })
+        if slow:
+            print(f"Requête lente ({elapsed_ms:.0f} ms): {operation}{f' [{detail}]' if detail else ''} - {rows} lignes")
+
+    def timed(self, operation: str, fn, *args, detail: Optional[str] = None, **kwargs):
+        """Exécuter fn(*args, **kwargs) en mesurant latence et lignes ; la taille du résultat
+        (sérialisation JSON complète) n'est mesurée qu'au premier appel puis 1 fois sur N"""
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(operation, (time.perf_counter() - started) * 1000, error=True, detail=detail)
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        data = getattr(result, 'data', result)
+        with self._lock:
+            stats = self._ops.get(operation)
+            sample = stats is None or stats.count % self.payload_sample_every == 0
+        self.record(operation, elapsed_ms, row_count(data), payload_size(data) if sample else None, detail=detail)
+        return result
+
+    def snapshot(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Métriques triées par temps total décroissant (les opérations dominantes d'abord)"""
+        with self._lock:
+            ops = sorted(self._ops.items(), key=lambda item: item[1].total_ms, reverse=True)
+            if top:
+                ops = ops[:top]
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'slow_query_ms': self.slow_query_ms,
+                'operations': {name: stats.as_dict() for name, stats in ops},
+                'slow_queries': list(self._slow)
+            }
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+class InstrumentedQuery:
+    """Enveloppe d'un constructeur de requête Supabase : chronomètre .execute()"""
+
+    def __init__(self, builder, registry: QueryMetrics, operation: str):
+        self._builder = builder
+        self._registry = registry
+        self._operation = operation
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if name == 'execute':
+            return lambda *a, **kw: self._registry.timed(self._operation, attr, *a, **kw)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                # Le premier verbe (select/insert/update/delete/upsert) nomme l'opération
+                operation = self._operation
+                if name in ('select', 'insert', 'update', 'delete', 'upsert') and ' ' not in operation.split(':', 1)[-1]:
+                    operation = f'{operation} {name}'
+                return InstrumentedQuery(result, self._registry, operation)
+            return result
+        return chained
+
+class InstrumentedClient:
+    """Client Supabase instrumenté (les appels .table()/.rpc() sont mesurés)"""
+
+    def __init__(self, client, registry: QueryMetrics, prefix: str = 'web'):
+        self._client = client
+        self._registry = registry
+        self._prefix = prefix
+
+    def table(self, name: str):
+        return InstrumentedQuery(self._client.table(name), self._registry, f'{self._prefix}:{name}')
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None):
+        return InstrumentedQuery(self._client.rpc(name, params or {}), self._registry, f'{self._prefix}:rpc {name}')
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+def _make_registry() -> QueryMetrics:
+    from config import DB_SLOW_QUERY_MS, DB_PAYLOAD_SAMPLE_EVERY
+    return QueryMetrics(DB_SLOW_QUERY_MS, payload_sample_every=DB_PAYLOAD_SAMPLE_EVERY)
+
+# Registre global (bot + panel web dans le même processus)
+metrics = _make_registry()
@@ -0,0 +1,100 @@
+"""
+Index mémoire des noms de pays (insensible à la casse et aux accents)
+Sert aux recherches exactes et à l'autocomplétion sans requête distante
+"""
+import bisect
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+def normalize_name(name: str) -> str:
+    """Normaliser un nom : sans accents, casefold, espaces réduits"""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+class CountryNameIndex:
+    """Tableau trié (nom normalisé, id, nom affiché) avec recherche par préfixe"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str, str]] = []
+        self._by_id: Dict[str, Tuple[str, str, str]] = {}
+        self._lock = threading.Lock()
+        self.loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def rebuild(self, countries: List[Dict]):
+        """Reconstruire l'index à partir de la liste complète des pays"""
+        entries = sorted(
+            (normalize_name(c['name']), c['id'], c['name'])
+            for c in countries if c.get('id') and c.get('name')
+        )
+        with self._lock:
+            self._entries = entries
+            self._by_id = {entry[1]: entry for entry in entries}
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, country_id: str, name: str):
+        """Ajouter ou renommer un pays"""
+        with self._lock:
+            self._remove_locked(country_id)
+            entry = (normalize_name(name), country_id, name)
+            bisect.insort(self._entries, entry)
+            self._by_id[country_id] = entry
+
+    def remove(self, country_id: str):
+        with self._lock:
+            self._remove_locked(country_id)
+
+    def _remove_locked(self, country_id: str):
+        entry = self._by_id.pop(country_id, None)
+        if entry is None:
+            return
+        pos = bisect.bisect_left(self._entries, entry)
+        if pos < len(self._entries) and self._entries[pos] == entry:
+            del self._entries[pos]
+
+    def lookup(self, name: str) -> Optional[str]:
+        """ID du pays dont le nom correspond exactement (après normalisation)"""
+        key = normalize_name(name)
+        with self._lock:
+            pos = bisect.bisect_left(self._entries, (key,))
+            if pos < len(self._entries) and self._entries[pos][0] == key:
+                self.hits += 1
+                return self._entries[pos][1]
+            self.misses += 1
+            return None
+
+    def search(self, text: str, limit: int = 25) -> List[str]:
+        """Noms commençant par `text`, complétés par ceux qui le contiennent"""
+        key = normalize_name(text)
+        with self._lock:
+            start = bisect.bisect_left(self._entries, (key,))
+            results = []
+            for entry in self._entries[start:]:
+                if not entry[0].startswith(key) or len(results) >= limit:
+                    break
+                results.append(entry[2])
+            if key and len(results) < limit:
+                for entry in self._entries:
+                    if len(results) >= limit:
+                        break
+                    if key in entry[0] and not entry[0].startswith(key):
+                        results.append(entry[2])
+            return results
+
+    def is_stale(self, max_age: float) -> bool:
+        return not self.loaded_at or time.monotonic() - self.loaded_at > max_age
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'age_seconds': round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None
+            }
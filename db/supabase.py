@@ -1,11 +1,53 @@
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_KEY
+from config import (
+    DB_MAX_CONCURRENCY, DB_QUERY_TIMEOUT,
+    DB_CACHE_TTL, DB_CACHE_SIZE, DB_NAME_INDEX_TTL, DB_DAILY_COUNTERS_TTL,
+    DB_TX_BATCH_SIZE, DB_TX_FLUSH_INTERVAL, DB_TX_MAX_QUEUE,
+    DB_BACKUP_DIR, DB_BACKUP_FULL_EVERY, DB_BACKUP_KEEP
+)
+from db.backends import StorageBackend, create_backend, transfer_tx
+from db.backup import BackupManager
+from db.cache import TTLCache
+from db.metrics import metrics
+from db.daily_counters import DailyCounters, add_transaction, empty_totals, totals_from_counters, utc_day
+from db.name_index import CountryNameIndex
+from db.tx_writer import TransactionWriter
 import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 
+class OutcomeUnknownError(Exception):
+    """Délai dépassé sur une écriture : le thread du pool continue et a pu la valider en base"""
+
+    def __init__(self, message: str = "⏳ La base de données n'a pas répondu à temps : l'opération a peut-être été "
+                                      "appliquée. Vérifiez vos ressources avant de réessayer."):
+        super().__init__(message)
+
 class DatabaseManager:
-    def __init__(self):
-        self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    def __init__(self, backend: Optional[StorageBackend] = None, max_concurrency: int = DB_MAX_CONCURRENCY,
+                 query_timeout: float = DB_QUERY_TIMEOUT):
+        # Moteur de stockage (Supabase ou SQLite, voir DB_BACKEND) ; ses méthodes sont
+        # synchrones et partent dans un pool borné pour ne jamais bloquer la boucle discord.py
+        self.backend = backend or create_backend()
+        self.query_timeout = query_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='db')
+        # Cache read-through : joueurs par discord_id (+ alias id interne), pays par id
+        self.player_cache = TTLCache(DB_CACHE_SIZE, DB_CACHE_TTL)
+        self.player_id_index = TTLCache(DB_CACHE_SIZE, DB_CACHE_TTL)
+        self.country_cache = TTLCache(DB_CACHE_SIZE, DB_CACHE_TTL)
+        # Index secondaire des noms de pays (recherche exacte + autocomplétion)
+        self.country_names = CountryNameIndex()
+        self._index_refresh: Optional[asyncio.Task] = None
+        # Compteurs journaliers (table daily_counters) + miroir mémoire
+        self.daily_counters = DailyCounters(DB_DAILY_COUNTERS_TTL)
+        # Journal des transactions en écriture différée (insertions groupées)
+        self.tx_writer = TransactionWriter(
+            self.insert_transactions, DB_TX_BATCH_SIZE, DB_TX_FLUSH_INTERVAL, DB_TX_MAX_QUEUE
+        )
+        # Sauvegardes incrémentales (complète + deltas, voir db/backup.py)
+        self.backups = BackupManager(self.backend, DB_BACKUP_DIR, DB_BACKUP_FULL_EVERY, DB_BACKUP_KEEP)
         # table names
         self.table_players = 'players'
         self.table_countries = 'countries'
@@ -13,56 +55,191 @@ class DatabaseManager:
         self.table_events = 'events'
         self.table_transactions = 'transactions'
         self.table_elements = 'elements'
-    
+
+    # ===== EXÉCUTION =====
+    async def run(self, operation: str, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """Exécuter une méthode du moteur dans le pool de threads (avec timeout).
+
+        Chaque appel est mesuré sous `operation` (nom de la méthode DatabaseManager appelante) :
+        latence, lignes, taille échantillonnée du résultat, journal des requêtes lentes.
+        """
+        detail = f"{fn.__name__} {args[0]}" if args and isinstance(args[0], str) else fn.__name__
+        loop = asyncio.get_running_loop()
+        call = functools.partial(metrics.timed, operation, fn, *args, detail=detail, **kwargs)
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, call),
+                timeout=timeout or self.query_timeout
+            )
+        except asyncio.TimeoutError:
+            metrics.record(f'{operation} (timeout)', (timeout or self.query_timeout) * 1000, error=True, detail=detail)
+            raise
+
+    async def close(self):
+        """Vider le journal des transactions puis libérer le pool de threads (arrêt du bot)"""
+        await self.tx_writer.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+
+    # ===== CACHE =====
+    def _cache_player(self, player: Optional[Dict[str, Any]]):
+        if player and player.get('discord_id'):
+            self.player_cache.set(player['discord_id'], player)
+            if player.get('id'):
+                self.player_id_index.set(player['id'], player['discord_id'])
+
+    def _uncache_player(self, player: Dict[str, Any]):
+        self.player_cache.delete(player.get('discord_id'))
+        if player.get('id'):
+            self.player_id_index.delete(player['id'])
+
+    def _cache_country(self, country: Optional[Dict[str, Any]]):
+        if country and country.get('id'):
+            self.country_cache.set(country['id'], country)
+            if country.get('name'):
+                self.country_names.upsert(country['id'], country['name'])
+
+    def _uncache_country(self, country_id: str):
+        self.country_names.remove(country_id)
+        self.country_cache.delete(country_id)
+
+    def _write_through_country(self, country_id: str, updates: Dict[str, Any]):
+        if updates.get('name'):
+            self.country_names.upsert(country_id, updates['name'])
+        self.country_cache.update(country_id, updates)
+
+    async def refresh_country_index(self):
+        """Recharger l'index des noms à partir de la liste complète des pays"""
+        await self.get_all_countries()
+
+    def search_country_names(self, text: str, limit: int = 25) -> List[str]:
+        """Noms de pays correspondant à `text` (index mémoire, aucune requête bloquante)"""
+        if self.country_names.is_stale(DB_NAME_INDEX_TTL) and (self._index_refresh is None or self._index_refresh.done()):
+            # Rafraîchissement en arrière-plan : on répond tout de suite avec l'index actuel
+            self._index_refresh = asyncio.create_task(self.refresh_country_index())
+        return self.country_names.search(text, limit)
+
+    def invalidate_players(self):
+        """Vider le cache joueurs (mises à jour en masse)"""
+        self.player_cache.clear()
+        self.player_id_index.clear()
+
+    def evict_players(self, player_ids: Optional[List[str]] = None):
+        """Oublier des joueurs modifiés hors du bot (panel du même processus) ; tous si None"""
+        if player_ids is None:
+            self.invalidate_players()
+            return
+        for player_id in player_ids:
+            self.player_cache.delete(self.player_id_index.peek(player_id))
+            self.player_id_index.delete(player_id)
+
+    def evict_countries(self, country_ids: Optional[List[str]] = None):
+        """Oublier des pays modifiés hors du bot (panel du même processus) ; tous si None"""
+        if country_ids is None:
+            # Noms inchangés par les remises à zéro en masse : l'index reste valable
+            self.country_cache.clear()
+            return
+        for country_id in country_ids:
+            self._uncache_country(country_id)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Compteurs hits/misses et latence économisée estimée par cache"""
+        return {
+            'players': self.player_cache.stats(),
+            'players_by_id': self.player_id_index.stats(),
+            'countries': self.country_cache.stats(),
+            'country_names': self.country_names.stats()
+        }
+
     # ===== PLAYERS =====
     async def create_player(self, discord_id: str, username: str) -> Dict[str, Any]:
         """Créer un nouveau joueur"""
         try:
-            result = self.supabase.table('players').insert({
+            rows = await self.run('create_player', self.backend.insert, 'players', {
                 'discord_id': discord_id,
                 'username': username,
                 'role': 'recruit',
                 'balance': 0,
                 'inventory': []
-            }).execute()
-            return result.data[0] if result.data else None
+            })
+            player = rows[0] if rows else None
+            self._cache_player(player)
+            return player
         except Exception as e:
             print(f"Erreur création joueur: {e}")
             return None
-    
+
     async def get_player(self, discord_id: str) -> Optional[Dict[str, Any]]:
         """Récupérer un joueur par son ID Discord"""
+        cached = self.player_cache.get(discord_id)
+        if cached is not None:
+            return cached
         try:
-            result = self.supabase.table('players').select('*').eq('discord_id', discord_id).execute()
-            return result.data[0] if result.data else None
+            started = time.perf_counter()
+            rows = await self.run('get_player', self.backend.select, 'players', filters={'discord_id': discord_id})
+            self.player_cache.record_miss_latency(time.perf_counter() - started)
+            player = rows[0] if rows else None
+            self._cache_player(player)
+            return player
         except Exception as e:
             print(f"Erreur récupération joueur: {e}")
             return None
-    
+
     async def get_player_by_id(self, player_id: str) -> Optional[Dict[str, Any]]:
         """Récupérer un joueur par son ID interne"""
+        discord_id = self.player_id_index.get(player_id)
+        if discord_id is not None:
+            cached = self.player_cache.get(discord_id)
+            if cached is not None:
+                return cached
         try:
-            result = self.supabase.table('players').select('*').eq('id', player_id).execute()
-            return result.data[0] if result.data else None
+            started = time.perf_counter()
+            rows = await self.run('get_player_by_id', self.backend.select, 'players', filters={'id': player_id})
+            self.player_id_index.record_miss_latency(time.perf_counter() - started)
+            player = rows[0] if rows else None
+            self._cache_player(player)
+            return player
         except Exception as e:
             print(f"Erreur récupération joueur par ID: {e}")
             return None
-    
+
     async def update_player(self, discord_id: str, updates: Dict[str, Any]) -> bool:
         """Mettre à jour un joueur"""
         try:
-            self.supabase.table('players').update(updates).eq('discord_id', discord_id).execute()
+            await self.run('update_player', self.backend.update, 'players', updates, {'discord_id': discord_id})
+            self.player_cache.update(discord_id, updates)
             return True
         except Exception as e:
             print(f"Erreur mise à jour joueur: {e}")
             return False
-    
+
+    async def add_player_balance(self, player: Dict[str, Any], amount: float, updates: Optional[Dict[str, Any]] = None,
+                                 floor: float = 0) -> Optional[Dict[str, Any]]:
+        """Ajouter atomiquement amount au solde d'un joueur (jamais de solde absolu calculé depuis
+        le cache : le panel modifie aussi les soldes), avec d'autres champs éventuels.
+
+        Retourne le joueur relu en base, ou None en cas d'erreur.
+        """
+        try:
+            updated = await self.run('add_player_balance', self.backend.bulk_add_player_balance, amount, [player['id']], None, floor)
+            if updated and updates:
+                await self.run('add_player_balance', self.backend.update, 'players', updates, {'id': player['id']})
+        except Exception as e:
+            print(f"Erreur ajout solde joueur: {e}")
+            updated = 0
+        # Solde exact connu seulement côté base : relecture plutôt qu'écriture dans le cache
+        self._uncache_player(player)
+        if not updated:
+            return None
+        fresh = await self.get_player(player['discord_id'])
+        return fresh or dict(player, **(updates or {}), balance=max(floor, (player.get('balance') or 0) + amount))
+
     # ===== COUNTRIES =====
-    async def create_country(self, name: str, leader_id: str) -> Dict[str, Any]:
-        """Créer un nouveau pays"""
+    async def create_country(self, name: str, leader_id: Optional[str] = None) -> Dict[str, Any]:
+        """Créer un nouveau pays (sans leader si leader_id est None)"""
         try:
             # Créer le pays
-            country_result = self.supabase.table('countries').insert({
+            rows = await self.run('create_country', self.backend.insert, 'countries', {
                 'name': name,
                 'leader_id': leader_id,
                 'population': 1000000,
@@ -76,131 +253,243 @@ class DatabaseManager:
                     'energy': 100,
                     'materials': 30
                 },
-                'stability': 80
-            }).execute()
-            
-            if country_result.data:
-                country = country_result.data[0]
+                'stability': 80,
+                'is_locked': False
+            })
+
+            if rows:
+                country = rows[0]
+                self._cache_country(country)
                 # Mettre à jour le joueur pour qu'il devienne le leader
-                await self.update_player(leader_id, {
-                    'country_id': country['id'],
-                    'role': 'chief'
-                })
+                if leader_id:
+                    await self.update_player(leader_id, {
+                        'country_id': country['id'],
+                        'role': 'chief'
+                    })
                 return country
             return None
         except Exception as e:
             print(f"Erreur création pays: {e}")
             return None
-    
-    async def get_country(self, country_id: str) -> Optional[Dict[str, Any]]:
-        """Récupérer un pays par son ID"""
+
+    async def get_country(self, country_id: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Récupérer un pays par son ID (fresh=True : relu en base, pour une lecture-écriture)"""
+        cached = None if fresh else self.country_cache.get(country_id)
+        if cached is not None:
+            return cached
         try:
-            result = self.supabase.table('countries').select('*').eq('id', country_id).execute()
-            return result.data[0] if result.data else None
+            started = time.perf_counter()
+            rows = await self.run('get_country', self.backend.select, 'countries', filters={'id': country_id})
+            self.country_cache.record_miss_latency(time.perf_counter() - started)
+            country = rows[0] if rows else None
+            self._cache_country(country)
+            return country
         except Exception as e:
             print(f"Erreur récupération pays: {e}")
             return None
-    
+
     async def get_country_by_name(self, name: str) -> Optional[Dict[str, Any]]:
-        """Récupérer un pays par son nom"""
+        """Récupérer un pays par son nom (insensible à la casse et aux accents)"""
+        country_id = self.country_names.lookup(name)
+        if country_id is not None:
+            return await self.get_country(country_id)
         try:
-            result = self.supabase.table('countries').select('*').eq('name', name).execute()
-            return result.data[0] if result.data else None
+            rows = await self.run('get_country_by_name', self.backend.select, 'countries', filters={'name': name})
+            country = rows[0] if rows else None
+            self._cache_country(country)
+            return country
         except Exception as e:
             print(f"Erreur récupération pays par nom: {e}")
             return None
-    
+
     async def update_country(self, country_id: str, updates: Dict[str, Any]) -> bool:
         """Mettre à jour un pays"""
         try:
-            self.supabase.table('countries').update(updates).eq('id', country_id).execute()
+            await self.run('update_country', self.backend.update, 'countries', updates, {'id': country_id})
+            self._write_through_country(country_id, updates)
             return True
         except Exception as e:
             print(f"Erreur mise à jour pays: {e}")
             return False
-    
+
     async def get_all_countries(self) -> List[Dict[str, Any]]:
         """Récupérer tous les pays"""
         try:
-            result = self.supabase.table('countries').select('*').execute()
-            return result.data if result.data else []
+            countries = await self.run('get_all_countries', self.backend.select, 'countries')
+            for country in countries:
+                self.country_cache.set(country['id'], country)
+            self.country_names.rebuild(countries)
+            return countries
         except Exception as e:
             print(f"Erreur récupération tous pays: {e}")
             return []
-    
+
     async def get_available_countries(self) -> List[Dict[str, Any]]:
         """Récupérer tous les pays non verrouillés"""
         try:
-            result = self.supabase.table('countries').select('*').eq('is_locked', False).execute()
-            return result.data if result.data else []
+            countries = await self.run('get_available_countries', self.backend.select, 'countries', filters={'is_locked': False})
+            for country in countries:
+                self._cache_country(country)
+            return countries
         except Exception as e:
             print(f"Erreur récupération pays disponibles: {e}")
             return []
-    
+
     async def lock_country(self, country_id: str) -> bool:
         """Verrouiller un pays"""
         try:
-            self.supabase.table('countries').update({'is_locked': True}).eq('id', country_id).execute()
+            await self.run('lock_country', self.backend.update, 'countries', {'is_locked': True}, {'id': country_id})
+            self.country_cache.update(country_id, {'is_locked': True})
             return True
         except Exception as e:
             print(f"Erreur verrouillage pays: {e}")
             return False
-    
+
     async def unlock_country(self, country_id: str) -> bool:
         """Déverrouiller un pays"""
         try:
-            self.supabase.table('countries').update({'is_locked': False}).eq('id', country_id).execute()
+            await self.run('unlock_country', self.backend.update, 'countries', {'is_locked': False}, {'id': country_id})
+            self.country_cache.update(country_id, {'is_locked': False})
             return True
         except Exception as e:
             print(f"Erreur déverrouillage pays: {e}")
             return False
-    
+
+    async def delete_country(self, country_id: str) -> bool:
+        """Supprimer définitivement un pays (les joueurs sont expulsés avant)"""
+        try:
+            await self.expel_country_players(country_id)
+            await self.run('delete_country', self.backend.delete, 'countries', {'id': country_id})
+            self._uncache_country(country_id)
+            return True
+        except Exception as e:
+            print(f"Erreur suppression pays: {e}")
+            return False
+
+    async def get_country_players(self, country_id: str, columns: str = '*') -> List[Dict[str, Any]]:
+        """Récupérer les joueurs d'un pays"""
+        try:
+            return await self.run('get_country_players', self.backend.select, 'players', columns, {'country_id': country_id})
+        except Exception as e:
+            print(f"Erreur récupération joueurs du pays: {e}")
+            return []
+
+    async def get_all_players(self, columns: str = '*') -> List[Dict[str, Any]]:
+        """Récupérer tous les joueurs"""
+        try:
+            return await self.run('get_all_players', self.backend.select, 'players', columns)
+        except Exception as e:
+            print(f"Erreur récupération tous joueurs: {e}")
+            return []
+
+    async def expel_country_players(self, country_id: str) -> bool:
+        """Expulser tous les joueurs d'un pays (redeviennent recrues)"""
+        try:
+            await self.run('expel_country_players', self.backend.update, 'players', {
+                'country_id': None,
+                'role': 'recruit'
+            }, {'country_id': country_id})
+            self.invalidate_players()
+            return True
+        except Exception as e:
+            print(f"Erreur expulsion joueurs: {e}")
+            return False
+
     # ===== WARS =====
     async def create_war(self, attacker_id: str, defender_id: str) -> Dict[str, Any]:
         """Créer une nouvelle guerre"""
         try:
-            result = self.supabase.table('wars').insert({
+            rows = await self.run('create_war', self.backend.insert, 'wars', {
                 'attacker_id': attacker_id,
                 'defender_id': defender_id
-            }).execute()
-            return result.data[0] if result.data else None
+            })
+            return rows[0] if rows else None
         except Exception as e:
             print(f"Erreur création guerre: {e}")
             return None
-    
+
     async def get_active_wars(self, country_id: str) -> List[Dict[str, Any]]:
         """Récupérer les guerres actives d'un pays"""
         try:
-            result = self.supabase.table('wars').select('*').or_(
-                f'attacker_id.eq.{country_id},defender_id.eq.{country_id}'
-            ).is_('ended_at', 'null').execute()
-            return result.data if result.data else []
+            return await self.run(
+                'get_active_wars', self.backend.select, 'wars',
+                filters={'ended_at': None},
+                any_of=[{'attacker_id': country_id}, {'defender_id': country_id}]
+            )
         except Exception as e:
             print(f"Erreur récupération guerres actives: {e}")
             return []
-    
+
+    async def end_war(self, war_id: str, winner_id: Optional[str], summary: str) -> bool:
+        """Clôturer une guerre avec son vainqueur"""
+        try:
+            await self.run('end_war', self.backend.update, 'wars', {
+                'ended_at': datetime.utcnow().isoformat(),
+                'winner_id': winner_id,
+                'summary': summary
+            }, {'id': war_id})
+            return True
+        except Exception as e:
+            print(f"Erreur clôture guerre: {e}")
+            return False
+
+    async def end_country_wars(self, country_id: str, summary: str) -> bool:
+        """Terminer toutes les guerres actives d'un pays"""
+        try:
+            await self.run(
+                'end_country_wars', self.backend.update, 'wars',
+                {'ended_at': datetime.utcnow().isoformat(), 'summary': summary},
+                {'ended_at': None},
+                [{'attacker_id': country_id}, {'defender_id': country_id}]
+            )
+            return True
+        except Exception as e:
+            print(f"Erreur fin des guerres du pays: {e}")
+            return False
+
+    # ===== EVENTS =====
+    async def create_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Enregistrer un événement"""
+        try:
+            rows = await self.run('create_event', self.backend.insert, self.table_events, event)
+            return rows[0] if rows else None
+        except Exception as e:
+            print(f"Erreur sauvegarde événement: {e}")
+            return None
+
+    async def get_country_events(self, country_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Récupérer les événements récents d'un pays"""
+        try:
+            return await self.run(
+                'get_country_events', self.backend.select, self.table_events,
+                filters={'target_country': country_id}, order='created_at', desc=True, limit=limit
+            )
+        except Exception as e:
+            print(f"Erreur récupération événements: {e}")
+            return []
+
     # ===== ALLIANCES =====
     async def create_alliance(self, name: str, leader_id: str) -> Dict[str, Any]:
         """Créer une nouvelle alliance"""
         try:
-            result = self.supabase.table('alliances').insert({
+            rows = await self.run('create_alliance', self.backend.insert, 'alliances', {
                 'name': name,
                 'members': [leader_id]
-            }).execute()
-            return result.data[0] if result.data else None
+            })
+            return rows[0] if rows else None
         except Exception as e:
             print(f"Erreur création alliance: {e}")
             return None
-    
+
     async def get_alliance(self, alliance_id: str) -> Optional[Dict[str, Any]]:
         """Récupérer une alliance par son ID"""
         try:
-            result = self.supabase.table('alliances').select('*').eq('id', alliance_id).execute()
-            return result.data[0] if result.data else None
+            rows = await self.run('get_alliance', self.backend.select, 'alliances', filters={'id': alliance_id})
+            return rows[0] if rows else None
         except Exception as e:
             print(f"Erreur récupération alliance: {e}")
             return None
-    
+
     async def join_alliance(self, alliance_id: str, country_id: str) -> bool:
         """Rejoindre une alliance"""
         try:
@@ -209,7 +498,7 @@ class DatabaseManager:
                 members = alliance.get('members', [])
                 if country_id not in members:
                     members.append(country_id)
-                    self.supabase.table('alliances').update({'members': members}).eq('id', alliance_id).execute()
+                    await self.run('join_alliance', self.backend.update, 'alliances', {'members': members}, {'id': alliance_id})
                     return True
             return False
         except Exception as e:
@@ -217,48 +506,172 @@ class DatabaseManager:
             return False
 
     # ===== ECONOMY & TRANSACTIONS =====
-    async def log_transaction(self, tx: Dict[str, Any]) -> bool:
-        """Enregistrer une transaction économique si la table existe."""
+    async def apply_resource_delta(self, country_id: str, deltas: Dict[str, Any], floor: float = 0,
+                                   clamp: bool = False) -> Optional[Dict[str, Any]]:
+        """Appliquer atomiquement des deltas {ressource: delta} aux ressources d'un pays.
+
+        Retourne les nouvelles ressources, ou None si un solde passerait sous `floor`
+        (aucune modification dans ce cas) ou en cas d'erreur. Avec clamp=True, les soldes
+        sont ramenés à `floor` au lieu de refuser l'opération. Lève OutcomeUnknownError
+        si le délai est dépassé (l'écriture a pu être validée : ne pas la rejouer).
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            country = await self.get_country(country_id)
+            return country.get('resources', {}) if country else None
         try:
-            self.supabase.table(self.table_transactions).insert(tx).execute()
-            return True
+            resources = await self.run('apply_resource_delta', self.backend.apply_resource_delta, country_id, deltas, floor, clamp)
+        except asyncio.TimeoutError:
+            # Issue inconnue : ni refus ni succès, et le cache ne peut plus être cru
+            self.country_cache.delete(country_id)
+            raise OutcomeUnknownError()
         except Exception as e:
-            print(f"Erreur log transaction: {e}")
-            return False
+            print(f"Erreur delta ressources: {e}")
+            return None
+        if resources is None:
+            return None
+        self._write_through_country(country_id, {'resources': resources})
+        return resources
+
+    async def apply_resource_deltas_bulk(self, deltas_by_country: Dict[str, Dict[str, Any]], floor: float = 0) -> int:
+        """Appliquer des deltas à de nombreux pays en un seul appel (soldes ramenés à `floor`).
+
+        Retourne le nombre de pays mis à jour.
+        """
+        items = [
+            {'id': country_id, 'deltas': {k: v for k, v in deltas.items() if v}}
+            for country_id, deltas in deltas_by_country.items()
+        ]
+        items = [item for item in items if item['deltas']]
+        if not items:
+            return 0
+        try:
+            updated = await self.run('apply_resource_deltas_bulk', self.backend.apply_resource_deltas_bulk, items, floor)
+        except Exception as e:
+            print(f"Erreur deltas groupés: {e}")
+            return 0
+        # Les soldes exacts ne sont connus que côté base : on invalide plutôt que d'écrire
+        for item in items:
+            self.country_cache.delete(item['id'])
+        return updated
+
+    async def bulk_add_country_resource(self, resource: str, amount: float, country_ids: Optional[List[str]] = None,
+                                        floor: float = 0) -> int:
+        """Don groupé d'une ressource à tous les pays (ou country_ids) en une requête ; retourne le nombre modifié"""
+        try:
+            updated = await self.run('bulk_add_country_resource', self.backend.bulk_add_country_resource, resource, amount, country_ids, floor)
+        except Exception as e:
+            print(f"Erreur don groupé pays: {e}")
+            return 0
+        if country_ids is None:
+            self.country_cache.clear()
+        else:
+            for country_id in country_ids:
+                self.country_cache.delete(country_id)
+        return updated
+
+    async def bulk_add_player_balance(self, amount: float, player_ids: Optional[List[str]] = None,
+                                      country_id: Optional[str] = None, floor: float = 0) -> int:
+        """Ajout groupé au solde des joueurs (tous, player_ids ou ceux d'un pays) ; retourne le nombre modifié"""
+        try:
+            updated = await self.run('bulk_add_player_balance', self.backend.bulk_add_player_balance, amount, player_ids, country_id, floor)
+        except Exception as e:
+            print(f"Erreur don groupé joueurs: {e}")
+            return 0
+        self.invalidate_players()
+        return updated
+
+    async def transfer(self, from_country: str, to_country: str, deltas: Dict[str, Any], fee: float = 0,
+                       clamp: bool = False, tx: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Transférer des ressources entre deux pays en une seule transaction serveur.
+
+        Les deltas positifs passent de `from_country` à `to_country`, les négatifs dans l'autre
+        sens ; `fee` (argent) est prélevé en plus chez `from_country`. `tx` est la ligne de
+        transactions enregistrée dans la même transaction ('receive' par défaut : les montants
+        réellement transférés). Retourne {'from', 'to', 'moved'}
+        ou None si un solde est insuffisant (rien n'est modifié) ou en cas d'erreur ;
+        OutcomeUnknownError si le délai est dépassé.
+        """
+        deltas = {k: v for k, v in deltas.items() if v}
+        try:
+            result = await self.run('transfer', self.backend.transfer_resources, from_country, to_country, deltas, fee, clamp, tx)
+        except asyncio.TimeoutError:
+            self.country_cache.delete(from_country)
+            self.country_cache.delete(to_country)
+            raise OutcomeUnknownError()
+        except Exception as e:
+            print(f"Erreur transfert ressources: {e}")
+            return None
+        if not result:
+            return None
+        if tx:
+            # Transaction insérée avec le transfert : compteurs mis à jour par trigger côté base
+            self.daily_counters.record(transfer_tx(tx, result['moved']))
+        self._write_through_country(from_country, {'resources': result['from']})
+        self._write_through_country(to_country, {'resources': result['to']})
+        return result
+
+    async def log_transaction(self, tx: Dict[str, Any]) -> bool:
+        """Enregistrer une transaction économique (mise en file, insérée par lot)."""
+        self.tx_writer.submit(tx)
+        # Les caps voient la transaction immédiatement, sans attendre l'insertion
+        self.daily_counters.record(tx)
+        return True
+
+    async def insert_transactions(self, rows: List[Dict[str, Any]]):
+        """Insertion groupée de transactions (lève l'exception en cas d'échec)"""
+        await self.run('insert_transactions', self.backend.insert, self.table_transactions, rows)
 
     async def get_daily_totals(self, player_id: Optional[str] = None, country_id: Optional[str] = None) -> Dict[str, Any]:
-        """Récupérer les totaux journaliers de production/travail/commerce pour caps."""
+        """Récupérer les totaux journaliers de production/travail/commerce pour caps.
+
+        Lecture O(1) : miroir mémoire, sinon table daily_counters, sinon (table absente)
+        agrégation des transactions du jour.
+        """
+        scope, scope_id = ('player', player_id) if player_id else ('country', country_id)
+        if not scope_id:
+            return empty_totals()
+        scope_id = str(scope_id)
+        totals = self.daily_counters.get(scope, scope_id)
+        if totals is not None:
+            return totals
+        today = utc_day()
         try:
-            from datetime import datetime, timedelta
-            today = datetime.utcnow().date().isoformat()
-            q = self.supabase.table(self.table_transactions).select('*').gte('created_at', today)
+            rows = await self.run(
+                'get_daily_totals', self.backend.select, 'daily_counters', 'key,value',
+                {'day': today, 'scope': scope, 'scope_id': scope_id}
+            )
+            totals = totals_from_counters(rows)
+        except Exception as e:
+            print(f"Compteurs journaliers indisponibles ({e}), agrégation des transactions")
+            totals = await self._scan_daily_totals(today, player_id, country_id)
+            if totals is None:
+                return empty_totals()
+        self.daily_counters.load(scope, scope_id, totals, today)
+        return totals
+
+    async def _scan_daily_totals(self, today: str, player_id: Optional[str], country_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Ancien calcul : somme des transactions depuis minuit UTC"""
+        try:
+            filters = {'created_at': ('gte', today)}
             if player_id:
-                q = q.eq('player_id', player_id)
-            if country_id:
-                q = q.eq('country_id', country_id)
-            res = q.execute()
-            totals = {'work': 0, 'produce': {}, 'trade_value': 0}
-            for r in (res.data or []):
-                ttype = r.get('type')
-                if ttype == 'work':
-                    totals['work'] += (r.get('amount', 0) or 0)
-                elif ttype == 'produce':
-                    res_name = r.get('resource')
-                    amt = r.get('amount', 0) or 0
-                    totals['produce'][res_name] = totals['produce'].get(res_name, 0) + amt
-                elif ttype == 'trade':
-                    totals['trade_value'] += abs(r.get('value', 0) or 0)
+                filters['player_id'] = player_id
+            elif country_id:
+                filters['country_id'] = country_id
+            rows = await self.run('_scan_daily_totals', self.backend.select, self.table_transactions, 'type,resource,amount,value', filters)
+            totals = empty_totals()
+            for r in rows:
+                add_transaction(totals, r)
             return totals
         except Exception as e:
             print(f"Erreur get daily totals: {e}")
-            return {'work': 0, 'produce': {}, 'trade_value': 0}
+            return None
 
     # ===== ELEMENTS =====
     async def create_element(self, element_data: Dict[str, Any], player_id: str, country_id: str) -> Optional[Dict[str, Any]]:
         """Créer un nouvel élément dans la base de données"""
         try:
-            from datetime import datetime
-            result = self.supabase.table(self.table_elements).insert({
+            rows = await self.run('create_element', self.backend.insert, self.table_elements, {
                 'name': element_data.get('name'),
                 'type': element_data.get('type'),
                 'category': element_data.get('category'),
@@ -272,8 +685,8 @@ class DatabaseManager:
                 'country_id': country_id,
                 'created_at': datetime.utcnow().isoformat(),
                 'built': False
-            }).execute()
-            return result.data[0] if result.data else None
+            })
+            return rows[0] if rows else None
         except Exception as e:
             print(f"Erreur création élément: {e}")
             return None
@@ -281,11 +694,10 @@ class DatabaseManager:
     async def get_elements_by_country(self, country_id: str, built_only: bool = False) -> List[Dict[str, Any]]:
         """Récupérer tous les éléments d'un pays"""
         try:
-            q = self.supabase.table(self.table_elements).select('*').eq('country_id', country_id)
+            filters = {'country_id': country_id}
             if built_only:
-                q = q.eq('built', True)
-            result = q.order('created_at', desc=True).execute()
-            return result.data if result.data else []
+                filters['built'] = True
+            return await self.run('get_elements_by_country', self.backend.select, self.table_elements, filters=filters, order='created_at', desc=True)
         except Exception as e:
             print(f"Erreur récupération éléments: {e}")
             return []
@@ -293,8 +705,8 @@ class DatabaseManager:
     async def get_element_by_id(self, element_id: str) -> Optional[Dict[str, Any]]:
         """Récupérer un élément par son ID"""
         try:
-            result = self.supabase.table(self.table_elements).select('*').eq('id', element_id).execute()
-            return result.data[0] if result.data else None
+            rows = await self.run('get_element_by_id', self.backend.select, self.table_elements, filters={'id': element_id})
+            return rows[0] if rows else None
         except Exception as e:
             print(f"Erreur récupération élément: {e}")
             return None
@@ -302,11 +714,10 @@ class DatabaseManager:
     async def mark_element_built(self, element_id: str) -> bool:
         """Marquer un élément comme construit"""
         try:
-            from datetime import datetime
-            self.supabase.table(self.table_elements).update({
+            await self.run('mark_element_built', self.backend.update, self.table_elements, {
                 'built': True,
                 'built_at': datetime.utcnow().isoformat()
-            }).eq('id', element_id).execute()
+            }, {'id': element_id})
             return True
         except Exception as e:
             print(f"Erreur marquage élément construit: {e}")
@@ -315,14 +726,28 @@ class DatabaseManager:
     async def get_all_elements(self, rarity_filter: Optional[str] = None) -> List[Dict[str, Any]]:
         """Récupérer tous les éléments (option: filtrer par rareté)"""
         try:
-            q = self.supabase.table(self.table_elements).select('*')
-            if rarity_filter:
-                q = q.eq('rarity', rarity_filter)
-            result = q.order('created_at', desc=True).limit(50).execute()
-            return result.data if result.data else []
+            filters = {'rarity': rarity_filter} if rarity_filter else None
+            return await self.run(
+                'get_all_elements', self.backend.select, self.table_elements, filters=filters, order='created_at', desc=True, limit=50
+            )
         except Exception as e:
             print(f"Erreur récupération tous éléments: {e}")
             return []
 
+    # ===== SAUVEGARDES =====
+    async def backup(self, full: bool = False) -> Optional[Dict[str, Any]]:
+        """Sauvegarde incrémentale dans un thread à part (le pool de requêtes reste libre pour le jeu)"""
+        try:
+            # Les transactions en attente font partie de la sauvegarde
+            await self.tx_writer.flush()
+            started = time.perf_counter()
+            entry = await asyncio.to_thread(self.backups.run, full)
+            metrics.record('backup', (time.perf_counter() - started) * 1000, entry['rows'], entry['bytes'],
+                           detail=entry['file'])
+            return entry
+        except Exception as e:
+            print(f"Erreur sauvegarde: {e}")
+            return None
+
 # Instance globale
 db = DatabaseManager()
@@ -0,0 +1,122 @@
+"""
+Journal des transactions en écriture différée (write-behind) : les lignes sont
+mises en file en mémoire puis insérées par lots (seuil de taille ou de temps)
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+class TransactionWriter:
+    """File de transactions vidée par insertions groupées"""
+
+    def __init__(self, insert_rows: Callable, batch_size: int = 50, flush_interval: float = 2.0,
+                 max_queue: int = 10000):
+        # insert_rows(rows) : coroutine d'insertion groupée (lève une exception en cas d'échec)
+        self._insert_rows = insert_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending_flush: Optional[asyncio.Task] = None
+        # Statistiques
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failures = 0
+        self.dropped = 0
+        self.unknown = 0
+        self.last_flush_ms = 0.0
+        self._flush_seconds = 0.0
+
+    def submit(self, tx: Dict[str, Any]):
+        """Mettre une transaction en file (aucun aller-retour réseau)"""
+        row = dict(tx)
+        # Horodatage à la soumission : l'insertion peut arriver quelques secondes plus tard
+        row.setdefault('created_at', datetime.utcnow().isoformat())
+        self._queue.append(row)
+        if len(self._queue) > self.max_queue:
+            del self._queue[0]
+            self.dropped += 1
+        self._ensure_started()
+        if len(self._queue) >= self.batch_size and (self._pending_flush is None or self._pending_flush.done()):
+            self._pending_flush = asyncio.create_task(self.flush())
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Insérer tout ce qui est en file ; retourne le nombre de lignes écrites"""
+        async with self._flush_lock:
+            if not self._queue:
+                return 0
+            rows, self._queue = self._queue, []
+            started = time.perf_counter()
+            written, abandoned = set(), set()
+            group: List[Dict[str, Any]] = []
+            try:
+                # PostgREST déduit les colonnes d'un lot : on groupe par jeu de colonnes
+                groups: Dict[tuple, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    groups.setdefault(tuple(sorted(row)), []).append(row)
+                for group in groups.values():
+                    await self._insert_rows(group)
+                    written.update(id(row) for row in group)
+            except asyncio.TimeoutError:
+                # Délai dépassé : le thread du pool a pu valider le lot. Le réinsérer
+                # dupliquerait les lignes (et les daily_counters) : il est abandonné et compté
+                self.failures += 1
+                self.unknown += len(group)
+                abandoned.update(id(row) for row in group)
+                pending = [row for row in rows if id(row) not in written and id(row) not in abandoned]
+                self._requeue(pending)
+                print(f"Délai dépassé à l'écriture de {len(group)} transactions (issue inconnue, "
+                      f"non réessayées ; {len(pending)} en attente)")
+            except Exception as e:
+                self.failures += 1
+                # Remettre en tête de file ce qui n'a pas été écrit (borné par max_queue)
+                pending = [row for row in rows if id(row) not in written]
+                self._requeue(pending)
+                print(f"Erreur écriture transactions ({len(pending)} en attente): {e}")
+            finally:
+                elapsed = time.perf_counter() - started
+                self.flushes += 1
+                self.flushed_rows += len(written)
+                self.last_flush_ms = elapsed * 1000
+                self._flush_seconds += elapsed
+            return len(written)
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        self._queue = rows + self._queue
+        overflow = len(self._queue) - self.max_queue
+        if overflow > 0:
+            del self._queue[:overflow]
+            self.dropped += overflow
+
+    async def close(self):
+        """Arrêter la boucle périodique et vider la file"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': len(self._queue),
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'unknown': self.unknown,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'avg_flush_ms': round(self._flush_seconds / self.flushes * 1000, 2) if self.flushes else 0.0
+        }
@@ -6,6 +6,8 @@ Remplace les anciens start_both.py et main.py.
 
 import os
 import sys
+import atexit
+import subprocess
 import threading
 import time
 import asyncio
@@ -19,9 +21,10 @@ except Exception:
     pass
 
 def check_env():
-    required_vars = [
-        'DISCORD_TOKEN', 'DISCORD_GUILD_ID', 'SUPABASE_URL', 'SUPABASE_KEY', 'ADMIN_ROLE_IDS'
-    ]
+    required_vars = ['DISCORD_TOKEN', 'DISCORD_GUILD_ID', 'ADMIN_ROLE_IDS']
+    # Le moteur SQLite local n'a pas besoin des identifiants Supabase
+    if os.getenv('DB_BACKEND', 'supabase').lower() != 'sqlite':
+        required_vars += ['SUPABASE_URL', 'SUPABASE_KEY']
     missing = [v for v in required_vars if not os.getenv(v)]
     if missing:
         print("❌ Variables d'environnement manquantes :")
@@ -32,10 +35,36 @@ def check_env():
 
 def start_web():
     # Démarre le panel web (import absolu pour les analyseurs statiques)
-    from web.app import socketio, app
     port = int(os.environ.get('PORT', 5000))
+    if os.getenv('WEB_SERVER', 'werkzeug').lower() == 'gunicorn':
+        start_web_gunicorn(port)
+        return
+    from web.app import socketio, app
     socketio.run(app, debug=False, host='0.0.0.0', port=port, allow_unsafe_werkzeug=True)
 
+# Classe de worker gunicorn selon PANEL_ASYNC_MODE (web.wsgi n'est pas importé ici :
+# il applique le monkey-patching eventlet/gevent, incompatible avec la boucle du bot)
+GUNICORN_WORKERS = {
+    'eventlet': 'eventlet',
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+}
+
+def start_web_gunicorn(port: int):
+    # Panel servi par gunicorn dans un processus séparé (WebSocket natif, un seul worker)
+    async_mode = os.getenv('PANEL_ASYNC_MODE', 'threading')
+    if async_mode == 'threading':
+        worker_args = ['--worker-class', 'gthread', '--threads', os.getenv('WEB_THREADS', '100')]
+    else:
+        worker_args = ['--worker-class', GUNICORN_WORKERS.get(async_mode, async_mode)]
+    cmd = [
+        sys.executable, '-m', 'gunicorn', 'web.wsgi:app',
+        '--bind', f'0.0.0.0:{port}', '--workers', '1', '--timeout', '120', *worker_args
+    ]
+    print(f"🌐 Panel web via gunicorn ({async_mode}) sur le port {port}")
+    process = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)))
+    atexit.register(process.terminate)
+    process.wait()
+
 async def start_bot_async():
     # Démarre le bot Discord (reprend la logique de main.py)
     import discord
@@ -62,6 +91,9 @@ async def start_bot_async():
                     print(f"✅ Cog chargé: {cog}")
                 except Exception as e:
                     print(f"❌ Erreur lors du chargement de {cog}: {e}")
+            # Préchauffe l'index des noms de pays (autocomplétion)
+            from db.supabase import db
+            await db.refresh_country_index()
             if DISCORD_GUILD_ID:
                 guild = discord.Object(id=DISCORD_GUILD_ID)
                 self.tree.copy_global_to(guild=guild)
@@ -75,6 +107,11 @@ async def start_bot_async():
             print(f"📊 Connecté à {len(self.guilds)} serveur(s)")
             activity = discord.Activity(type=discord.ActivityType.playing, name="World Dominion - Stratégie Mondiale")
             await self.change_presence(activity=activity)
+        async def close(self):
+            await super().close()
+            # Libère le pool de threads de la couche base de données
+            from db.supabase import db
+            await db.close()
         async def on_command_error(self, ctx, error):
             from discord.ext import commands as _commands
             if isinstance(error, _commands.CommandNotFound):
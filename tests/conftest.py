@@ -0,0 +1,25 @@
+"""
+Configuration commune des tests : moteur SQLite sur des fichiers temporaires, jamais Supabase
+"""
+import os
+import sys
+import tempfile
+
+# Avant tout import de config/db.supabase : l'instance globale `db` utilise aussi SQLite
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', os.path.join(tempfile.mkdtemp(prefix='wd-tests-'), 'world.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from db.backends.sqlite_backend import SQLiteBackend
+
+@pytest.fixture
+def backend(tmp_path):
+    """Base SQLite vierge avec deux pays"""
+    storage = SQLiteBackend(str(tmp_path / 'world.db'))
+    storage.insert('countries', [
+        {'id': 'alpha', 'name': 'Alpha', 'resources': {'money': 1000, 'food': 50}},
+        {'id': 'beta', 'name': 'Beta', 'resources': {'money': 200}},
+    ])
+    yield storage
+    storage.close()
@@ -0,0 +1,55 @@
+"""
+Flux de changements du panel : deltas entre relectures de l'instantané
+"""
+from web.change_feed import ChangeFeed
+
+def world(countries, players=()):
+    return {'countries': list(countries), 'players': list(players), 'wars': [], 'events': [], 'elements': []}
+
+def test_diff_reports_inserts_updates_and_deletes():
+    feed = ChangeFeed()
+    feed.ingest(world([{'id': 'a', 'name': 'Alpha'}, {'id': 'b', 'name': 'Beta'}]))
+    start = feed.version
+
+    feed.ingest(world([{'id': 'a', 'name': 'Alpha II'}, {'id': 'c', 'name': 'Gamma'}]))
+    delta = feed.changes_since(start, feed.epoch)
+
+    countries = delta['changes']['countries']
+    assert sorted(row['id'] for row in countries['upserts']) == ['a', 'c']
+    assert countries['deletes'] == ['b']
+    assert 'players' not in delta['changes']
+
+def test_unchanged_reread_is_not_a_change():
+    feed = ChangeFeed()
+    data = world([{'id': 'a', 'name': 'Alpha', 'resources': {'money': 1}}])
+    feed.ingest(data)
+    version = feed.version
+    feed.ingest(world([{'id': 'a', 'name': 'Alpha', 'resources': {'money': 1}}]))
+    assert feed.version == version
+    assert feed.changes_since(version, feed.epoch)['changes'] == {}
+
+def test_only_latest_state_of_a_row_is_sent():
+    feed = ChangeFeed()
+    feed.ingest(world([{'id': 'a', 'stability': 50}]))
+    start = feed.version
+    feed.ingest(world([{'id': 'a', 'stability': 40}]))
+    feed.ingest(world([{'id': 'a', 'stability': 30}]))
+    assert feed.changes_since(start, feed.epoch)['changes']['countries']['upserts'] == [{'id': 'a', 'stability': 30}]
+
+def test_snapshot_required_for_unknown_epoch_or_trimmed_log():
+    feed = ChangeFeed(log_size=2)
+    for stability in range(5):
+        feed.ingest(world([{'id': 'a', 'stability': stability}]))
+    assert feed.changes_since(feed.version, 'autre-processus') is None
+    # Versions sorties du journal borné : le client doit recharger l'instantané complet
+    assert feed.changes_since(0, feed.epoch) is None
+    assert feed.changes_since(feed.version - 1, feed.epoch) is not None
+
+def test_listeners_receive_old_and_new_rows():
+    feed = ChangeFeed()
+    seen = []
+    feed.subscribe(lambda table, key, old, new: seen.append((table, key, old, new)))
+    feed.ingest(world([{'id': 'a', 'stability': 50}]))
+    feed.ingest(world([]))
+    assert seen == [('countries', 'a', None, {'id': 'a', 'stability': 50}),
+                    ('countries', 'a', {'id': 'a', 'stability': 50}, None)]
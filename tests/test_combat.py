@@ -0,0 +1,41 @@
+"""
+Moteur de combat : reproductibilité par graine et cohérence avec la simulation Monte-Carlo
+"""
+import random
+
+import pytest
+
+from utils.combat import CombatEngine
+
+ATTACKER = {'name': 'Alpha', 'army_strength': 60, 'economy': 55, 'stability': 70, 'population': 500000,
+            'resources': {'money': 40000, 'metal': 3000, 'materials': 2000, 'food': 8000}}
+DEFENDER = {'name': 'Beta', 'army_strength': 45, 'economy': 65, 'stability': 60, 'population': 300000,
+            'resources': {'money': 25000, 'metal': 1000, 'materials': 500, 'food': 6000}}
+
+@pytest.fixture
+def engine():
+    return CombatEngine()
+
+def test_same_seed_same_result(engine):
+    assert engine.resolve(ATTACKER, DEFENDER, seed=42) == engine.resolve(ATTACKER, DEFENDER, seed=42)
+
+def test_resolve_draws_three_numbers_in_documented_order(engine):
+    rng = random.Random(7)
+    spread = engine.rules['randomness']
+    attacker_roll = rng.uniform(1 - spread, 1 + spread)
+    defender_roll = rng.uniform(1 - spread, 1 + spread)
+    result = engine.resolve(ATTACKER, DEFENDER, seed=7)
+    assert result['attacker_power'] == round(engine.base_power(ATTACKER) * attacker_roll, 2)
+    assert result['defender_power'] == round(engine.base_power(DEFENDER) * defender_roll, 2)
+
+def test_simulation_matches_resolve(engine):
+    pytest.importorskip('numpy')
+    from utils.war_simulation import simulate_war
+
+    simulation = simulate_war(ATTACKER, DEFENDER, trials=20000, seed=1, engine=engine)
+    assert simulation == {**simulate_war(ATTACKER, DEFENDER, trials=20000, seed=1, engine=engine),
+                          'elapsed_ms': simulation['elapsed_ms']}
+    wins = sum(engine.resolve(ATTACKER, DEFENDER, seed=seed)['winner'] == 'attacker' for seed in range(4000))
+    # Mêmes règles : la fréquence observée tombe près de la probabilité simulée
+    assert abs(wins / 4000 - simulation['attacker_win_probability']) < 0.04
+    assert simulation['attacker_base_power'] == round(engine.base_power(ATTACKER), 2)
@@ -0,0 +1,46 @@
+"""
+Pagination par curseur : paginate_query (moteur) et paginate_rows (instantané) avec des NULL
+"""
+import pytest
+
+from web.pagination import ListSpec, paginate_query, paginate_rows, parse_list_args
+
+SPEC = ListSpec(fields=['id', 'name', 'rarity'], sorts=['id', 'name', 'rarity'], filters=['rarity'], search='name')
+RARITIES = ['rare', None, 'commun', None, 'épique', 'rare', None, 'commun']
+
+@pytest.fixture
+def elements(backend):
+    rows = [{'id': f'e{i:02d}', 'name': f'Élément {i}', 'rarity': RARITIES[i % len(RARITIES)]} for i in range(23)]
+    backend.insert('elements', rows)
+    return rows
+
+def walk(fetch, args):
+    """Parcourir toutes les pages ; retourne les ids dans l'ordre reçu"""
+    args, ids = dict(args), []
+    while True:
+        page = fetch(parse_list_args(args, SPEC))
+        ids += [row['id'] for row in page['data']]
+        if not page['has_more']:
+            return ids
+        args['cursor'] = page['next_cursor']
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_keyset_pages_cover_null_sort_values(backend, elements, order):
+    args = {'sort': 'rarity', 'order': order, 'limit': '4'}
+    from_db = walk(lambda params: paginate_query(backend, 'elements', params, SPEC), args)
+    from_snapshot = walk(lambda params: paginate_rows(elements, params, SPEC), args)
+
+    assert sorted(from_db) == sorted(row['id'] for row in elements)
+    # Même ordre que la pagination en mémoire : NULL en dernier en croissant, en premier sinon
+    assert from_db == from_snapshot
+    nulls = [row['id'] for row in elements if row['rarity'] is None]
+    if order == 'asc':
+        assert set(from_db[-len(nulls):]) == set(nulls)
+    else:
+        assert set(from_db[:len(nulls)]) == set(nulls)
+
+def test_filters_and_search(backend, elements):
+    page = paginate_query(backend, 'elements', parse_list_args({'rarity': 'rare', 'limit': '50'}, SPEC), SPEC)
+    assert {row['rarity'] for row in page['data']} == {'rare'}
+    page = paginate_query(backend, 'elements', parse_list_args({'q': 'MENT 1', 'limit': '50'}, SPEC), SPEC)
+    assert len(page['data']) == 11
@@ -0,0 +1,90 @@
+"""
+Opérations atomiques du moteur SQLite (et de l'implémentation par défaut de StorageBackend)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db.backends.base import StorageBackend
+
+def money(backend, country_id):
+    return backend.select('countries', 'resources', {'id': country_id})[0]['resources'].get('money', 0)
+
+def test_concurrent_debits_never_go_below_floor(backend):
+    start = threading.Barrier(20)
+
+    def debit(_):
+        start.wait()
+        return backend.apply_resource_delta('beta', {'money': -15})
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(debit, range(20)))
+
+    applied = [r for r in results if r is not None]
+    # 200 // 15 débits passent, les autres sont refusés sans rien modifier
+    assert len(applied) == 13
+    assert money(backend, 'beta') == 200 - 13 * 15
+
+def test_concurrent_credits_are_not_lost(backend):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: backend.apply_resource_delta('alpha', {'money': 1}), range(100)))
+    assert money(backend, 'alpha') == 1100
+
+def test_delta_clamp_and_floor(backend):
+    assert backend.apply_resource_delta('beta', {'money': -500}) is None
+    assert money(backend, 'beta') == 200
+    assert backend.apply_resource_delta('beta', {'money': -500}, clamp=True)['money'] == 0
+    assert backend.apply_resource_delta('alpha', {'money': -950}, floor=100) is None
+
+def test_transfer_refused_without_clamp(backend):
+    assert backend.transfer_resources('beta', 'alpha', {'money': 500}) is None
+    assert money(backend, 'beta') == 200
+    assert money(backend, 'alpha') == 1000
+    assert backend.select('transactions') == []
+
+def test_clamped_transfer_logs_moved_amounts(backend):
+    result = backend.transfer_resources('beta', 'alpha', {'money': 500, 'food': 10}, clamp=True,
+                                        tx={'type': 'war', 'country_id': 'alpha', 'target_country_id': 'beta'})
+    assert result['moved'] == {'money': 200, 'food': 0}
+    assert money(backend, 'beta') == 0
+    assert money(backend, 'alpha') == 1200
+    [tx] = backend.select('transactions')
+    assert tx['type'] == 'war'
+    assert tx['receive'] == {'money': 200, 'food': 0}
+
+def test_transfer_keeps_explicit_receive(backend):
+    backend.transfer_resources('beta', 'alpha', {'money': 100, 'food': -20}, fee=10,
+                               tx={'type': 'trade', 'give': {'money': 100}, 'receive': {'food': 20}})
+    [tx] = backend.select('transactions')
+    assert tx['receive'] == {'food': 20}
+    assert money(backend, 'beta') == 90
+
+def test_concurrent_transfers_conserve_money(backend):
+    def shuffle(i):
+        src, dst = ('alpha', 'beta') if i % 2 else ('beta', 'alpha')
+        backend.transfer_resources(src, dst, {'money': 7}, clamp=True)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(shuffle, range(200)))
+    assert money(backend, 'alpha') + money(backend, 'beta') == 1200
+
+def test_fallback_transfer_logs_moved_amounts(backend):
+    # Implémentation par défaut (verrous par pays + CRUD), utilisée sans RPC Supabase
+    result = StorageBackend.transfer_resources(backend, 'beta', 'alpha', {'money': 300}, clamp=True,
+                                               tx={'type': 'spy'})
+    assert result['moved'] == {'money': 200}
+    [tx] = backend.select('transactions')
+    assert tx['receive'] == {'money': 200}
+    assert money(backend, 'alpha') == 1200
+
+def test_select_orders_nulls_like_postgres(backend):
+    backend.insert('elements', [
+        {'id': 'e1', 'name': 'A', 'rarity': 'rare'},
+        {'id': 'e2', 'name': 'B', 'rarity': None},
+        {'id': 'e3', 'name': 'C', 'rarity': 'commun'},
+    ])
+    ascending = backend.select('elements', 'id', order='rarity,id')
+    descending = backend.select('elements', 'id', order='rarity,id', desc=True)
+    assert [r['id'] for r in ascending] == ['e3', 'e1', 'e2']
+    assert [r['id'] for r in descending] == ['e2', 'e1', 'e3']
+    assert [r['id'] for r in backend.select('elements', 'id', {'rarity': ('neq', None)}, order='id')] == ['e1', 'e3']
+    assert [r['id'] for r in backend.select('elements', 'id', {'rarity': None})] == ['e2']
@@ -0,0 +1,66 @@
+"""
+Journal des transactions en écriture différée : remise en file après échec, abandon après délai
+"""
+import asyncio
+
+from db.tx_writer import TransactionWriter
+
+class FlakyInsert:
+    """insert_rows qui lève successivement les exceptions données, puis réussit"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.batches = []
+
+    async def __call__(self, rows):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.batches.append(rows)
+
+def test_failed_batch_is_requeued_and_written_once():
+    async def scenario():
+        insert = FlakyInsert(RuntimeError('réseau'))
+        writer = TransactionWriter(insert, batch_size=1000, flush_interval=60)
+        for i in range(3):
+            writer.submit({'type': 'work', 'amount': i})
+        assert await writer.flush() == 0
+        assert writer.stats()['queue_depth'] == 3
+        assert await writer.flush() == 3
+        await writer.close()
+        return insert, writer
+
+    insert, writer = asyncio.run(scenario())
+    assert [row['amount'] for batch in insert.batches for row in batch] == [0, 1, 2]
+    assert writer.stats()['failures'] == 1
+
+def test_timed_out_batch_is_not_retried():
+    async def scenario():
+        insert = FlakyInsert(asyncio.TimeoutError())
+        writer = TransactionWriter(insert, batch_size=1000, flush_interval=60)
+        for i in range(3):
+            writer.submit({'type': 'work', 'amount': i})
+        # Autre jeu de colonnes : lot distinct, pas encore tenté au moment du délai
+        writer.submit({'type': 'trade', 'value': 10, 'fee': 1})
+        await writer.flush()
+        await writer.flush()
+        await writer.close()
+        return insert, writer
+
+    insert, writer = asyncio.run(scenario())
+    # Le lot expiré a pu être validé par la base : le réinsérer créerait des doublons
+    assert [row['type'] for batch in insert.batches for row in batch] == ['trade']
+    assert writer.stats()['unknown'] == 3
+    assert writer.stats()['queue_depth'] == 0
+
+def test_queue_is_bounded():
+    async def scenario():
+        writer = TransactionWriter(FlakyInsert(), batch_size=1000, flush_interval=60, max_queue=5)
+        for i in range(8):
+            writer.submit({'type': 'work', 'amount': i})
+        stats = writer.stats()
+        await writer.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats['queue_depth'] == 5
+    assert stats['dropped'] == 3
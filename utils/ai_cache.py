@@ -0,0 +1,194 @@
+"""
+Cache des générations IA adressé par contenu : un élément déjà généré pour le même type,
+le même nom normalisé et un contexte de pays comparable est resservi sans appel à Gemini.
+
+Deux niveaux : LRU + TTL en mémoire (db.cache.TTLCache) puis fichier SQLite persistant.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+from db.cache import TTLCache
+
+AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'data/ai_cache.db')
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', 7 * 24 * 3600))
+AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', 512))
+AI_CACHE_MAX_ROWS = int(os.getenv('AI_CACHE_MAX_ROWS', 20000))
+# Largeur des tranches de contexte (économie/stabilité/armée sur 100)
+CONTEXT_BUCKET = 25
+# Nettoyage du fichier (expirés, excédent) toutes les N écritures
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ai_cache_last_hit ON ai_cache (last_hit);
+"""
+
+def normalize_name(name: str) -> str:
+    """'  Uranium ', 'URANIUM', 'uranium' -> 'uranium' (accents et espaces ignorés)"""
+    text = unicodedata.normalize('NFKD', name or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())
+
+def context_bucket(context: Optional[Dict[str, Any]]) -> Optional[list]:
+    """Contexte grossier : tranches de 25 points, les valeurs exactes changent à chaque tick"""
+    if not context:
+        return None
+    bucket = []
+    for stat in ('economy', 'stability', 'army_strength'):
+        try:
+            value = float(context.get(stat) or 0)
+        except (TypeError, ValueError):
+            value = 0.0
+        bucket.append(min(int(value // CONTEXT_BUCKET), 100 // CONTEXT_BUCKET - 1))
+    return bucket
+
+def element_key(element_type: str, element_name: str, context: Optional[Dict[str, Any]] = None,
+                salt: str = '') -> str:
+    """Clé de contenu ; salt (empreinte du prompt) invalide le cache quand le prompt change"""
+    material = json.dumps([salt, normalize_name(element_type), normalize_name(element_name),
+                           context_bucket(context)], separators=(',', ':'))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class GenerationCache:
+    """Cache mémoire + SQLite des générations IA, avec compteurs de hits par niveau"""
+
+    def __init__(self, path: str = AI_CACHE_PATH, ttl: float = AI_CACHE_TTL, max_size: int = AI_CACHE_SIZE,
+                 max_rows: int = AI_CACHE_MAX_ROWS):
+        self.path = path
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.memory = TTLCache(max_size, ttl)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._stats_lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.disk_errors = 0
+        # Durée des générations réelles (pour estimer le temps économisé)
+        self.generation_seconds = 0.0
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        try:
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+            return conn
+        except sqlite3.Error as e:
+            self._count('disk_errors')
+            print(f"Erreur cache IA (ouverture {self.path}): {e}")
+            return None
+
+    def _count(self, name: str, amount: float = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Mémoire puis disque (une lecture SQLite par clé primaire) ; None si absent ou expiré"""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return self.get_disk(key)
+
+    def get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Niveau SQLite seul (bloquant : depuis une boucle asyncio, l'appeler dans un thread)"""
+        conn = self._conn()
+        if conn is not None:
+            try:
+                row = conn.execute('SELECT value, created_at FROM ai_cache WHERE key = ?', (key,)).fetchone()
+                if row and row[1] + self.ttl > time.time():
+                    conn.execute('UPDATE ai_cache SET last_hit = ?, hits = hits + 1 WHERE key = ?', (time.time(), key))
+                    value = json.loads(row[0])
+                    self.memory.set(key, value)
+                    self._count('disk_hits')
+                    return value
+            except (sqlite3.Error, ValueError) as e:
+                self._count('disk_errors')
+                print(f"Erreur cache IA (lecture): {e}")
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict[str, Any], generation_seconds: float = 0.0):
+        """Enregistrer une génération réussie (jamais un résultat de repli)"""
+        self.memory.set(key, value)
+        self._count('stores')
+        self._count('generation_seconds', generation_seconds)
+        conn = self._conn()
+        if conn is None:
+            return
+        try:
+            now = time.time()
+            conn.execute(
+                'INSERT INTO ai_cache (key, value, created_at, last_hit) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, created_at = excluded.created_at, '
+                'last_hit = excluded.last_hit',
+                (key, json.dumps(value, ensure_ascii=False, default=str), now, now)
+            )
+            if self.stores % PRUNE_EVERY == 0:
+                self.prune()
+        except sqlite3.Error as e:
+            self._count('disk_errors')
+            print(f"Erreur cache IA (écriture): {e}")
+
+    def prune(self) -> int:
+        """Supprimer les entrées expirées puis les moins récemment servies au-delà de max_rows"""
+        conn = self._conn()
+        if conn is None:
+            return 0
+        removed = conn.execute('DELETE FROM ai_cache WHERE created_at < ?', (time.time() - self.ttl,)).rowcount
+        removed += conn.execute(
+            'DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache ORDER BY last_hit DESC LIMIT -1 OFFSET ?)',
+            (self.max_rows,)
+        ).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        rows = None
+        conn = self._conn()
+        if conn is not None:
+            try:
+                rows = conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._stats_lock:
+            hits = memory['hits'] + self.disk_hits
+            lookups = hits + self.misses
+            avg_generation_ms = (self.generation_seconds / self.stores * 1000) if self.stores else 0.0
+            return {
+                'memory': memory,
+                'disk_rows': rows,
+                'memory_hits': memory['hits'],
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'disk_errors': self.disk_errors,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'avg_generation_ms': round(avg_generation_ms, 2),
+                'estimated_saved_ms': round(hits * avg_generation_ms, 2)
+            }
+
+# Instance globale (bot et panel)
+element_cache = GenerationCache()
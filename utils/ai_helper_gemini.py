@@ -6,8 +6,16 @@ Génère du contenu dynamique, varié et immersif basé sur le nouveau prompt sy
 import os
 import json
 import random
-from typing import Dict, Any, List, Optional
+import asyncio
+import threading
+import time
+import hashlib
+import copy
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
+from utils.ai_cache import element_cache, element_key
+from utils.singleflight import AsyncSingleFlight, SingleFlight
 
 try:
     import google.generativeai as genai
@@ -19,6 +27,16 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if genai and GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Délai maximal d'un appel IA (secondes) et nombre d'appels simultanés depuis le bot
+AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', 20))
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 4))
+# Marge au-delà de AI_TIMEOUT pour les demandeurs qui attendent un appel identique en cours
+AI_FLIGHT_GRACE = 5
+
+# Demandes identiques simultanées : un seul appel Gemini partagé (panel en threads, bot en asyncio)
+element_flights = SingleFlight()
+ai_flights = AsyncSingleFlight()
+
 # NOUVEAU PROMPT SYSTÈME COMPLET
 SYSTEM_PROMPT = """
 # Prompt Gemini - Générateur d'Idées pour Jeu d'Éléments Discord
@@ -85,9 +103,20 @@ def get_model():
     model = genai.GenerativeModel('gemini-1.5-flash')
     return model
 
+def _generate(model, prompt: str):
+    """Appel Gemini avec délai côté client (le thread appelant ne reste jamais bloqué indéfiniment)"""
+    return model.generate_content(prompt, request_options={'timeout': AI_TIMEOUT})
+
+# Empreinte du prompt : les éléments en cache sont régénérés quand le prompt change
+PROMPT_FINGERPRINT = hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()[:16]
+
+def _element_cache_key(element_type: str, element_name: str, context: Optional[Dict[str, Any]]) -> str:
+    return element_key(element_type, element_name, context, salt=PROMPT_FINGERPRINT)
+
 def generate_vibrant_element(element_type: str, element_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     GÉNÈRE UN ÉLÉMENT DYNAMIQUE ET VIVANT avec variations aléatoires
+    (resservi depuis le cache pour un même type/nom et un contexte comparable)
     
     Args:
         element_type: Type d'élément
@@ -97,7 +126,29 @@ def generate_vibrant_element(element_type: str, element_name: str, context: Opti
     Returns:
         Dict avec détails générés avec IA avancée
     """
+    key = _element_cache_key(element_type, element_name, context)
+    cached = element_cache.get(key)
+    if cached is not None:
+        # Même élément à la casse/aux accents près : garder le nom saisi par le joueur
+        # (copie : l'objet du cache mémoire est partagé entre les demandeurs)
+        return dict(copy.deepcopy(cached), name=element_name)
     try:
+        # Appel partagé exécuté dans l'exécuteur IA du bot : même limite d'appels en vol
+        result = element_flights.do(
+            key,
+            lambda: run_ai_call_sync(_generate_and_cache, key, element_type, element_name, context,
+                                     fallback=lambda: _get_fallback_element(element_name, element_type)),
+            timeout=AI_TIMEOUT + AI_FLIGHT_GRACE
+        )
+    except TimeoutError:
+        return _get_fallback_element(element_name, element_type)
+    # Résultat partagé entre les demandeurs : chacun reçoit sa copie
+    return dict(copy.deepcopy(result), name=element_name)
+
+def _generate_and_cache(key: str, element_type: str, element_name: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Appel Gemini ; seule une génération réussie est mise en cache (jamais le repli)"""
+    try:
+        started = time.perf_counter()
         model = get_model()
         
         # Context enrichi
@@ -171,7 +222,7 @@ Règles IMPORTANTES :
 Réponds UNIQUEMENT avec le JSON, SANS markdown, SANS backticks.
 """
         
-        response = model.generate_content(prompt)
+        response = _generate(model, prompt)
         response_text = response.text.strip()
         
         # Nettoyer la réponse
@@ -186,6 +237,7 @@ Réponds UNIQUEMENT avec le JSON, SANS markdown, SANS backticks.
         result['created_at'] = datetime.now().isoformat()
         result['theme'] = theme
         
+        element_cache.set(key, result, time.perf_counter() - started)
         return result
         
     except json.JSONDecodeError as e:
@@ -222,6 +274,8 @@ def _get_fallback_element(name: str, element_type: str) -> Dict[str, Any]:
         'theme': 'standard'
     }
 
+FALLBACK_ANALYSIS = "Analyse en cours de génération..."
+
 def generate_economic_analysis(country_data: Dict[str, Any]) -> str:
     """Génère une analyse économique poussée avec l'IA"""
     try:
@@ -246,11 +300,11 @@ Donne une analyse en 3 parties :
 Réponds de manière concise et actionnable (150 mots max).
 """
         
-        response = model.generate_content(prompt)
+        response = _generate(model, prompt)
         return response.text.strip()
     except Exception as e:
         print(f"Erreur génération analyse: {e}")
-        return "Analyse en cours de génération..."
+        return FALLBACK_ANALYSIS
 
 def generate_event_narrative(event_type: str, country_data: Dict[str, Any]) -> str:
     """Génère un récit d'événement immersif"""
@@ -271,82 +325,53 @@ Utilise un ton approprié au type d'événement (dramatique pour crise, positif
 Réponds UNIQUEMENT avec le récit, sans introduction.
 """
         
-        response = model.generate_content(prompt)
+        response = _generate(model, prompt)
         return response.text.strip()
     except Exception as e:
         print(f"Erreur génération événement: {e}")
-        return f"Un événement de type {event_type} a frappé le pays."
+        return _get_fallback_narrative(event_type)
+
+def _get_fallback_narrative(event_type: str) -> str:
+    return f"Un événement de type {event_type} a frappé le pays."
 
-def calculate_war_damages(attacker_country: Dict[str, Any], defender_country: Dict[str, Any]) -> Dict[str, Any]:
+def generate_war_narrative(attacker_country: Dict[str, Any], defender_country: Dict[str, Any], war_result: Dict[str, Any]) -> str:
     """
-    Calcule les dégâts de guerre avec l'IA basés sur les missiles et stratégie
-    
-    Returns:
-        Dict avec damage_percentage, prendas, lauréats, gold_stolen, resources_stolen
+    Récit immersif d'une guerre déjà résolue par le moteur de combat (utils/combat.py) :
+    l'IA ne décide ni du vainqueur ni des dégâts
     """
     try:
         model = get_model()
         
+        if war_result.get('winner') == 'attacker':
+            winner, loser = attacker_country, defender_country
+        else:
+            winner, loser = defender_country, attacker_country
+        
         prompt = f"""
 {SYSTEM_PROMPT}
 
-## CALCUL DE DÉGÂTS DE GUERRE
+## RÉCIT DE GUERRE
 
 Attaquant : {attacker_country.get('name')} (Force: {attacker_country.get('army_strength', 0)}/100, Éco: {attacker_country.get('economy', 0)}/100)
 Défenseur : {defender_country.get('name')} (Force: {defender_country.get('army_strength', 0)}/100, Éco: {defender_country.get('economy', 0)}/100)
 
-Calcule les dégâts de l'attaque de missiles. Format JSON :
-{{
-  "winner": "attacker|defender",
-  "damage_percentage": nombre_0-40,
-  "population_loss": nombre,
-  "gold_stolen": nombre_30-45_pourcent_des_pertes,
-  "resources_stolen": {{
-    "money": nombre,
-    "food": nombre,
-    "metal": nombre
-  }},
-  "narrative": "Description de l'attaque en missiles (1 phrase)"
-}}
+Issue (déjà décidée, ne la change pas) :
+- Vainqueur : {winner.get('name')}
+- Perdant : {loser.get('name')}
+- Dégâts : {war_result.get('damage_percentage', 0)}%
+- Population perdue : {war_result.get('population_loss', 0)}
+- Or volé : {war_result.get('gold_stolen', 0)}
 
-Règles :
-- winner selon force militaire + chance aléatoire
-- damage_percentage: 0-40% selon différence de force
-- population_loss: 0-100000 selon dégâts
-- gold_stolen: 30-45% des pertes du perdant
-- resources_stolen: proportionnel aux ressources du perdant
+Décris cette attaque de missiles en 1 à 2 phrases immersives.
 
-Réponds UNIQUEMENT JSON.
+Réponds UNIQUEMENT avec le récit, sans introduction.
 """
         
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
-        
-        return json.loads(response_text)
-        
+        response = _generate(model, prompt)
+        return response.text.strip()
     except Exception as e:
-        print(f"Erreur calcul dégâts guerre: {e}")
-        # Fallback
-        import random
-        damage = random.randint(5, 25)
-        if attacker_country.get('army_strength', 0) > defender_country.get('army_strength', 0):
-            winner = "attacker"
-        else:
-            winner = "defender"
-        
-        return {
-            'winner': winner,
-            'damage_percentage': damage,
-            'population_loss': damage * 1000,
-            'gold_stolen': random.randint(1000, 5000),
-            'resources_stolen': {'money': 1000, 'food': 100, 'metal': 50},
-            'narrative': "Missiles lancés, combats intenses."
-        }
+        print(f"Erreur génération récit de guerre: {e}")
+        return war_result.get('narrative', '')
 
 def generate_discovery_idea() -> Dict[str, Any]:
     """Génère une idée de découverte aléatoire"""
@@ -376,7 +401,7 @@ Format JSON :
 Réponds UNIQUEMENT avec le JSON.
 """
         
-        response = model.generate_content(prompt)
+        response = _generate(model, prompt)
         response_text = response.text.strip()
         
         if "```" in response_text:
@@ -385,16 +410,137 @@ Réponds UNIQUEMENT avec le JSON.
         return json.loads(response_text)
     except Exception as e:
         print(f"Erreur génération découverte: {e}")
-        return {
-            'name': 'Découverte mystérieuse',
-            'type': 'concept',
-            'description': 'Une découverte fascinante attend d\'être explorée.',
-            'rarity': 'rare',
-            'potential_uses': ['recherche', 'innovation']
-        }
+        return _get_fallback_discovery()
+
+def _get_fallback_discovery() -> Dict[str, Any]:
+    """Fallback si l'IA échoue"""
+    return {
+        'name': 'Découverte mystérieuse',
+        'type': 'concept',
+        'description': 'Une découverte fascinante attend d\'être explorée.',
+        'rarity': 'rare',
+        'potential_uses': ['recherche', 'innovation']
+    }
 
 # Fonction de compatibilité avec l'ancienne version
 def generate_element_details(element_type: str, element_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Wrapper pour compatibilité avec l'ancien code"""
     return generate_vibrant_element(element_type, element_name, context)
 
+
+# ==================== APPELS ASYNCHRONES (BOT) ====================
+# Les appels Gemini sont synchrones : depuis la boucle asyncio du bot ils passent par un
+# exécuteur dédié, avec un nombre limité d'appels en vol et un délai dur au-delà duquel
+# la commande continue avec le résultat de repli. Le panel (threads Flask) passe par le
+# même exécuteur avec run_ai_call_sync.
+
+_ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix='gemini')
+_ai_semaphores: Dict[int, asyncio.Semaphore] = {}
+_ai_stats_lock = threading.Lock()
+ai_stats = {'calls': 0, 'timeouts': 0, 'rejected': 0, 'in_flight': 0}
+
+def _count(key: str, delta: int = 1):
+    with _ai_stats_lock:
+        ai_stats[key] += delta
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Un sémaphore par boucle (le bot n'en a qu'une ; les tests peuvent en créer plusieurs)
+    loop = asyncio.get_running_loop()
+    semaphore = _ai_semaphores.get(id(loop))
+    if semaphore is None:
+        semaphore = _ai_semaphores[id(loop)] = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return semaphore
+
+async def run_ai_call(func: Callable, *args, fallback: Callable[[], Any], timeout: Optional[float] = None):
+    """Exécuter func(*args) hors de la boucle ; fallback() si le délai est dépassé.
+
+    Une place n'est rendue qu'à la fin réelle de l'appel (un thread ne peut pas être
+    interrompu) : des appels bloqués côté Gemini ne peuvent pas s'accumuler sans limite.
+    L'annulation de la tâche appelante annule aussi un appel qui n'a pas encore démarré.
+    """
+    loop = asyncio.get_running_loop()
+    timeout = AI_TIMEOUT if timeout is None else timeout
+    deadline = loop.time() + timeout
+    semaphore = _get_semaphore()
+    try:
+        await asyncio.wait_for(semaphore.acquire(), timeout)
+    except asyncio.TimeoutError:
+        _count('rejected')
+        print(f"Erreur IA {func.__name__}: aucun créneau libre après {timeout:g}s, repli")
+        return fallback()
+
+    def release(_):
+        _count('in_flight', -1)
+        try:
+            loop.call_soon_threadsafe(semaphore.release)
+        except RuntimeError:
+            # Boucle fermée (arrêt du bot)
+            pass
+
+    _count('calls')
+    _count('in_flight')
+    future = _ai_executor.submit(func, *args)
+    future.add_done_callback(release)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), max(0.0, deadline - loop.time()))
+    except asyncio.TimeoutError:
+        _count('timeouts')
+        print(f"Erreur IA {func.__name__}: délai de {timeout:g}s dépassé, repli")
+        return fallback()
+
+def run_ai_call_sync(func: Callable, *args, fallback: Callable[[], Any], timeout: Optional[float] = None):
+    """Équivalent de run_ai_call pour un thread hors boucle (panel Flask) : même exécuteur,
+    donc même plafond d'appels Gemini simultanés que le bot, et fallback() au délai."""
+    timeout = AI_TIMEOUT if timeout is None else timeout
+    _count('calls')
+    _count('in_flight')
+    future = _ai_executor.submit(func, *args)
+    future.add_done_callback(lambda _: _count('in_flight', -1))
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        # Un appel encore en file d'attente n'est pas lancé pour rien
+        future.cancel()
+        _count('timeouts')
+        print(f"Erreur IA {func.__name__}: délai de {timeout:g}s dépassé, repli")
+        return fallback()
+
+async def generate_vibrant_element_async(element_type: str, element_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Un élément en cache est servi directement, sans attendre un créneau d'appel IA ;
+    # seul le niveau mémoire est lu sur la boucle, la lecture SQLite part dans un thread
+    key = _element_cache_key(element_type, element_name, context)
+    cached = element_cache.memory.get(key)
+    if cached is None:
+        cached = await asyncio.to_thread(element_cache.get_disk, key)
+    if cached is not None:
+        # Même élément à la casse/aux accents près : garder le nom saisi par le joueur
+        return dict(copy.deepcopy(cached), name=element_name)
+    try:
+        result = await ai_flights.do(
+            ('element', key),
+            lambda: run_ai_call(_generate_and_cache, key, element_type, element_name, context,
+                                fallback=lambda: _get_fallback_element(element_name, element_type)),
+            timeout=AI_TIMEOUT + AI_FLIGHT_GRACE
+        )
+    except asyncio.TimeoutError:
+        return _get_fallback_element(element_name, element_type)
+    return dict(copy.deepcopy(result), name=element_name)
+
+async def generate_element_details_async(element_type: str, element_name: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return await generate_vibrant_element_async(element_type, element_name, context)
+
+async def generate_economic_analysis_async(country_data: Dict[str, Any]) -> str:
+    # Même pays dans le même état (plusieurs /banque simultanés) : une seule analyse
+    key = hashlib.sha256(json.dumps(country_data, sort_keys=True, default=str).encode()).hexdigest()
+    try:
+        return await ai_flights.do(
+            ('analysis', key),
+            lambda: run_ai_call(generate_economic_analysis, country_data, fallback=lambda: FALLBACK_ANALYSIS),
+            timeout=AI_TIMEOUT + AI_FLIGHT_GRACE
+        )
+    except asyncio.TimeoutError:
+        return FALLBACK_ANALYSIS
+
+async def generate_war_narrative_async(attacker_country: Dict[str, Any], defender_country: Dict[str, Any], war_result: Dict[str, Any]) -> str:
+    return await run_ai_call(generate_war_narrative, attacker_country, defender_country, war_result,
+                             fallback=lambda: war_result.get('narrative', ''))
@@ -0,0 +1,12 @@
+"""
+Callbacks d'autocomplétion partagés par les commandes slash
+"""
+from typing import List
+from discord import app_commands
+import discord
+from db.supabase import db
+
+async def country_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Proposer des noms de pays depuis l'index mémoire (aucune requête base de données)"""
+    names = db.search_country_names(current, limit=25)
+    return [app_commands.Choice(name=name[:100], value=name[:100]) for name in names]
@@ -0,0 +1,117 @@
+"""
+Moteur de combat local : résolution des guerres à partir des unités militaires
+(GAME_CONFIG['military_units']), de la force armée, de l'économie et de la stabilité.
+Déterministe pour une graine donnée, sans appel réseau.
+"""
+import math
+import random
+from typing import Any, Dict, Optional
+from config import GAME_CONFIG
+
+NARRATIVES = [
+    "{winner} a percé les lignes de {loser} après un déluge de missiles.",
+    "Les frappes coordonnées de {winner} ont fait plier {loser}.",
+    "{loser} n'a pas résisté à l'offensive de {winner}.",
+    "Après des combats acharnés, {winner} prend l'avantage sur {loser}.",
+]
+
+class CombatEngine:
+    """Résolution d'une guerre en quelques microsecondes.
+
+    Chaque résolution tire exactement trois nombres du générateur, dans cet ordre :
+    aléa de l'attaquant, aléa du défenseur, part du butin. Le récit est choisi par un
+    second générateur dérivé de la même graine, qui ne décale pas ces tirages.
+    """
+
+    def __init__(self, units: Optional[Dict[str, Dict[str, Any]]] = None, rules: Optional[Dict[str, Any]] = None):
+        self.units = units if units is not None else GAME_CONFIG['military_units']
+        self.rules = rules if rules is not None else GAME_CONFIG['war_rules']
+
+    @staticmethod
+    def army_units(country: Dict[str, Any]) -> Dict[str, int]:
+        """Unités disponibles, déduites de la force armée et des ressources"""
+        army_strength = int(country.get('army_strength', 0) or 0)
+        resources = country.get('resources') or {}
+        money = int(resources.get('money', 0) or 0)
+        metal = int(resources.get('metal', 0) or 0)
+        materials = int(resources.get('materials', 0) or 0)
+        return {
+            'soldiers': max(0, min(army_strength * 10, money // 100)),
+            'vehicles': max(0, min(army_strength * 2, metal // 50)),
+            'aircraft': max(0, min(army_strength, materials // 20)),
+            'missiles': max(0, min(army_strength // 2, materials // 50)),
+            'navy': max(0, min(army_strength // 3, materials // 30)),
+        }
+
+    def units_power(self, country: Dict[str, Any]) -> int:
+        """Puissance cumulée des unités (effectif × puissance du catalogue).
+
+        Le coût du catalogue n'intervient pas : les effectifs sont déduits des ressources,
+        pas achetés, et toutes les unités ont le même rapport puissance/coût.
+        """
+        return sum(count * self.units.get(unit, {}).get('power', 0)
+                   for unit, count in self.army_units(country).items())
+
+    def units_score(self, units_power: float) -> float:
+        """Puissance d'unités ramenée sur 100 (échelle logarithmique)"""
+        reference = self.rules['units_reference_power']
+        return min(100.0, 100.0 * math.log1p(max(0.0, units_power)) / math.log1p(reference))
+
+    def base_power(self, country: Dict[str, Any]) -> float:
+        """Puissance d'un pays avant aléa"""
+        weights = self.rules['weights']
+        return (
+            weights['army_strength'] * float(country.get('army_strength', 0) or 0) +
+            weights['units'] * self.units_score(self.units_power(country)) +
+            weights['economy'] * float(country.get('economy', 0) or 0) +
+            weights['stability'] * float(country.get('stability', 0) or 0)
+        )
+
+    def damage_percent(self, winner_power: float, loser_power: float) -> int:
+        """Dégâts du perdant selon l'écart relatif de puissance"""
+        low, high = self.rules['min_damage_percent'], self.rules['max_damage_percent']
+        margin = (winner_power - loser_power) / winner_power if winner_power > 0 else 0.0
+        return int(round(min(high, max(low, low + (high - low) * margin))))
+
+    def resolve(self, attacker: Dict[str, Any], defender: Dict[str, Any], seed: Optional[int] = None) -> Dict[str, Any]:
+        """Résultat d'une attaque (même format que l'ancien calcul par l'IA, plus puissances et graine)"""
+        if seed is None:
+            seed = random.getrandbits(63)
+        rng = random.Random(seed)
+        spread = self.rules['randomness']
+
+        attacker_power = self.base_power(attacker) * rng.uniform(1 - spread, 1 + spread)
+        defender_power = self.base_power(defender) * rng.uniform(1 - spread, 1 + spread)
+        spoils_ratio = rng.uniform(*self.rules['spoils_ratio'])
+
+        # Égalité : le défenseur tient
+        attacker_wins = attacker_power > defender_power
+        winner, loser = (attacker, defender) if attacker_wins else (defender, attacker)
+        winner_power, loser_power = (attacker_power, defender_power) if attacker_wins else (defender_power, attacker_power)
+        damage = self.damage_percent(winner_power, loser_power)
+
+        population_loss = min(
+            self.rules['max_population_loss'],
+            int((loser.get('population', 0) or 0) * damage * self.rules['population_loss_per_damage'])
+        )
+        loser_resources = loser.get('resources') or {}
+        resources_stolen = {
+            resource: int((loser_resources.get(resource, 0) or 0) * damage / 100 * spoils_ratio)
+            for resource in self.rules['spoils_resources']
+        }
+        narrative = random.Random(f"{seed}:narrative").choice(NARRATIVES).format(winner=winner.get('name', '?'), loser=loser.get('name', '?'))
+
+        return {
+            'winner': 'attacker' if attacker_wins else 'defender',
+            'damage_percentage': damage,
+            'population_loss': population_loss,
+            'gold_stolen': resources_stolen.get('money', 0),
+            'resources_stolen': resources_stolen,
+            'narrative': narrative,
+            'attacker_power': round(attacker_power, 2),
+            'defender_power': round(defender_power, 2),
+            'seed': seed
+        }
+
+# Instance globale (catalogue et règles de GAME_CONFIG)
+combat_engine = CombatEngine()
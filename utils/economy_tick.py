@@ -0,0 +1,38 @@
+"""
+Tick économique horaire calculé en un seul passage vectoriel (NumPy) sur tous les pays
+"""
+from typing import Any, Dict, List
+import numpy as np
+
+def compute_economic_tick(countries: List[Dict[str, Any]], rules: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Calculer intérêts, inflation et entretien de l'armée pour tous les pays.
+
+    Mêmes règles que l'ancienne boucle pays par pays : intérêts puis inflation sur un
+    solde positif (arrondis vers zéro), puis entretien, solde jamais négatif.
+    Retourne les tableaux 'money_before', 'money_after', 'maintenance' et 'delta'.
+    """
+    inflation = rules.get('inflation_percent_daily', 0)
+    interest = rules.get('interest_percent_daily', 0)
+    maintenance_per = rules.get('army_maintenance_per_strength', 0)
+
+    money_before = np.array(
+        [int((c.get('resources') or {}).get('money', 0) or 0) for c in countries], dtype=np.int64
+    )
+    army = np.array([c.get('army_strength', 0) or 0 for c in countries], dtype=np.float64)
+
+    money = money_before.copy()
+    if interest > 0:
+        gain = np.trunc(money * interest / 100).astype(np.int64)
+        money = np.where(money > 0, money + gain, money)
+    if inflation > 0:
+        loss = np.trunc(money * inflation / 100).astype(np.int64)
+        money = np.where(money > 0, np.maximum(0, money - loss), money)
+    maintenance = np.maximum(0, np.trunc(army * maintenance_per)).astype(np.int64)
+    money = np.maximum(0, money - maintenance)
+
+    return {
+        'money_before': money_before,
+        'money_after': money,
+        'maintenance': maintenance,
+        'delta': money - money_before
+    }
@@ -1,6 +1,7 @@
 import random
 from typing import Dict, Any, List, Optional
 from config import GAME_CONFIG
+from utils.combat import combat_engine
 
 class GameHelpers:
     @staticmethod
@@ -24,38 +25,16 @@ class GameHelpers:
         return max(1, int(abs(amount) * fee_percent / 100))
 
     @staticmethod
-    def calculate_war_result(attacker: Dict[str, Any], defender: Dict[str, Any]) -> Dict[str, Any]:
-        """Calculer le résultat d'une guerre"""
-        # Facteurs de guerre
-        attacker_power = (
-            attacker.get('army_strength', 0) * 0.4 +
-            attacker.get('economy', 0) * 0.3 +
-            attacker.get('stability', 0) * 0.3
-        )
-        defender_power = (
-            defender.get('army_strength', 0) * 0.4 +
-            defender.get('economy', 0) * 0.3 +
-            defender.get('stability', 0) * 0.3
-        )
-        # Ajouter un facteur aléatoire (±20%)
-        attacker_power *= random.uniform(0.8, 1.2)
-        defender_power *= random.uniform(0.8, 1.2)
-        if attacker_power > defender_power:
-            damage = min(20, int((attacker_power - defender_power) / 10))
-            return {
-                'winner': 'attacker',
-                'damage': damage,
-                'attacker_power': int(attacker_power),
-                'defender_power': int(defender_power)
-            }
-        else:
-            damage = min(20, int((defender_power - attacker_power) / 10))
-            return {
-                'winner': 'defender',
-                'damage': damage,
-                'attacker_power': int(attacker_power),
-                'defender_power': int(defender_power)
-            }
+    def calculate_war_result(attacker: Dict[str, Any], defender: Dict[str, Any], seed: Optional[int] = None) -> Dict[str, Any]:
+        """Calculer le résultat d'une guerre (moteur de combat, voir utils/combat.py)"""
+        result = combat_engine.resolve(attacker, defender, seed)
+        return {
+            'winner': result['winner'],
+            'damage': result['damage_percentage'],
+            'attacker_power': int(result['attacker_power']),
+            'defender_power': int(result['defender_power']),
+            'seed': result['seed']
+        }
 
     @staticmethod
     def apply_war_damage(country: Dict[str, Any], damage: int) -> Dict[str, Any]:
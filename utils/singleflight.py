@@ -0,0 +1,127 @@
+"""
+Regroupement des appels identiques simultanés (single-flight) : tant qu'un appel pour une
+clé est en cours, les demandes suivantes pour la même clé attendent son résultat au lieu
+d'en lancer un autre. Une version asyncio (bot) et une version threads (panel Flask).
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class _FlightStats:
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _stats(self, in_flight: int) -> Dict[str, Any]:
+        with self._stats_lock:
+            calls = self.leaders + self.shared
+            return {
+                'in_flight': in_flight,
+                'leaders': self.leaders,
+                'shared': self.shared,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                # Part des demandes servies sans appel supplémentaire
+                'dedup_rate': round(self.shared / calls, 4) if calls else 0.0
+            }
+
+class AsyncSingleFlight(_FlightStats):
+    """Single-flight asyncio : l'appel partagé tourne dans sa propre tâche, l'annulation
+    d'un des demandeurs ne l'interrompt donc pas pour les autres.
+
+    timeout borne l'appel partagé lui-même : à l'expiration, tous les demandeurs reçoivent
+    asyncio.TimeoutError ; une exception de l'appel est transmise à chacun d'eux.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._flights: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._flights.get(flight_key)
+        if task is None:
+            self._count('leaders')
+            task = loop.create_task(self._run(factory, timeout))
+            self._flights[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+        else:
+            self._count('shared')
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: Tuple[int, Hashable], task: asyncio.Task):
+        self._flights.pop(flight_key, None)
+        # Exception lue : pas d'avertissement si tous les demandeurs ont été annulés entre-temps
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, factory: Callable[[], Awaitable[Any]], timeout: Optional[float]) -> Any:
+        try:
+            return await asyncio.wait_for(factory(), timeout)
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise
+        except Exception:
+            self._count('errors')
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return self._stats(len(self._flights))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight(_FlightStats):
+    """Single-flight pour threads : le premier demandeur exécute fn dans son thread, les
+    suivants attendent au plus timeout secondes (TimeoutError) puis reçoivent le même
+    résultat ou la même exception.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._count('shared')
+            if not call.done.wait(timeout):
+                self._count('timeouts')
+                raise TimeoutError(f"Appel partagé toujours en cours après {timeout:g}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._count('leaders')
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            self._count('errors')
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return self._stats(in_flight)
@@ -0,0 +1,92 @@
+"""
+Simulation Monte-Carlo d'une guerre en un seul passage vectoriel (NumPy) : mêmes règles
+que CombatEngine.resolve, répétées sur des milliers d'essais pour estimer les chances
+de victoire, les dégâts et le butin avant de déclarer la guerre.
+"""
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+from utils.combat import CombatEngine, combat_engine
+
+DEFAULT_TRIALS = 10000
+MAX_TRIALS = 100000
+PERCENTILES = (10, 50, 90)
+
+def _distribution(values: np.ndarray) -> Dict[str, Any]:
+    """Moyenne et percentiles (0 si aucun essai concerné)"""
+    if values.size == 0:
+        return {'mean': 0, **{f'p{p}': 0 for p in PERCENTILES}}
+    quantiles = np.percentile(values, PERCENTILES)
+    return {'mean': round(float(values.mean()), 2), **{f'p{p}': int(q) for p, q in zip(PERCENTILES, quantiles)}}
+
+def simulate_war(attacker: Dict[str, Any], defender: Dict[str, Any], trials: int = DEFAULT_TRIALS,
+                 seed: Optional[int] = None, war_cost: int = 0, engine: CombatEngine = combat_engine) -> Dict[str, Any]:
+    """Probabilité de victoire de l'attaquant, dégâts et butin attendus sur trials essais.
+
+    Les puissances de base ne dépendent pas de l'aléa : elles sont calculées une fois, seuls
+    les tirages (aléa de chaque camp, part du butin) sont vectorisés.
+    """
+    started = time.perf_counter()
+    trials = max(1, min(int(trials), MAX_TRIALS))
+    rules = engine.rules
+    rng = np.random.default_rng(seed)
+    spread = rules['randomness']
+    low, high = rules['min_damage_percent'], rules['max_damage_percent']
+
+    attacker_power = engine.base_power(attacker) * rng.uniform(1 - spread, 1 + spread, trials)
+    defender_power = engine.base_power(defender) * rng.uniform(1 - spread, 1 + spread, trials)
+    spoils_ratio = rng.uniform(*rules['spoils_ratio'], trials)
+
+    attacker_wins = attacker_power > defender_power
+    winner_power = np.where(attacker_wins, attacker_power, defender_power)
+    loser_power = np.where(attacker_wins, defender_power, attacker_power)
+    margin = np.divide(winner_power - loser_power, winner_power,
+                       out=np.zeros(trials), where=winner_power > 0)
+    damage = np.rint(np.clip(low + (high - low) * margin, low, high)).astype(np.int64)
+
+    def side(country: Dict[str, Any], field: str) -> float:
+        return float(country.get(field, 0) or 0)
+
+    loser_population = np.where(attacker_wins, side(defender, 'population'), side(attacker, 'population'))
+    population_loss = np.minimum(
+        rules['max_population_loss'],
+        np.trunc(loser_population * damage * rules['population_loss_per_damage'])
+    ).astype(np.int64)
+
+    # Butin vu de l'attaquant : gagné sur le défenseur s'il l'emporte, perdu sinon
+    spoils = {}
+    net_money = np.zeros(trials)
+    for resource in rules['spoils_resources']:
+        attacker_stock = float((attacker.get('resources') or {}).get(resource, 0) or 0)
+        defender_stock = float((defender.get('resources') or {}).get(resource, 0) or 0)
+        loser_stock = np.where(attacker_wins, defender_stock, attacker_stock)
+        amount = np.trunc(loser_stock * damage / 100 * spoils_ratio).astype(np.int64)
+        spoils[resource] = {
+            'gained_on_win': _distribution(amount[attacker_wins]),
+            'lost_on_defeat': _distribution(amount[~attacker_wins])
+        }
+        if resource == 'money':
+            net_money = np.where(attacker_wins, amount, -amount) - war_cost
+
+    wins = int(attacker_wins.sum())
+    win_probability = wins / trials
+    # Intervalle de confiance à 95 % (approximation normale)
+    margin_of_error = 1.96 * float(np.sqrt(win_probability * (1 - win_probability) / trials))
+
+    return {
+        'trials': trials,
+        'seed': seed,
+        'attacker_base_power': round(engine.base_power(attacker), 2),
+        'defender_base_power': round(engine.base_power(defender), 2),
+        'attacker_win_probability': round(win_probability, 4),
+        'confidence_95': [round(max(0.0, win_probability - margin_of_error), 4),
+                          round(min(1.0, win_probability + margin_of_error), 4)],
+        'damage_on_win': _distribution(damage[attacker_wins]),
+        'damage_on_defeat': _distribution(damage[~attacker_wins]),
+        'defender_population_loss_on_win': _distribution(population_loss[attacker_wins]),
+        'attacker_population_loss_on_defeat': _distribution(population_loss[~attacker_wins]),
+        'spoils': spoils,
+        'war_cost': war_cost,
+        'expected_net_money': round(float(net_money.mean()), 2),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    }
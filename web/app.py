@@ -1,63 +1,63 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 from flask_socketio import SocketIO, emit
 import os
-from supabase import create_client, Client
+import sys
+from config import DB_BACKEND, GAME_CONFIG, PANEL_ASYNC_MODE, PANEL_TRANSPORTS, PANEL_RATE_LIMIT, PANEL_RATE_LIMITS
+from db.metrics import metrics as query_metrics, InstrumentedClient
+from db.backends import create_backend
+from db.backends.supabase_backend import SupabaseBackend
+from web.rate_limiter import RateLimit, SlidingWindowLimiter, parse_route_limits
+from utils.war_simulation import DEFAULT_TRIALS, simulate_war
+from web.exports import (
+    EXPORT_TABLES, EXPORT_FORMATS, iter_table_rows, ndjson_lines, csv_lines, backup_lines,
+    export_stream, export_headers
+)
 import json
 from datetime import datetime
 import secrets
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('WEB_SECRET_KEY', secrets.token_hex(32))
-# Socket.IO avec configuration stricte pour Render.com
+# Socket.IO : WebSocket avec repli long-polling (simple-websocket en mode threading,
+# worker eventlet/gevent sous gunicorn, voir web/wsgi.py)
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
-    async_mode='threading',  # Force threading mode
+    async_mode=PANEL_ASYNC_MODE,
     logger=False,
     engineio_logger=False,
-    allow_upgrades=False,  # Désactive complètement les websockets
-    transports=['polling'],  # Force uniquement le polling
+    allow_upgrades='websocket' in PANEL_TRANSPORTS,
+    transports=PANEL_TRANSPORTS,
     ping_timeout=60,
     ping_interval=25
 )
 
-# Rate limiting simple avec dictionnaire en mémoire
-from collections import defaultdict
-import time
+# Rate limiting : fenêtre glissante par admin connecté (ou par IP) et par endpoint
+rate_limiter = SlidingWindowLimiter(RateLimit.parse(PANEL_RATE_LIMIT), parse_route_limits(PANEL_RATE_LIMITS))
 
-# Stockage des requêtes par IP
-request_counts = defaultdict(list)
-RATE_LIMIT_WINDOW = 60  # 1 minute
-RATE_LIMIT_MAX_REQUESTS = 100  # 100 requêtes par minute par IP
+def get_client_ip():
+    """IP du client (première adresse de X-Forwarded-For derrière un proxy)"""
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    return forwarded.split(',')[0].strip() or request.remote_addr or '127.0.0.1'
 
-def check_rate_limit():
-    """Vérifie le rate limiting pour l'IP actuelle"""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    if not client_ip:
-        client_ip = '127.0.0.1'
-    
-    now = time.time()
-    
-    # Nettoyer les anciennes requêtes
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if now - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    # Vérifier la limite
-    if len(request_counts[client_ip]) >= RATE_LIMIT_MAX_REQUESTS:
-        return False
-    
-    # Ajouter la requête actuelle
-    request_counts[client_ip].append(now)
-    return True
+def rate_limit_key():
+    """Clé de limitation : l'admin connecté (quelle que soit son IP), sinon l'IP"""
+    user = session.get('user') or {}
+    if user.get('id'):
+        return f"user:{user['id']}"
+    return f"ip:{get_client_ip()}"
 
 def rate_limit(f):
-    """Décorateur pour le rate limiting"""
+    """Décorateur pour le rate limiting (limite propre à l'endpoint si configurée)"""
     def decorated_function(*args, **kwargs):
-        if not check_rate_limit():
-            return jsonify({'error': 'Rate limit exceeded. Please slow down.'}), 429
-        return f(*args, **kwargs)
+        decision = rate_limiter.hit(rate_limit_key(), f.__name__)
+        if not decision.allowed:
+            response = jsonify({'error': 'Rate limit exceeded. Please slow down.', 'retry_after': decision.to_dict()['retry_after']})
+            response.headers.update(decision.headers())
+            return response, 429
+        response = app.make_response(f(*args, **kwargs))
+        response.headers.update(decision.headers())
+        return response
     decorated_function.__name__ = f.__name__
     return decorated_function
 
@@ -74,8 +74,8 @@ def require_admin(f):
 def require_database(f):
     """Décorateur pour vérifier la disponibilité de la base de données"""
     def decorated_function(*args, **kwargs):
-        if supabase is None:
-            print(f"ERREUR: Supabase non configuré pour {f.__name__}")
+        if storage is None:
+            print(f"ERREUR: Base de données non configurée pour {f.__name__}")
             return jsonify({'error': 'Database not configured'}), 500
         return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
@@ -142,16 +142,17 @@ def validate_environment():
     if not ADMIN_ROLE_IDS:
         warnings.append("ADMIN_ROLE_IDS vide - aucun utilisateur ne pourra accéder au panel")
     
-    # Variables Supabase
-    if not SUPABASE_URL:
-        errors.append("SUPABASE_URL manquant")
-    elif not SUPABASE_URL.startswith('https://'):
-        warnings.append("SUPABASE_URL ne semble pas être une URL HTTPS valide")
-    
-    if not SUPABASE_KEY:
-        errors.append("SUPABASE_KEY manquant")
-    elif len(SUPABASE_KEY) < 100:
-        warnings.append("SUPABASE_KEY semble trop court")
+    # Variables Supabase (inutiles avec DB_BACKEND=sqlite)
+    if DB_BACKEND.lower() == 'supabase':
+        if not SUPABASE_URL:
+            errors.append("SUPABASE_URL manquant")
+        elif not SUPABASE_URL.startswith('https://'):
+            warnings.append("SUPABASE_URL ne semble pas être une URL HTTPS valide")
+        
+        if not SUPABASE_KEY:
+            errors.append("SUPABASE_KEY manquant")
+        elif len(SUPABASE_KEY) < 100:
+            warnings.append("SUPABASE_KEY semble trop court")
     
     # Log des problèmes
     if errors:
@@ -173,23 +174,29 @@ if not validate_environment():
 LOG_CHANNEL_ID = 1432369899635871894
 
 
-supabase: Client = None
+# Moteur de stockage du panel : le même que celui du bot (DB_BACKEND, Supabase ou SQLite),
+# opérations groupées comprises (RPC de db/functions.sql ou transactions SQLite)
+storage = None
 
 def initialize_database():
     """Initialise et vérifie la connexion à la base de données"""
-    global supabase
+    global storage
     
-    if not SUPABASE_URL or not SUPABASE_KEY:
+    if DB_BACKEND.lower() == 'supabase' and (not SUPABASE_URL or not SUPABASE_KEY):
         print("ERREUR: SUPABASE_URL/SUPABASE_KEY manquants - les endpoints DB seront indisponibles")
         return False
     
     try:
-        print("INFO: Initialisation de la connexion Supabase...")
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        print(f"INFO: Initialisation du stockage ({DB_BACKEND})...")
+        backend = create_backend()
+        if isinstance(backend, SupabaseBackend):
+            # Client instrumenté : chaque .execute() alimente les métriques (/api/metrics)
+            backend.client = InstrumentedClient(backend.client, query_metrics)
         
         # Test de connexion avec une requête simple
         print("INFO: Test de connexion à la base de données...")
-        test_result = supabase.table('countries').select('id').limit(1).execute()
+        backend.select('countries', 'id', limit=1)
+        storage = backend
         print("SUCCESS: Connexion à la base de données établie")
         
         # Vérification des tables critiques
@@ -198,7 +205,7 @@ def initialize_database():
         
         for table in required_tables:
             try:
-                supabase.table(table).select('id').limit(1).execute()
+                storage.select(table, 'id', limit=1)
                 print(f"SUCCESS: Table '{table}' accessible")
             except Exception as e:
                 missing_tables.append(table)
@@ -211,8 +218,8 @@ def initialize_database():
         return True
         
     except Exception as e:
-        print(f"ERREUR: Échec de l'initialisation Supabase: {type(e).__name__}: {str(e)}")
-        supabase = None
+        print(f"ERREUR: Échec de l'initialisation du stockage: {type(e).__name__}: {str(e)}")
+        storage = None
         return False
 
 # Initialisation de la base de données
@@ -281,9 +288,87 @@ def is_user_admin():
 from web.discord_logs import (
     log_country_created, log_country_modified, log_country_deleted,
     log_player_modified, log_player_deleted, log_war_ended, log_war_deleted,
-    log_event_triggered, log_tools_action, log_admin_give
+    log_event_triggered, log_tools_action, log_admin_give, webhook_dispatcher
 )
 
+def _snapshot_fetch(table: str, order=None, limit=None):
+    """Lecture d'une table pour l'instantané partagé"""
+    return storage.select(table, order=order, desc=True, limit=limit)
+
+# Instantané partagé (REST + Socket.IO) et flux de changements alimenté à chaque relecture
+from config import PANEL_SNAPSHOT_MAX_AGE, PANEL_FEED_LOG_SIZE
+from web.snapshot import WorldSnapshot
+from web.change_feed import ChangeFeed
+from web.statistics import WorldStatistics
+world_snapshot = WorldSnapshot(_snapshot_fetch, max_age=PANEL_SNAPSHOT_MAX_AGE)
+change_feed = ChangeFeed(log_size=PANEL_FEED_LOG_SIZE)
+world_snapshot.subscribe(change_feed.ingest)
+# Statistiques tenues à jour à partir des lignes modifiées de chaque relecture
+world_statistics = WorldStatistics()
+change_feed.subscribe(world_statistics.apply)
+
+# Endpoints de liste : colonnes projetables, triables et filtrables
+from web.pagination import ListSpec, has_list_args, parse_list_args, paginate_rows, paginate_query
+LIST_SPECS = {
+    'countries': ListSpec(
+        fields=['id', 'name', 'leader_id', 'population', 'economy', 'army_strength', 'resources',
+                'stability', 'is_locked', 'created_at'],
+        sorts=['id', 'name', 'population', 'economy', 'army_strength', 'stability', 'created_at'],
+        filters=['leader_id', 'is_locked'], search='name', default_sort='name'),
+    'players': ListSpec(
+        fields=['id', 'discord_id', 'username', 'role', 'balance', 'inventory', 'country_id',
+                'last_work_time', 'created_at'],
+        sorts=['id', 'username', 'role', 'balance', 'created_at'],
+        filters=['country_id', 'role', 'discord_id'], search='username', default_sort='username'),
+    'wars': ListSpec(
+        fields=['id', 'attacker_id', 'defender_id', 'winner_id', 'summary', 'started_at', 'ended_at', 'created_at'],
+        sorts=['id', 'started_at', 'ended_at', 'created_at'],
+        filters=['attacker_id', 'defender_id', 'winner_id', 'ended_at'], default_sort='started_at', default_desc=True),
+    'elements': ListSpec(
+        fields=['id', 'name', 'type', 'category', 'description', 'materials', 'cost', 'rarity', 'time_to_build',
+                'effects', 'creator_id', 'country_id', 'built', 'built_at', 'created_at'],
+        sorts=['id', 'name', 'cost', 'created_at'],
+        filters=['country_id', 'type', 'category', 'rarity', 'built', 'creator_id'], search='name',
+        default_sort='created_at', default_desc=True),
+}
+
+def list_snapshot_table(table: str):
+    """Liste paginée depuis l'instantané partagé (tableau complet sans paramètre de liste)"""
+    rows = world_snapshot.table(table)
+    spec = LIST_SPECS[table]
+    if not has_list_args(request.args, spec):
+        return jsonify(rows)
+    try:
+        return jsonify(paginate_rows(rows, parse_list_args(request.args, spec), spec))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def bot_db():
+    """DatabaseManager du bot s'il tourne dans ce processus (start.py, mode threading), sinon None"""
+    db_module = sys.modules.get('db.supabase')
+    return db_module.db if db_module is not None else None
+
+def evict_bot_cache(player_ids=(), country_ids=()):
+    """Oublier dans les caches du bot ce que le panel vient d'écrire (None : tout).
+
+    Sans bot dans le processus, ses caches expirent après DB_CACHE_TTL et ses
+    lectures-modifications-écritures relisent le pays (get_country(fresh=True)).
+    """
+    bot = bot_db()
+    if bot is None:
+        return
+    if player_ids is None or player_ids:
+        bot.evict_players(None if player_ids is None else list(player_ids))
+    if country_ids is None or country_ids:
+        bot.evict_countries(None if country_ids is None else list(country_ids))
+
+@app.after_request
+def invalidate_snapshot(response):
+    """Une écriture du panel rend la prochaine lecture de l'instantané fraîche"""
+    if request.method != 'GET' and request.path.startswith('/api/') and response.status_code < 400:
+        world_snapshot.invalidate()
+    return response
+
 def get_user_info():
     """Récupère les informations de l'utilisateur connecté"""
     return (
@@ -304,28 +389,53 @@ def index():
 
 @app.route('/api/rate-limit-status')
 def rate_limit_status():
-    """Retourne le statut du rate limiting pour l'IP actuelle"""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    if not client_ip:
-        client_ip = '127.0.0.1'
-    
-    now = time.time()
-    
-    # Nettoyer les anciennes requêtes
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if now - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    remaining = max(0, RATE_LIMIT_MAX_REQUESTS - len(request_counts[client_ip]))
-    
-    return jsonify({
-        'ip': client_ip,
-        'requests_used': len(request_counts[client_ip]),
-        'requests_remaining': remaining,
-        'window_seconds': RATE_LIMIT_WINDOW,
-        'max_requests': RATE_LIMIT_MAX_REQUESTS
-    })
+    """Retourne le statut du rate limiting pour la clé actuelle (et l'état global pour un admin)"""
+    key = rate_limit_key()
+    status = rate_limiter.status(key)
+    default = status['default']
+    response = {
+        'key': key,
+        'ip': get_client_ip(),
+        # Champs historiques (compteur par défaut)
+        'requests_used': default['used'],
+        'requests_remaining': default['remaining'],
+        'window_seconds': default['window_seconds'],
+        'max_requests': default['limit'],
+        'routes': status['routes']
+    }
+    if is_user_admin():
+        response['limiter'] = rate_limiter.stats()
+    return jsonify(response)
+
+@app.route('/api/metrics')
+@require_admin
+def api_metrics():
+    top = request.args.get('top', type=int)
+    data = query_metrics.snapshot(top=top)
+    data['snapshot'] = world_snapshot.stats()
+    data['change_feed'] = change_feed.stats()
+    data['rate_limiter'] = rate_limiter.stats()
+    data['discord_webhook'] = webhook_dispatcher.stats()
+    # Caches et journal des transactions du bot (si lancé dans le même processus)
+    bot = bot_db()
+    if bot is not None:
+        data['caches'] = bot.cache_stats()
+        data['transaction_writer'] = bot.tx_writer.stats()
+    # Cache des générations IA (chargé au premier appel IA du bot ou du panel)
+    ai_cache_module = sys.modules.get('utils.ai_cache')
+    if ai_cache_module is not None:
+        data['ai_cache'] = ai_cache_module.element_cache.stats()
+    ai_module = sys.modules.get('utils.ai_helper_gemini')
+    if ai_module is not None:
+        data['ai_calls'] = dict(ai_module.ai_stats, flights=ai_module.ai_flights.stats(),
+                                panel_flights=ai_module.element_flights.stats())
+    return jsonify(data)
+
+@app.route('/api/metrics/reset', methods=['POST'])
+@require_admin
+def api_metrics_reset():
+    query_metrics.reset()
+    return jsonify({'success': True})
 
 # Health check (Render)
 @app.route('/healthz')
@@ -335,15 +445,15 @@ def healthz():
         health_status = {
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
-            'database': 'connected' if supabase is not None else 'disconnected',
+            'database': 'connected' if storage is not None else 'disconnected',
             'discord_oauth': 'configured' if discord_client_id and discord_client_secret else 'not_configured',
             'admin_roles': len(ADMIN_ROLE_IDS) if ADMIN_ROLE_IDS else 0
         }
         
         # Test de la base de données si disponible
-        if supabase:
+        if storage is not None:
             try:
-                supabase.table('countries').select('id').limit(1).execute()
+                storage.select('countries', 'id', limit=1)
                 health_status['database_status'] = 'accessible'
             except Exception as e:
                 health_status['database_status'] = 'error'
@@ -354,7 +464,7 @@ def healthz():
         status_code = 200
         if health_status['status'] == 'degraded':
             status_code = 503
-        elif not supabase or not discord_client_id:
+        elif storage is None or not discord_client_id:
             health_status['status'] = 'unhealthy'
             status_code = 503
         
@@ -473,15 +583,7 @@ def logout():
 @handle_api_errors
 def api_countries():
     """Récupérer tous les pays"""
-    print("INFO: Récupération de tous les pays...")
-    result = supabase.table('countries').select('*').execute()
-    
-    if result.data is None:
-        print("WARNING: Aucun pays trouvé dans la base de données")
-        return jsonify([])
-    
-    print(f"SUCCESS: {len(result.data)} pays récupérés")
-    return jsonify(result.data)
+    return list_snapshot_table('countries')
 
 @app.route('/api/countries', methods=['POST'])
 @rate_limit
@@ -496,14 +598,14 @@ def api_create_country():
         return jsonify({'error': 'No data provided'}), 400
     
     print(f"INFO: Création d'un nouveau pays: {data.get('name', 'N/A')}")
-    result = supabase.table('countries').insert(data).execute()
+    rows = storage.insert('countries', data)
     
-    if result.data:
-        country = result.data[0]
+    if rows:
+        country = rows[0]
         username, user_id = get_user_info()
         log_country_created(country, username, user_id)
         print(f"SUCCESS: Pays créé avec ID {country.get('id', 'N/A')}")
-        return jsonify({'success': True, 'data': result.data})
+        return jsonify({'success': True, 'data': rows})
     
     print("ERREUR: Échec de la création du pays - pas de données retournées")
     return jsonify({'error': 'Failed to create country'}), 500
@@ -514,47 +616,49 @@ def api_country(country_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         if request.method == 'GET':
-            result = supabase.table('countries').select('*').eq('id', country_id).execute()
-            if result.data:
-                return jsonify(result.data[0])
+            rows = storage.select('countries', filters={'id': country_id})
+            if rows:
+                return jsonify(rows[0])
             return jsonify({'error': 'Country not found'}), 404
         
         elif request.method == 'PUT':
-            old_country = supabase.table('countries').select('*').eq('id', country_id).execute()
+            old_country = storage.select('countries', filters={'id': country_id})
             
             data = request.json
-            result = supabase.table('countries').update(data).eq('id', country_id).execute()
+            rows = storage.update('countries', data, {'id': country_id})
+            evict_bot_cache(country_ids=[country_id])
             
-            if result.data:
-                country = result.data[0]
+            if rows:
+                country = rows[0]
                 changes = []
                 for key, value in data.items():
-                    if key in old_country.data[0]:
-                        changes.append(f"{key}: {old_country.data[0][key]} → {value}")
+                    if old_country and key in old_country[0]:
+                        changes.append(f"{key}: {old_country[0][key]} → {value}")
                 
                 username, user_id = get_user_info()
                 log_country_modified(country, changes, username, user_id)
                 
-                return jsonify({'success': True, 'data': result.data})
+                return jsonify({'success': True, 'data': rows})
             
             return jsonify({'error': 'Failed to update country'}), 500
         
         elif request.method == 'DELETE':
-            old_country = supabase.table('countries').select('*').eq('id', country_id).execute()
+            old_country = storage.select('countries', filters={'id': country_id})
             
-            supabase.table('players').update({
+            members = storage.update('players', {
                 'country_id': None,
                 'role': 'recruit'
-            }).eq('country_id', country_id).execute()
+            }, {'country_id': country_id})
             
-            result = supabase.table('countries').delete().eq('id', country_id).execute()
+            storage.delete('countries', {'id': country_id})
+            evict_bot_cache([member['id'] for member in members], [country_id])
             
-            if old_country.data:
+            if old_country:
                 username, user_id = get_user_info()
-            log_country_deleted(old_country.data[0].get('name', 'Inconnu'), country_id, username, user_id)
+            log_country_deleted(old_country[0].get('name', 'Inconnu'), country_id, username, user_id)
             
             return jsonify({'success': True})
     
@@ -569,10 +673,9 @@ def api_players():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('players').select('*').execute()
-        return jsonify(result.data)
+        return list_snapshot_table('players')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -582,36 +685,38 @@ def api_player(player_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         if request.method == 'PUT':
-            old_player = supabase.table('players').select('*').eq('id', player_id).execute()
+            old_player = storage.select('players', filters={'id': player_id})
             
             data = request.json
-            result = supabase.table('players').update(data).eq('id', player_id).execute()
+            rows = storage.update('players', data, {'id': player_id})
+            evict_bot_cache([player_id])
             
-            if result.data:
-                player = result.data[0]
+            if rows:
+                player = rows[0]
                 changes = []
                 for key, value in data.items():
-                    if old_player.data and key in old_player.data[0]:
-                        changes.append(f"{key}: {old_player.data[0][key]} → {value}")
+                    if old_player and key in old_player[0]:
+                        changes.append(f"{key}: {old_player[0][key]} → {value}")
                 
                 username, user_id = get_user_info()
                 log_player_modified(player, changes, username, user_id)
                 
-                return jsonify({'success': True, 'data': result.data})
+                return jsonify({'success': True, 'data': rows})
             
             return jsonify({'error': 'Failed to update player'}), 500
         
         elif request.method == 'DELETE':
-            old_player = supabase.table('players').select('*').eq('id', player_id).execute()
+            old_player = storage.select('players', filters={'id': player_id})
             
-            result = supabase.table('players').delete().eq('id', player_id).execute()
+            storage.delete('players', {'id': player_id})
+            evict_bot_cache([player_id])
             
-            if old_player.data:
+            if old_player:
                 username, user_id = get_user_info()
-            log_player_deleted(old_player.data[0].get('username', 'Inconnu'), player_id, username, user_id)
+            log_player_deleted(old_player[0].get('username', 'Inconnu'), player_id, username, user_id)
             
             return jsonify({'success': True})
     
@@ -626,10 +731,46 @@ def api_wars():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
+            return jsonify({'error': 'Database not configured'}), 500
+        return list_snapshot_table('wars')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/wars/simulate', methods=['POST'])
+@rate_limit
+def api_simulate_war():
+    """Simulation Monte-Carlo d'une guerre entre deux pays, sans la déclarer.
+    Body JSON attendu:
+    {
+      "attacker_id": "<id>",
+      "defender_id": "<id>",
+      "trials": <int optionnel, 10000 par défaut>,
+      "seed": <int optionnel, pour rejouer la même simulation>
+    }
+    """
+    if not is_user_admin():
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    try:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('wars').select('*').execute()
-        return jsonify(result.data)
+        data = request.json or {}
+        attacker_id, defender_id = str(data.get('attacker_id', '')), str(data.get('defender_id', ''))
+        try:
+            trials = int(data.get('trials', DEFAULT_TRIALS))
+            seed = int(data['seed']) if data.get('seed') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Paramètres invalides'}), 400
+        if not attacker_id or attacker_id == defender_id:
+            return jsonify({'error': 'Paramètres invalides'}), 400
+
+        countries = {str(country['id']): country for country in world_snapshot.table('countries')}
+        if attacker_id not in countries or defender_id not in countries:
+            return jsonify({'error': 'Pays introuvable'}), 404
+
+        return jsonify(simulate_war(countries[attacker_id], countries[defender_id], trials, seed=seed,
+                                    war_cost=GAME_CONFIG['war_rules']['declaration_cost']))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -639,21 +780,21 @@ def api_war(war_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         if request.method == 'PUT':
             data = request.json
-            result = supabase.table('wars').update(data).eq('id', war_id).execute()
+            rows = storage.update('wars', data, {'id': war_id})
             
-            if result.data:
+            if rows:
                 username, user_id = get_user_info()
                 log_war_ended(war_id, username, user_id)
-                return jsonify({'success': True, 'data': result.data})
+                return jsonify({'success': True, 'data': rows})
             
             return jsonify({'error': 'Failed to update war'}), 500
         
         elif request.method == 'DELETE':
-            result = supabase.table('wars').delete().eq('id', war_id).execute()
+            storage.delete('wars', {'id': war_id})
             
             username, user_id = get_user_info()
             log_war_deleted(war_id, username, user_id)
@@ -669,16 +810,16 @@ def api_end_all_wars():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('wars').update({
+        rows = storage.update('wars', {
             'ended_at': datetime.now().isoformat()
-        }).is_('ended_at', 'null').execute()
+        }, {'ended_at': None})
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Fin de toutes les guerres", r"{len(result.data) if result.data else 0} guerres terminées", username=username, user_id=user_id)
+        log_tools_action(r"� Fin de toutes les guerres", r"{len(rows)} guerres terminées", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(result.data) if result.data else 0})
+        return jsonify({'success': True, 'count': len(rows)})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -690,10 +831,9 @@ def api_events():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('events').select('*').order('created_at', desc=True).limit(50).execute()
-        return jsonify(result.data)
+        return jsonify(world_snapshot.table('events'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -703,16 +843,16 @@ def api_trigger_event():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         data = request.json
         
         # Créer un événement aléatoire si aucune donnée n'est fournie
         if not data:
             import random
-            countries = supabase.table('countries').select('id').execute()
-            if countries.data:
-                random_country = random.choice(countries.data)
+            countries = storage.select('countries', 'id')
+            if countries:
+                random_country = random.choice(countries)
                 
                 event_types = [
                     {'type': 'disaster', 'description': 'Catastrophe naturelle', 'impact': {'stability': -10, 'economy': -5}},
@@ -739,14 +879,14 @@ def api_trigger_event():
 
         # Insérer
         print(f"📝 Insertion événement: {data}")
-        result = supabase.table('events').insert(data).execute()
+        rows = storage.insert('events', data)
         
-        if result.data:
+        if rows:
             username, user_id = get_user_info()
             log_event_triggered(data, username, user_id)
-            return jsonify({'success': True, 'data': result.data})
+            return jsonify({'success': True, 'data': rows})
         
-        print(f"ERREUR Insertion échouée: {result}")
+        print(f"ERREUR Insertion échouée: {data}")
         return jsonify({'error': 'Failed to trigger event'}), 500
     
     except Exception as e:
@@ -760,7 +900,7 @@ def api_transactions():
     if not is_user_admin():
         return jsonify({'error': 'Unauthorized'}), 403
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         ttype = request.args.get('type')
         country_id = request.args.get('country_id')
@@ -769,20 +909,21 @@ def api_transactions():
         date_to = request.args.get('to')
         limit = int(request.args.get('limit', '200'))
 
-        q = supabase.table('transactions').select('*').order('created_at', desc=True).limit(limit)
+        filters = {}
         if ttype:
-            q = q.eq('type', ttype)
+            filters['type'] = ttype
         if country_id:
-            q = q.eq('country_id', country_id)
+            filters['country_id'] = country_id
         if player_id:
-            q = q.eq('player_id', player_id)
+            filters['player_id'] = player_id
+        # Bornes de date : deux conditions sur created_at, la seconde en clause any_of
         if date_from:
-            q = q.gte('created_at', date_from)
-        if date_to:
-            q = q.lte('created_at', date_to)
+            filters['created_at'] = ('gte', date_from)
+        any_of = [{'created_at': ('lte', date_to)}] if date_to else None
 
-        res = q.execute()
-        return jsonify({'success': True, 'data': res.data})
+        rows = storage.select('transactions', filters=filters or None, any_of=any_of,
+                              order='created_at', desc=True, limit=limit)
+        return jsonify({'success': True, 'data': rows})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -793,22 +934,11 @@ def api_statistics():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        countries_count = supabase.table('countries').select('id', count='exact').execute()
-        players_count = supabase.table('players').select('id', count='exact').execute()
-        active_wars = supabase.table('wars').select('id', count='exact').is_('ended_at', 'null').execute()
-        
-        top_economy = supabase.table('countries').select('name, economy').order('economy', desc=True).limit(5).execute()
-        top_military = supabase.table('countries').select('name, army_strength').order('army_strength', desc=True).limit(5).execute()
-        
-        return jsonify({
-            'countries_count': countries_count.count,
-            'players_count': players_count.count,
-            'active_wars': active_wars.count,
-            'top_economy': top_economy.data,
-            'top_military': top_military.data
-        })
+        # Relecture seulement si l'instantané est périmé ; les agrégats sont déjà calculés
+        world_snapshot.get()
+        return jsonify(world_statistics.snapshot())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -819,7 +949,7 @@ def api_reset_resources():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         default_resources = {
             'money': 5000,
@@ -830,14 +960,15 @@ def api_reset_resources():
             'materials': 30
         }
         
-        result = supabase.table('countries').update({
+        rows = storage.update('countries', {
             'resources': default_resources
-        }).neq('id', 0).execute()
+        }, {'id': ('neq', None)})
+        evict_bot_cache(country_ids=None)
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Réinitialisation des ressources", r"{len(result.data) if result.data else 0} pays réinitialisés", username=username, user_id=user_id)
+        log_tools_action(r"� Réinitialisation des ressources", r"{len(rows)} pays réinitialisés", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(result.data) if result.data else 0})
+        return jsonify({'success': True, 'count': len(rows)})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -848,58 +979,51 @@ def api_reset_stats():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('countries').update({
+        rows = storage.update('countries', {
             'economy': 50,
             'army_strength': 20,
             'stability': 80
-        }).neq('id', 0).execute()
+        }, {'id': ('neq', None)})
+        evict_bot_cache(country_ids=None)
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Réinitialisation des statistiques", r"{len(result.data) if result.data else 0} pays réinitialisés", username=username, user_id=user_id)
+        log_tools_action(r"� Réinitialisation des statistiques", r"{len(rows)} pays réinitialisés", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(result.data) if result.data else 0})
+        return jsonify({'success': True, 'count': len(rows)})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/tools/backup', methods=['POST'])
+@rate_limit
 def api_backup():
+    """Sauvegarde complète en flux NDJSON gzip (?gzip=0 pour du texte brut)"""
     if not is_user_admin():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        # Récupérer toutes les données
-        countries = supabase.table('countries').select('*').execute()
-        players = supabase.table('players').select('*').execute()
-        wars = supabase.table('wars').select('*').execute()
-        events = supabase.table('events').select('*').execute()
-        
-        backup_data = {
-            'timestamp': datetime.now().isoformat(),
-            'countries': countries.data,
-            'players': players.data,
-            'wars': wars.data,
-            'events': events.data
-        }
-        
-        # Sauvegarder dans un fichier
-        backup_file = f'backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-        with open(backup_file, 'w') as f:
-            json.dump(backup_data, f, indent=2)
+        compress = request.args.get('gzip', '1') != '0'
+        backup_name = f'backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Sauvegarde créée", r"Fichier: {backup_file}", username=username, user_id=user_id)
+        log_tools_action("💾 Sauvegarde créée", f"Fichier: {backup_name} (tables: {', '.join(EXPORT_TABLES)})", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'file': backup_file})
+        return Response(
+            export_stream(backup_lines(storage), compress),
+            headers=export_headers(backup_name, 'ndjson', compress)
+        )
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+COUNTRY_RESOURCES = ['money', 'food', 'metal', 'oil', 'energy', 'materials']
+
 @app.route('/api/tools/give', methods=['POST'])
+@rate_limit
 def api_give():
     """Donner une ressource/argent à un joueur/pays ou à tous (admin requis).
     Body JSON attendu:
@@ -914,7 +1038,7 @@ def api_give():
         return jsonify({'error': 'Unauthorized'}), 403
 
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
         data = request.json or {}
         target_type = data.get('target_type')
@@ -925,56 +1049,29 @@ def api_give():
         if amount == 0 or not resource or not target_type:
             return jsonify({'error': 'Paramètres invalides'}), 400
 
-        # Donner à un joueur: met à jour le solde personnel (balance)
-        if target_type == 'player':
-            if resource in ['balance', 'money']:
-                result = supabase.table('players').update({
-                    'balance': supabase.rpc('increment_field', {
-                        'table_name': 'players',
-                        'row_id': target_id,
-                        'field_name': 'balance',
-                        'delta': amount
-                    })
-                }).eq('id', target_id).execute()
-                # fallback sans RPC
-                if not result.data:
-                    player = supabase.table('players').select('balance').eq('id', target_id).execute()
-                    if player.data:
-                        new_balance = (player.data[0].get('balance', 0) or 0) + amount
-                        supabase.table('players').update({'balance': new_balance}).eq('id', target_id).execute()
-            else:
-                return jsonify({'error': 'Ressource invalide pour un joueur'}), 400
-
-        # Donner à un pays: met à jour le champ resources JSON
-        elif target_type == 'country':
-            country = supabase.table('countries').select('resources').eq('id', target_id).execute()
-            if not country.data:
-                return jsonify({'error': 'Pays introuvable'}), 404
-            resources = country.data[0].get('resources') or {}
-            resources[resource] = (resources.get(resource, 0) or 0) + amount
-            supabase.table('countries').update({'resources': resources}).eq('id', target_id).execute()
-
-        elif target_type == 'all_players':
+        # Une seule requête groupée par don (RPC bulk_add_*), même pour "tous"
+        if target_type in ('player', 'all_players'):
             if resource not in ['balance', 'money']:
-                return jsonify({'error': 'Ressource invalide pour all_players'}), 400
-            players = supabase.table('players').select('id,balance').execute()
-            for p in (players.data or []):
-                new_balance = (p.get('balance', 0) or 0) + amount
-                supabase.table('players').update({'balance': new_balance}).eq('id', p['id']).execute()
-
-        elif target_type == 'all_countries':
-            countries = supabase.table('countries').select('id,resources').execute()
-            for c in (countries.data or []):
-                res = c.get('resources') or {}
-                res[resource] = (res.get(resource, 0) or 0) + amount
-                supabase.table('countries').update({'resources': res}).eq('id', c['id']).execute()
+                return jsonify({'error': f'Ressource invalide pour {target_type}'}), 400
+            target_ids = [target_id] if target_type == 'player' else None
+            updated = storage.bulk_add_player_balance(amount, target_ids)
+            evict_bot_cache(player_ids=target_ids)
+        elif target_type in ('country', 'all_countries'):
+            if resource not in COUNTRY_RESOURCES:
+                return jsonify({'error': 'Ressource invalide pour un pays'}), 400
+            target_ids = [target_id] if target_type == 'country' else None
+            updated = storage.bulk_add_country_resource(resource, amount, target_ids)
+            evict_bot_cache(country_ids=target_ids)
         else:
             return jsonify({'error': 'target_type invalide'}), 400
+        
+        if target_type in ('player', 'country') and not updated:
+            return jsonify({'error': 'Cible introuvable'}), 404
 
         username, user_id = get_user_info()
-        log_tools_action(r"🎁 Don", r"Cible: {target_type} {target_id or ''} | Ressource: {resource} | Montant: {amount}", username=username, user_id=user_id)
+        log_tools_action("🎁 Don", f"Cible: {target_type} {target_id or ''} | Ressource: {resource} | Montant: {amount} | {updated} ligne(s)", username=username, user_id=user_id)
 
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'updated': updated})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -984,16 +1081,17 @@ def api_promote_citizens():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('players').update({
+        rows = storage.update('players', {
             'role': 'citizen'
-        }).eq('role', 'recruit').execute()
+        }, {'role': 'recruit'})
+        evict_bot_cache([row['id'] for row in rows])
         
         username, user_id = get_user_info()
-        log_tools_action(r"⬆️ Promotion de tous les recrues", r"{len(result.data) if result.data else 0} joueurs promus", username=username, user_id=user_id)
+        log_tools_action(r"⬆️ Promotion de tous les recrues", r"{len(rows)} joueurs promus", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(result.data) if result.data else 0})
+        return jsonify({'success': True, 'count': len(rows)})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1004,24 +1102,18 @@ def api_give_money():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        amount = request.json.get('amount', 1000)
-        
-        # Récupérer tous les joueurs
-        players = supabase.table('players').select('*').execute()
+        amount = int(request.json.get('amount', 1000))
         
-        # Mettre à jour chaque joueur
-        for player in players.data:
-            new_balance = (player.get('balance', 0) or 0) + amount
-            supabase.table('players').update({
-                'balance': new_balance
-            }).eq('id', player['id']).execute()
+        # Un seul UPDATE pour tous les joueurs
+        count = storage.bulk_add_player_balance(amount)
+        evict_bot_cache(player_ids=None)
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Distribution d'argent", r"{amount}� donnés à {len(players.data)} joueurs", username=username, user_id=user_id)
+        log_tools_action("💰 Distribution d'argent", f"{amount}💵 donnés à {count} joueurs", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(players.data)})
+        return jsonify({'success': True, 'count': count})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1032,36 +1124,53 @@ def api_reset_players():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        result = supabase.table('players').update({
+        rows = storage.update('players', {
             'balance': 0,
             'role': 'recruit',
             'country_id': None
-        }).neq('id', '0').execute()
+        }, {'id': ('neq', None)})
+        evict_bot_cache(player_ids=None)
         
         username, user_id = get_user_info()
-        log_tools_action(r"� Réinitialisation des joueurs", r"{len(result.data) if result.data else 0} joueurs réinitialisés", username=username, user_id=user_id)
+        log_tools_action(r"� Réinitialisation des joueurs", r"{len(rows)} joueurs réinitialisés", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'count': len(result.data) if result.data else 0})
+        return jsonify({'success': True, 'count': len(rows)})
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/players/export')
 def api_export_players():
+    return api_export_table('players')
+
+@app.route('/api/export/<table>')
+@rate_limit
+def api_export_table(table):
+    """Export en flux d'une table (?format=ndjson|csv, ?gzip=1)"""
     if not is_user_admin():
         return jsonify({'error': 'Unauthorized'}), 403
     
+    if table not in EXPORT_TABLES:
+        return jsonify({'error': f'Table inconnue: {table}'}), 400
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Format inconnu: {fmt}'}), 400
+    compress = request.args.get('gzip') == '1'
+    
     try:
-        if supabase is None:
+        if storage is None:
             return jsonify({'error': 'Database not configured'}), 500
-        players = supabase.table('players').select('*').execute()
-        
         username, user_id = get_user_info()
-        log_tools_action(r"� Export des joueurs", r"{len(players.data)} joueurs exportés", username=username, user_id=user_id)
+        log_tools_action(f"📤 Export {table}", f"Format: {fmt}{' (gzip)' if compress else ''}", username=username, user_id=user_id)
         
-        return jsonify({'success': True, 'data': players.data})
+        rows = iter_table_rows(storage, table)
+        lines = csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+        return Response(
+            export_stream(lines, compress),
+            headers=export_headers(f'{table}_{datetime.now().strftime("%Y%m%d")}', fmt, compress)
+        )
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1089,68 +1198,40 @@ def handle_disconnect():
     print('📤 Admin déconnecté du Socket.IO')
 
 @socketio.on('request_update')
-def handle_update_request():
-    """Mise à jour des données avec gestion d'erreurs améliorée"""
+def handle_update_request(payload=None):
+    """Envoi des changements depuis la version du client (instantané complet si nécessaire)"""
     if not is_user_admin():
         emit('error', {'message': 'Unauthorized'})
         return
     
     try:
-        if supabase is None:
+        if storage is None:
             emit('error', {'message': 'Database not configured'})
             return
         
-        # Récupération des données avec gestion d'erreurs individuelle
-        countries_data = []
-        players_data = []
-        wars_data = []
-        events_data = []
-        elements_data = []  # NOUVEAU
-        
-        try:
-            countries = supabase.table('countries').select('*').execute()
-            countries_data = countries.data or []
-        except Exception as e:
-            print(f"❌ Erreur récupération pays: {e}")
-            countries_data = []
-        
-        try:
-            players = supabase.table('players').select('*').execute()
-            players_data = players.data or []
-        except Exception as e:
-            print(f"❌ Erreur récupération joueurs: {e}")
-            players_data = []
-        
-        try:
-            wars = supabase.table('wars').select('*').execute()
-            wars_data = wars.data or []
-        except Exception as e:
-            print(f"❌ Erreur récupération guerres: {e}")
-            wars_data = []
+        payload = payload or {}
+        # Une seule relecture de la base par intervalle, partagée par tous les onglets
+        world_snapshot.get(force=bool(payload.get('force')))
         
-        try:
-            events = supabase.table('events').select('*').order('created_at', desc=True).limit(50).execute()
-            events_data = events.data or []
-        except Exception as e:
-            print(f"❌ Erreur récupération événements: {e}")
-            events_data = []
+        delta = None
+        if payload.get('version') is not None and not payload.get('full'):
+            try:
+                delta = change_feed.changes_since(int(payload['version']), payload.get('epoch'))
+            except (TypeError, ValueError):
+                delta = None
         
-        try:  # NOUVEAU
-            elements = supabase.table('elements').select('*').order('created_at', desc=True).limit(50).execute()
-            elements_data = elements.data or []
-        except Exception as e:
-            print(f"❌ Erreur récupération éléments: {e}")
-            elements_data = []
+        if delta is not None:
+            if delta['changes']:
+                delta['statistics'] = world_statistics.snapshot()
+            delta['timestamp'] = datetime.now().isoformat()
+            emit('data_delta', delta)
+            return
         
-        emit('data_update', {
-            'countries': countries_data,
-            'players': players_data,
-            'wars': wars_data,
-            'events': events_data,
-            'elements': elements_data,  # NOUVEAU
-            'timestamp': datetime.now().isoformat()
-        })
-        print(f"✅ Données mises à jour via Socket.IO")
+        data = change_feed.snapshot()
+        data['statistics'] = world_statistics.snapshot()
+        data['timestamp'] = datetime.now().isoformat()
+        emit('data_update', data)
+        print(f"✅ Instantané complet envoyé via Socket.IO (version {data['version']})")
         
     except Exception as e:
         print(f"❌ Erreur générale Socket.IO: {e}")
@@ -1163,10 +1244,15 @@ def handle_update_request():
 @require_admin
 @require_database
 def get_elements():
-    """Récupérer tous les éléments"""
+    """Récupérer les éléments (pagination keyset côté base, 50 plus récents par défaut)"""
+    spec = LIST_SPECS['elements']
+    try:
+        params = parse_list_args(request.args, spec)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
-        elements = supabase.table('elements').select('*').order('created_at', desc=True).execute()
-        return jsonify(elements.data or [])
+        page = paginate_query(storage, 'elements', params, spec)
+        return jsonify(page if has_list_args(request.args, spec) else page['data'])
     except Exception as e:
         print(f"Erreur récupération éléments: {e}")
         return jsonify([])
@@ -1178,7 +1264,7 @@ def get_elements():
 def delete_element(element_id):
     """Supprimer un élément"""
     try:
-        supabase.table('elements').delete().eq('id', element_id).execute()
+        storage.delete('elements', {'id': element_id})
         return jsonify({'success': True})
     except Exception as e:
         print(f"Erreur suppression élément: {e}")
@@ -1189,7 +1275,7 @@ def delete_element(element_id):
 @require_admin
 @require_database
 def generate_element():
-    """Générer un élément avec IA Gemini"""
+    """Générer un élément avec IA Gemini (cache, appel partagé et exécuteur IA du bot, repli au délai)"""
     try:
         from utils.ai_helper_gemini import generate_vibrant_element
         data = request.json
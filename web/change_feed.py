@@ -0,0 +1,117 @@
+"""
+Flux de changements du panel : versions par ligne/table et deltas pour les clients Socket.IO
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from web.snapshot import SNAPSHOT_TABLES
+
+def row_hash(row: Dict[str, Any]) -> str:
+    return hashlib.blake2b(json.dumps(row, sort_keys=True, default=str).encode(), digest_size=12).hexdigest()
+
+class ChangeFeed:
+    """Compare chaque relecture de l'instantané à la précédente et journalise les
+    insertions/mises à jour/suppressions ; chaque client ne reçoit ensuite que les
+    changements postérieurs à sa version.
+    """
+
+    def __init__(self, tables=SNAPSHOT_TABLES, log_size: int = 5000):
+        self.tables = tables
+        self.version = 0
+        # Identifiant de ce processus : un client d'une instance précédente repart d'un instantané
+        self.epoch = f"{time.time():.0f}"
+        self._rows: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name, _, _ in tables}
+        self._hashes: Dict[str, Dict[str, str]] = {name: {} for name, _, _ in tables}
+        self._table_versions: Dict[str, int] = {name: 0 for name, _, _ in tables}
+        # (version, table, id, ligne ou None si supprimée)
+        self._log = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+        # Appelés pour chaque changement : (table, id, ancienne ligne, nouvelle ligne), None si absente
+        self._listeners: List[Callable[[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]] = []
+
+    def subscribe(self, listener: Callable[[str, str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]):
+        self._listeners.append(listener)
+
+    def ingest(self, data: Dict[str, List[Dict[str, Any]]]):
+        """Abonné de WorldSnapshot : comparer la nouvelle relecture à l'état connu"""
+        with self._lock:
+            for name, _, _ in self.tables:
+                if name in data:
+                    self._diff(name, data[name])
+
+    def _diff(self, table: str, rows: List[Dict[str, Any]]):
+        old_hashes = self._hashes[table]
+        old_rows = self._rows[table]
+        new_rows, new_hashes = {}, {}
+        for row in rows:
+            key = str(row.get('id'))
+            new_rows[key] = row
+            new_hashes[key] = digest = row_hash(row)
+            if old_hashes.get(key) != digest:
+                self._record(table, key, row, old_rows.get(key))
+        for key in old_hashes.keys() - new_hashes.keys():
+            self._record(table, key, None, old_rows.get(key))
+        self._rows[table] = new_rows
+        self._hashes[table] = new_hashes
+
+    def _record(self, table: str, key: str, row: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]] = None):
+        self.version += 1
+        self._table_versions[table] = self.version
+        self._log.append((self.version, table, key, row))
+        for listener in self._listeners:
+            try:
+                listener(table, key, old, row)
+            except Exception as e:
+                print(f"❌ Erreur abonné flux de changements: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Instantané complet (premier envoi ou client trop en retard)"""
+        with self._lock:
+            data = {}
+            for name, order, _ in self.tables:
+                rows = list(self._rows[name].values())
+                if order:
+                    rows.sort(key=lambda r: str(r.get(order) or ''), reverse=True)
+                data[name] = rows
+            data.update({'version': self.version, 'epoch': self.epoch, 'table_versions': dict(self._table_versions)})
+            return data
+
+    def changes_since(self, version: int, epoch: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Changements depuis version, regroupés par table ; None si un instantané est nécessaire"""
+        with self._lock:
+            if epoch != self.epoch or version > self.version:
+                return None
+            if version < self.version and (not self._log or self._log[0][0] > version + 1):
+                return None
+            changes: Dict[str, Dict[str, Any]] = {}
+            # Dernier état de chaque ligne uniquement
+            latest: Dict[tuple, Optional[Dict[str, Any]]] = {}
+            for entry_version, table, key, row in reversed(self._log):
+                if entry_version <= version:
+                    break
+                latest.setdefault((table, key), row)
+            for (table, key), row in latest.items():
+                bucket = changes.setdefault(table, {'upserts': [], 'deletes': []})
+                if row is None:
+                    bucket['deletes'].append(key)
+                else:
+                    bucket['upserts'].append(row)
+            return {
+                'from_version': version,
+                'version': self.version,
+                'epoch': self.epoch,
+                'changes': changes,
+                'table_versions': dict(self._table_versions)
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'version': self.version,
+                'log_entries': len(self._log),
+                'oldest_version': self._log[0][0] if self._log else self.version,
+                'rows': {name: len(rows) for name, rows in self._rows.items()}
+            }
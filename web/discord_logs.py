@@ -1,10 +1,166 @@
 """
 Module pour les logs Discord améliorés et lisibles
+
+Les logs sont envoyés par un thread dédié : la requête du panel ne fait que mettre l'embed
+en file, plusieurs logs partent dans un même message et les limites de Discord sont respectées.
 """
 import requests
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List
+
+# Limites Discord par message de webhook
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+# Attente avant envoi pour regrouper les logs d'une même rafale (outils en masse)
+BATCH_DELAY = 0.5
+QUEUE_SIZE = 1000
+MAX_ATTEMPTS = 5
+
+def _embed_size(embed: Dict[str, Any]) -> int:
+    """Nombre de caractères comptés par Discord pour un embed"""
+    size = len(embed.get('title', '')) + len(embed.get('description', ''))
+    size += len(embed.get('footer', {}).get('text', ''))
+    for field in embed.get('fields', []):
+        size += len(field.get('name', '')) + len(field.get('value', ''))
+    return size
+
+class WebhookDispatcher:
+    """File d'envoi des logs vers le webhook Discord (thread d'arrière-plan, session HTTP partagée).
+
+    Les embeds en attente pour un même webhook sont regroupés par 10 (et 6000 caractères) ;
+    un 429 est rejoué après le retry_after indiqué par Discord.
+    """
+
+    def __init__(self, username: str = "🌍 World Dominion Admin", batch_delay: float = BATCH_DELAY,
+                 queue_size: int = QUEUE_SIZE):
+        self.username = username
+        self.batch_delay = batch_delay
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Élément lu dans la file mais destiné au message suivant
+        self._pending = None
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.sent_messages = 0
+        self.sent_embeds = 0
+        self.dropped = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    def submit(self, webhook_url: str, embed: Dict[str, Any]) -> bool:
+        """Mettre un embed en file sans jamais bloquer (False si la file est pleine)"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((webhook_url, embed))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print("Erreur envoi log Discord: file pleine, log ignoré")
+            return False
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='discord-webhook', daemon=True)
+                self._thread.start()
+
+    def flush(self, timeout: float = 10) -> bool:
+        """Attendre l'envoi des logs en file (arrêt du panel, tests)"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def _next(self, timeout: Optional[float]):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        return self._queue.get(timeout=timeout) if timeout is None or timeout > 0 else self._queue.get_nowait()
+
+    def _run(self):
+        while True:
+            webhook_url, embed = self._next(None)
+            batch = [embed]
+            size = _embed_size(embed)
+            deadline = time.time() + self.batch_delay
+            # Regrouper ce qui arrive pendant batch_delay, dans les limites d'un message
+            while len(batch) < MAX_EMBEDS_PER_MESSAGE:
+                try:
+                    item = self._next(deadline - time.time())
+                except queue.Empty:
+                    break
+                item_size = _embed_size(item[1])
+                if item[0] != webhook_url or size + item_size > MAX_EMBED_CHARS_PER_MESSAGE:
+                    self._pending = item
+                    break
+                batch.append(item[1])
+                size += item_size
+            try:
+                self._post(webhook_url, batch)
+            except Exception as e:
+                self.failures += 1
+                print(f"Erreur envoi log Discord: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _post(self, webhook_url: str, embeds: List[Dict[str, Any]]):
+        payload = {"embeds": embeds, "username": self.username}
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                response = self._session.post(webhook_url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                print(f"Erreur envoi log Discord: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            if response.status_code == 429:
+                self.rate_limited += 1
+                time.sleep(self._retry_after(response))
+                continue
+            if response.status_code >= 500:
+                time.sleep(2 ** attempt)
+                continue
+            if response.status_code >= 400:
+                self.failures += 1
+                print(f"Erreur envoi log Discord: {response.status_code}")
+                return
+            self.sent_messages += 1
+            self.sent_embeds += len(embeds)
+            print(f"Log Discord envoye: {len(embeds)} embed(s)")
+            # Seau de limite épuisé : attendre sa remise à zéro avant le message suivant
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                time.sleep(float(response.headers.get('X-RateLimit-Reset-After', 0) or 0))
+            return
+        self.failures += 1
+        print(f"Erreur envoi log Discord: abandon après {MAX_ATTEMPTS} tentatives ({len(embeds)} embed(s))")
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return float(response.json().get('retry_after', 1))
+        except (ValueError, AttributeError):
+            return float(response.headers.get('Retry-After', 1) or 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': self._queue.qsize(),
+            'sent_messages': self.sent_messages,
+            'sent_embeds': self.sent_embeds,
+            'dropped': self.dropped,
+            'rate_limited': self.rate_limited,
+            'failures': self.failures
+        }
+
+# Instance globale partagée par tous les logs du panel
+webhook_dispatcher = WebhookDispatcher()
 
 def format_number(n: int) -> str:
     """Formate un nombre avec des séparateurs de milliers"""
@@ -14,7 +170,7 @@ def format_number(n: int) -> str:
         return str(n)
 
 def send_discord_log(action: str, details: str, color: int = 0x00ff00, username: str = "Inconnu", user_id: str = "Inconnu"):
-    """Envoie un log formaté et lisible sur Discord avec embed"""
+    """Met en file un log formaté et lisible pour Discord (envoi en arrière-plan)"""
     try:
         # Déterminer la couleur selon l'action
         action_lower = action.lower()
@@ -72,20 +228,9 @@ def send_discord_log(action: str, details: str, color: int = 0x00ff00, username:
             }
         }
         
-        payload = {
-            "embeds": [embed],
-            "username": "🌍 World Dominion Admin",
-        }
-        
         webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
         if webhook_url:
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            if response.status_code == 204:
-                print(f"Log Discord envoye: {action}")
-                return True
-            else:
-                print(f"Erreur envoi log Discord: {response.status_code}")
-                return False
+            return webhook_dispatcher.submit(webhook_url, embed)
         else:
             print("DISCORD_WEBHOOK_URL non configure")
             return False
@@ -0,0 +1,103 @@
+"""
+Exports en flux (NDJSON/CSV, gzip optionnel) : les tables sont lues par pages et écrites
+au fil de l'eau dans la réponse, la mémoire reste constante quelle que soit leur taille
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+EXPORT_TABLES = ('players', 'countries', 'wars', 'events', 'alliances', 'elements', 'transactions')
+EXPORT_FORMATS = ('ndjson', 'csv')
+PAGE_SIZE = 500
+# Taille visée des morceaux envoyés au client
+CHUNK_BYTES = 64 * 1024
+
+def iter_table_rows(backend, table: str, page_size: int = PAGE_SIZE, columns: str = '*') -> Iterator[Dict[str, Any]]:
+    """Parcourir une table par pages keyset sur id (jamais plus d'une page en mémoire)"""
+    last_id = None
+    while True:
+        filters = {'id': ('gt', last_id)} if last_id is not None else None
+        rows = backend.select(table, columns, filters, order='id', limit=page_size)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+def _json_line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str, separators=(',', ':')) + '\n'
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield _json_line(row)
+
+def csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """CSV avec en-tête pris sur la première ligne ; colonnes JSON (dict/list) sérialisées"""
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row.keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({
+            key: json.dumps(value, ensure_ascii=False, default=str) if isinstance(value, (dict, list)) else value
+            for key, value in row.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def backup_lines(backend, tables: Iterable[str] = EXPORT_TABLES) -> Iterator[str]:
+    """Sauvegarde NDJSON : une ligne d'en-tête puis {"table", "row"} pour chaque ligne"""
+    tables = list(tables)
+    yield _json_line({'backup': {'timestamp': datetime.now().isoformat(), 'tables': tables}})
+    for table in tables:
+        try:
+            for row in iter_table_rows(backend, table):
+                yield _json_line({'table': table, 'row': row})
+        except Exception as e:
+            # Une table absente ne doit pas interrompre toute la sauvegarde
+            print(f"Erreur export {table}: {e}")
+            yield _json_line({'table': table, 'error': str(e)})
+
+def chunked(lines: Iterable[str], chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """Regrouper les lignes en morceaux d'environ chunk_bytes octets"""
+    parts: List[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compression gzip incrémentale (un seul compresseur pour tout le flux)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(lines: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    chunks = chunked(lines)
+    return gzip_stream(chunks) if compress else chunks
+
+def export_headers(filename: str, fmt: str, compress: bool) -> Dict[str, str]:
+    """En-têtes HTTP de téléchargement (nom de fichier et type selon format/compression)"""
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    # Pas de mise en tampon par un proxy (Render, nginx)
+    headers = {'X-Accel-Buffering': 'no'}
+    if compress:
+        headers['Content-Type'] = 'application/gzip'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}.{extension}.gz"'
+    else:
+        headers['Content-Type'] = 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson; charset=utf-8'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return headers
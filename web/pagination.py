@@ -0,0 +1,183 @@
+"""
+Pagination par curseur (keyset), projection de colonnes, filtres et tri des endpoints de liste du panel
+"""
+import base64
+import bisect
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Paramètres réservés (les autres arguments reconnus sont des filtres d'égalité)
+RESERVED_ARGS = ('limit', 'cursor', 'fields', 'sort', 'order', 'q')
+
+class ListSpec:
+    """Colonnes autorisées d'un endpoint de liste"""
+
+    def __init__(self, fields: Sequence[str], sorts: Sequence[str], filters: Sequence[str] = (),
+                 search: Optional[str] = None, default_sort: str = 'id', default_desc: bool = False):
+        self.fields = tuple(fields)
+        self.sorts = tuple(sorts)
+        self.filters = tuple(filters)
+        self.search = search
+        self.default_sort = default_sort
+        self.default_desc = default_desc
+
+class ListParams:
+    """Paramètres validés d'une requête de liste"""
+
+    def __init__(self, limit: int, cursor: Optional[Tuple[Any, str]], fields: Optional[List[str]],
+                 sort: str, desc: bool, filters: Dict[str, Any], search: Optional[str]):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+        self.sort = sort
+        self.desc = desc
+        self.filters = filters
+        self.search = search
+
+    def columns(self) -> str:
+        """Colonnes à sélectionner (id et colonne de tri toujours inclus pour le curseur)"""
+        if not self.fields:
+            return '*'
+        return ','.join(dict.fromkeys(['id', self.sort, *self.fields]))
+
+def has_list_args(args, spec: ListSpec) -> bool:
+    """La requête utilise-t-elle la pagination (sinon réponse historique : tableau complet) ?"""
+    return any(key in RESERVED_ARGS or key in spec.filters for key in args)
+
+def encode_cursor(value: Any, row_id: Any) -> str:
+    raw = json.dumps([value, str(row_id)], default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return value, str(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Curseur invalide') from e
+
+def _coerce(value: str) -> Optional[str]:
+    """Valeur de filtre texte ('null' -> IS NULL ; le reste est comparé en texte)"""
+    return None if value.lower() == 'null' else value
+
+def _matches(value: Any, expected: Optional[str]) -> bool:
+    if expected is None:
+        return value is None
+    if isinstance(value, bool):
+        return str(value).lower() == expected.lower()
+    return value is not None and str(value) == expected
+
+def parse_list_args(args, spec: ListSpec) -> ListParams:
+    """Valider les arguments de requête ; lève ValueError avec un message lisible"""
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError('limit doit être un entier')
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    fields = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in spec.fields]
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+
+    sort = args.get('sort', spec.default_sort)
+    if sort not in spec.sorts:
+        raise ValueError(f"Tri impossible sur '{sort}' (autorisés: {', '.join(spec.sorts)})")
+    order = args.get('order')
+    desc = spec.default_desc if order is None else order.lower() == 'desc'
+
+    filters = {key: _coerce(args[key]) for key in args if key in spec.filters}
+
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+    search = (args.get('q') or '').strip() or None
+    return ListParams(limit, cursor, fields, sort, desc, filters, search if spec.search else None)
+
+def _sort_key(row: Dict[str, Any], column: str) -> tuple:
+    # Les valeurs nulles sont classées en dernier ; l'id départage les égalités
+    value = row.get(column)
+    if value is None:
+        return (1, '', str(row.get('id')))
+    if isinstance(value, bool):
+        value = int(value)
+    return (0, value, str(row.get('id')))
+
+def _cursor_key(cursor: Tuple[Any, str]) -> tuple:
+    value, row_id = cursor
+    return (1, '', row_id) if value is None else (0, value, row_id)
+
+def _project(row: Dict[str, Any], params: ListParams) -> Dict[str, Any]:
+    if not params.fields:
+        return row
+    return {key: row.get(key) for key in dict.fromkeys(['id', *params.fields])}
+
+def page_response(rows: List[Dict[str, Any]], params: ListParams) -> Dict[str, Any]:
+    """Enveloppe de réponse à partir de limit+1 lignes (la dernière signale une page suivante)"""
+    has_more = len(rows) > params.limit
+    rows = rows[:params.limit]
+    next_cursor = encode_cursor(rows[-1].get(params.sort), rows[-1].get('id')) if has_more and rows else None
+    return {
+        'data': [_project(row, params) for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'limit': params.limit
+    }
+
+def paginate_rows(rows: List[Dict[str, Any]], params: ListParams, spec: ListSpec) -> Dict[str, Any]:
+    """Pagination en mémoire (tables de l'instantané partagé)"""
+    if params.filters:
+        rows = [row for row in rows if all(_matches(row.get(c), v) for c, v in params.filters.items())]
+    if params.search:
+        needle = params.search.lower()
+        rows = [row for row in rows if needle in str(row.get(spec.search) or '').lower()]
+    try:
+        ordered = sorted(rows, key=lambda row: _sort_key(row, params.sort))
+        keys = [_sort_key(row, params.sort) for row in ordered]
+        if params.desc:
+            end = bisect.bisect_left(keys, _cursor_key(params.cursor)) if params.cursor else len(ordered)
+            window = ordered[max(0, end - params.limit - 1):end][::-1]
+        else:
+            start = bisect.bisect_right(keys, _cursor_key(params.cursor)) if params.cursor else 0
+            window = ordered[start:start + params.limit + 1]
+    except TypeError:
+        raise ValueError(f"Valeurs de '{params.sort}' non comparables")
+    return page_response(window, params)
+
+def _after_cursor(params: ListParams) -> List[Dict[str, Any]]:
+    """Clauses any_of des lignes après le curseur, dans l'ordre de Postgres (NULLS LAST en
+    croissant, NULLS FIRST en décroissant, comme _sort_key) ; un NULL n'est jamais comparé"""
+    value, row_id = params.cursor
+    column = params.sort
+    op = 'lt' if params.desc else 'gt'
+    if value is None:
+        # Curseur sur une ligne NULL : reste des NULL, puis (en décroissant) toutes les valeurs
+        clauses = [{column: None, 'id': (op, row_id)}]
+        if params.desc:
+            clauses.append({column: ('neq', None)})
+    else:
+        clauses = [{column: (op, value)}, {column: value, 'id': (op, row_id)}]
+        if not params.desc:
+            clauses.append({column: None})
+    return clauses
+
+def _filter_value(value: Optional[str]) -> Any:
+    """Filtre d'égalité : 'true'/'false' comparés comme booléens (colonnes built, is_locked)"""
+    if value is not None and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    return value
+
+def paginate_query(backend, table: str, params: ListParams, spec: ListSpec) -> Dict[str, Any]:
+    """Pagination keyset côté base, via le moteur de stockage (Supabase ou SQLite)"""
+    filters = {column: _filter_value(value) for column, value in params.filters.items()}
+    if params.search:
+        filters[spec.search] = ('ilike', f'%{params.search}%')
+    rows = backend.select(
+        table, params.columns(), filters or None,
+        any_of=_after_cursor(params) if params.cursor else None,
+        order=params.sort if params.sort == 'id' else f'{params.sort},id', desc=params.desc, limit=params.limit + 1
+    )
+    return page_response(rows, params)
@@ -0,0 +1,187 @@
+"""
+Limitation de débit du panel web : compteur à fenêtre glissante (deux fenêtres fixes
+pondérées) par clé et par route, mémoire constante par clé et éviction des clés inactives
+"""
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+class RateLimit:
+    """Limite « N requêtes par fenêtre de W secondes »"""
+
+    def __init__(self, limit: int, window: float):
+        if limit < 1 or window <= 0:
+            raise ValueError(f"Limite invalide: {limit}/{window}")
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def parse(cls, spec: str) -> 'RateLimit':
+        """'100/60' -> 100 requêtes par 60 secondes"""
+        try:
+            limit, window = spec.split('/')
+            return cls(int(limit), float(window))
+        except ValueError as e:
+            raise ValueError(f"Limite invalide '{spec}' (format attendu: requêtes/secondes)") from e
+
+    def __str__(self):
+        return f"{self.limit}/{self.window:g}"
+
+def parse_route_limits(spec: str) -> Dict[str, RateLimit]:
+    """'api_backup=2/300,api_give=20/60' -> {endpoint: RateLimit}"""
+    routes = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        route, _, limit = item.partition('=')
+        routes[route.strip()] = RateLimit.parse(limit.strip())
+    return routes
+
+class Decision:
+    """Résultat d'une vérification (utilisé pour la réponse 429 et les en-têtes X-RateLimit-*)"""
+
+    def __init__(self, allowed: bool, limit: RateLimit, used: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.used = used
+        self.retry_after = retry_after
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit.limit - math.ceil(self.used))
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            'X-RateLimit-Limit': str(self.limit.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Window': f"{self.limit.window:g}"
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'limit': self.limit.limit,
+            'window_seconds': self.limit.window,
+            'used': round(self.used, 2),
+            'remaining': self.remaining,
+            'retry_after': round(self.retry_after, 2) if not self.allowed else 0
+        }
+
+class SlidingWindowLimiter:
+    """Fenêtre glissante approchée : compte de la fenêtre courante + compte de la précédente
+    pondéré par la part de celle-ci encore couverte. Trois nombres par (route, clé), quel que
+    soit le débit, au lieu d'une liste d'horodatages.
+
+    Les routes sans limite propre partagent le compteur 'default'.
+    """
+
+    def __init__(self, default: RateLimit, routes: Optional[Dict[str, RateLimit]] = None,
+                 sweep_interval: float = 60):
+        self.default = default
+        self.routes = dict(routes or {})
+        self.sweep_interval = sweep_interval
+        # (groupe, clé) -> [indice de fenêtre, compte courant, compte précédent]
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.allowed = 0
+        self.denied = 0
+        self.evicted = 0
+
+    def _group(self, route: Optional[str]) -> Tuple[str, RateLimit]:
+        if route in self.routes:
+            return route, self.routes[route]
+        return 'default', self.default
+
+    @staticmethod
+    def _roll(bucket: List[float], index: int):
+        # Faire glisser le compteur jusqu'à la fenêtre courante
+        if bucket[0] == index - 1:
+            bucket[2] = bucket[1]
+        elif bucket[0] != index:
+            bucket[2] = 0
+        if bucket[0] != index:
+            bucket[0], bucket[1] = index, 0
+
+    @staticmethod
+    def _estimate(bucket: List[float], limit: RateLimit, now: float) -> Tuple[float, float]:
+        elapsed = now - bucket[0] * limit.window
+        weight = 1 - elapsed / limit.window
+        return bucket[2] * weight + bucket[1], elapsed
+
+    @staticmethod
+    def _retry_after(bucket: List[float], limit: RateLimit, elapsed: float) -> float:
+        # Délai avant qu'une requête de plus passe sous la limite
+        room = limit.limit - 1 - bucket[1]
+        if room < 0 or not bucket[2]:
+            return limit.window - elapsed
+        needed = (1 - room / bucket[2]) * limit.window
+        return max(0.0, needed - elapsed)
+
+    def hit(self, key: str, route: Optional[str] = None, now: Optional[float] = None) -> Decision:
+        """Compter une requête si elle est autorisée"""
+        now = time.time() if now is None else now
+        group, limit = self._group(route)
+        index = int(now // limit.window)
+        with self._lock:
+            self._maybe_sweep(now)
+            bucket = self._buckets.get((group, key))
+            if bucket is None:
+                bucket = self._buckets[(group, key)] = [index, 0, 0]
+            self._roll(bucket, index)
+            used, elapsed = self._estimate(bucket, limit, now)
+            if used + 1 > limit.limit:
+                self.denied += 1
+                return Decision(False, limit, used, self._retry_after(bucket, limit, elapsed))
+            bucket[1] += 1
+            self.allowed += 1
+            return Decision(True, limit, used + 1, 0.0)
+
+    def peek(self, key: str, route: Optional[str] = None, now: Optional[float] = None) -> Decision:
+        """État d'une clé sans compter de requête"""
+        now = time.time() if now is None else now
+        group, limit = self._group(route)
+        index = int(now // limit.window)
+        with self._lock:
+            bucket = list(self._buckets.get((group, key), [index, 0, 0]))
+        self._roll(bucket, index)
+        used, elapsed = self._estimate(bucket, limit, now)
+        allowed = used + 1 <= limit.limit
+        return Decision(allowed, limit, used, 0.0 if allowed else self._retry_after(bucket, limit, elapsed))
+
+    def _maybe_sweep(self, now: float):
+        # Appelé sous le verrou : une clé sans requête depuis deux fenêtres n'a plus de poids
+        monotonic = time.monotonic()
+        if monotonic - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = monotonic
+        idle = []
+        for (group, key), bucket in self._buckets.items():
+            limit = self.routes.get(group, self.default)
+            if bucket[0] < int(now // limit.window) - 1:
+                idle.append((group, key))
+        for bucket_key in idle:
+            del self._buckets[bucket_key]
+        self.evicted += len(idle)
+
+    def status(self, key: str) -> Dict[str, Any]:
+        """État d'une clé pour le compteur par défaut et chaque route configurée"""
+        return {
+            'default': self.peek(key).to_dict(),
+            'routes': {route: self.peek(key, route).to_dict() for route in self.routes}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = len(self._buckets)
+        return {
+            'default': str(self.default),
+            'routes': {route: str(limit) for route, limit in self.routes.items()},
+            'tracked_keys': keys,
+            'allowed': self.allowed,
+            'denied': self.denied,
+            'evicted': self.evicted
+        }
@@ -0,0 +1,106 @@
+"""
+Instantané partagé du monde pour le panel : une seule relecture de la base pour tous les
+onglets, sockets et endpoints REST
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Tables de l'instantané : (nom, colonne de tri, limite) ; les tables limitées sont une fenêtre glissante
+SNAPSHOT_TABLES = [
+    ('countries', None, None),
+    ('players', None, None),
+    ('wars', None, None),
+    ('events', 'created_at', 50),
+    ('elements', 'created_at', 50),
+]
+
+class WorldSnapshot:
+    """Copie en mémoire des tables du panel, relue au-delà de max_age secondes ou après invalidation.
+
+    Les lignes retournées sont partagées entre les requêtes : elles ne doivent pas être modifiées.
+    """
+
+    def __init__(self, fetch: Callable[[str, Optional[str], Optional[int]], List[Dict[str, Any]]],
+                 tables=SNAPSHOT_TABLES, max_age: float = 5):
+        self.fetch = fetch
+        self.tables = tables
+        self.max_age = max_age
+        self._data: Dict[str, List[Dict[str, Any]]] = {name: [] for name, _, _ in tables}
+        self._loaded_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+        # Appelés avec les données après chaque relecture (ex. flux de changements)
+        self._listeners: List[Callable[[Dict[str, List[Dict[str, Any]]]], None]] = []
+        self.refreshes = 0
+        self.hits = 0
+        self.last_refresh_ms = 0.0
+        self.total_refresh_ms = 0.0
+        self.max_refresh_ms = 0.0
+        self.errors = 0
+
+    def subscribe(self, listener: Callable[[Dict[str, List[Dict[str, Any]]]], None]):
+        self._listeners.append(listener)
+
+    def invalidate(self):
+        """Forcer une relecture à la prochaine lecture (après une écriture)"""
+        self._dirty = True
+
+    def is_stale(self) -> bool:
+        return self._dirty or time.time() - self._loaded_at > self.max_age
+
+    def get(self, force: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        """Tables de l'instantané, relues si nécessaire (une seule relecture à la fois)"""
+        # Un rafraîchissement forcé reste borné : plusieurs admins qui cliquent ensemble partagent une relecture
+        force = force and time.time() - self._loaded_at >= 1
+        if not force and not self.is_stale():
+            self.hits += 1
+            return self._data
+        with self._lock:
+            # Un autre thread a pu rafraîchir pendant l'attente du verrou
+            if not force and not self.is_stale():
+                self.hits += 1
+                return self._data
+            self._refresh()
+            return self._data
+
+    def table(self, name: str) -> List[Dict[str, Any]]:
+        return self.get().get(name, [])
+
+    def _refresh(self):
+        started = time.perf_counter()
+        self._dirty = False
+        data = {}
+        for name, order, limit in self.tables:
+            try:
+                data[name] = self.fetch(name, order, limit)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Erreur instantané ({name}): {e}")
+                data[name] = self._data.get(name, [])
+        self._data = data
+        self._loaded_at = time.time()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.refreshes += 1
+        self.last_refresh_ms = elapsed_ms
+        self.total_refresh_ms += elapsed_ms
+        self.max_refresh_ms = max(self.max_refresh_ms, elapsed_ms)
+        for listener in self._listeners:
+            try:
+                listener(data)
+            except Exception as e:
+                print(f"❌ Erreur abonné instantané: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_age_seconds': self.max_age,
+            'age_seconds': round(time.time() - self._loaded_at, 2) if self._loaded_at else None,
+            'stale': self.is_stale(),
+            'refreshes': self.refreshes,
+            'hits': self.hits,
+            'errors': self.errors,
+            'last_refresh_ms': round(self.last_refresh_ms, 2),
+            'avg_refresh_ms': round(self.total_refresh_ms / self.refreshes, 2) if self.refreshes else 0.0,
+            'max_refresh_ms': round(self.max_refresh_ms, 2),
+            'rows': {name: len(rows) for name, rows in self._data.items()}
+        }
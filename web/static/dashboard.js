@@ -3,19 +3,23 @@ let rolesChart, economyChart, statisticsChart;
 let currentData = { countries: [], players: [], wars: [], events: [] };
 let lastUpdateTime = 0;
 let updateInProgress = false;
-const CACHE_DURATION = 60000; // 1 minute de cache
 const MIN_UPDATE_INTERVAL = 10000; // Minimum 10 secondes entre les mises à jour
+// Version du flux de changements : le serveur n'envoie que les lignes modifiées depuis
+let feedVersion = null;
+let feedEpoch = null;
+// Tables en fenêtre glissante (50 plus récentes), triées par date décroissante
+const WINDOWED_TABLES = { events: 50, elements: 50 };
 
-// Socket.IO (CONFIGURATION STRICTE POUR RENDER)
+// Socket.IO : poignée de main en polling puis passage en WebSocket (repli polling si bloqué)
 const socket = io({
-  transports: ['polling'], // Force uniquement le polling
+  transports: ['polling', 'websocket'],
   timeout: 30000,
   reconnection: true,
   reconnectionDelay: 2000,
   reconnectionAttempts: 3,
   maxReconnectionAttempts: 3,
   forceNew: true, // Force une nouvelle connexion
-  upgrade: false // Désactive complètement les websockets
+  upgrade: true
 });
 
 socket.on('connect', () => {
@@ -54,8 +58,10 @@ socket.on('reconnect_failed', () => {
 });
 
 socket.on('data_update', (data) => {
-  console.log('📊 Données mises à jour via Socket.IO');
+  console.log('📊 Instantané complet reçu via Socket.IO');
   currentData = data || {};
+  feedVersion = currentData.version ?? null;
+  feedEpoch = currentData.epoch ?? null;
   lastUpdateTime = Date.now();
   updateInProgress = false;
   
@@ -66,6 +72,41 @@ socket.on('data_update', (data) => {
   }
 });
 
+socket.on('data_delta', (delta) => {
+  lastUpdateTime = Date.now();
+  updateInProgress = false;
+  if (!delta || delta.from_version !== feedVersion) {
+    // Delta hors séquence : redemander un instantané complet
+    feedVersion = null;
+    requestUpdate(true);
+    return;
+  }
+  feedVersion = delta.version;
+  if (delta.statistics) currentData.statistics = delta.statistics;
+  const tables = Object.keys(delta.changes || {});
+  if (!tables.length) return;
+  console.log('📊 Changements reçus via Socket.IO:', tables.join(', '));
+  tables.forEach(table => applyTableChanges(table, delta.changes[table]));
+  
+  try { 
+    updateDashboard(); 
+  } catch (e) { 
+    console.error('ERREUR mise à jour dashboard:', e);
+  }
+});
+
+function applyTableChanges(table, change) {
+  const rows = new Map((currentData[table] || []).map(r => [String(r.id), r]));
+  (change.deletes || []).forEach(id => rows.delete(String(id)));
+  (change.upserts || []).forEach(r => rows.set(String(r.id), r));
+  let list = Array.from(rows.values());
+  if (WINDOWED_TABLES[table]) {
+    list.sort((a, b) => String(b.created_at || '').localeCompare(String(a.created_at || '')));
+    list = list.slice(0, WINDOWED_TABLES[table]);
+  }
+  currentData[table] = list;
+}
+
 socket.on('error', (error) => {
   console.error('❌ Erreur Socket.IO:', error);
   showAlert('danger', `Erreur Socket.IO: ${error.message || error}`);
@@ -93,18 +134,12 @@ function requestUpdate(force = false) {
     return;
   }
   
-  // Vérifier le cache
-  if (!force && (now - lastUpdateTime) < CACHE_DURATION && Object.keys(currentData).length > 0) {
-    console.log('📋 Utilisation du cache (données récentes)');
-    updateDashboard();
-    return;
-  }
-  
   updateInProgress = true;
   console.log('🔄 Demande de mise à jour des données...');
   
   if (socket.connected) {
-    socket.emit('request_update');
+    // Sans version connue, le serveur renvoie un instantané complet
+    socket.emit('request_update', { version: feedVersion, epoch: feedEpoch, force: force === true });
   } else {
     console.log('📡 Socket.IO déconnecté, utilisation du fallback REST');
     restBootstrap();
@@ -118,12 +153,15 @@ function restBootstrap(){
     fetch('/api/players').then(r=>r.json()).catch(()=>[]),
     fetch('/api/wars').then(r=>r.json()).catch(()=>[]),
     fetch('/api/events').then(r=>r.json()).catch(()=>[]),
-  ]).then(([countries, players, wars, events])=>{
+    fetch('/api/statistics').then(r=>r.json()).catch(()=>null),
+  ]).then(([countries, players, wars, events, statistics])=>{
+    feedVersion = null;
     currentData = {
       countries: Array.isArray(countries)?countries:(countries.data||[]),
       players: Array.isArray(players)?players:(players.data||[]),
       wars: Array.isArray(wars)?wars:(wars.data||[]),
       events: Array.isArray(events)?events:(events.data||[]),
+      statistics: statistics && !statistics.error ? statistics : null,
     };
     updateDashboard();
   }).catch(()=>{
@@ -153,7 +191,7 @@ document.addEventListener('click', (e)=>{
 
 // Bouton refresh
 document.addEventListener('DOMContentLoaded', ()=>{
-  document.getElementById('refresh-btn')?.addEventListener('click', requestUpdate);
+  document.getElementById('refresh-btn')?.addEventListener('click', () => requestUpdate(true));
 });
 
 // MAJ Dashboard (AMÉLIORÉE)
@@ -166,13 +204,12 @@ function updateDashboard(){
   }
   
   try {
-    // Mise à jour des compteurs
-    document.getElementById('countries-count')?.replaceChildren(document.createTextNode(currentData.countries.length));
-    document.getElementById('players-count')?.replaceChildren(document.createTextNode(currentData.players.length));
-    const wars = (currentData.wars||[]).filter(w=>!w.ended_at).length;
-    document.getElementById('wars-count')?.replaceChildren(document.createTextNode(wars));
-    const totalEconomy = currentData.countries.reduce((s,c)=>s+(c.economy||0),0);
-    document.getElementById('total-economy')?.replaceChildren(document.createTextNode(formatNumber(totalEconomy)));
+    // Mise à jour des compteurs (agrégats calculés par le serveur)
+    const stats = currentStatistics();
+    document.getElementById('countries-count')?.replaceChildren(document.createTextNode(stats.countries_count));
+    document.getElementById('players-count')?.replaceChildren(document.createTextNode(stats.players_count));
+    document.getElementById('wars-count')?.replaceChildren(document.createTextNode(stats.active_wars));
+    document.getElementById('total-economy')?.replaceChildren(document.createTextNode(formatNumber(stats.total_economy)));
     
     // Mise à jour des graphiques et tableaux
     updateRolesChart();
@@ -186,14 +223,30 @@ function updateDashboard(){
   }
 }
 
-function updateRolesChart() {
-    if (!currentData.players) return;
-    
-    const roleCounts = {};
-    currentData.players.forEach(player => {
+// Statistiques envoyées par le serveur ; recalcul local seulement sans elles (ancien serveur)
+function currentStatistics() {
+    if (currentData.statistics) return currentData.statistics;
+    const countries = currentData.countries || [];
+    const roles = {};
+    (currentData.players || []).forEach(player => {
         const role = player.role || 'recruit';
-        roleCounts[role] = (roleCounts[role] || 0) + 1;
+        roles[role] = (roles[role] || 0) + 1;
     });
+    return {
+        countries_count: countries.length,
+        players_count: (currentData.players || []).length,
+        active_wars: (currentData.wars || []).filter(w => !w.ended_at).length,
+        total_economy: countries.reduce((s, c) => s + (c.economy || 0), 0),
+        roles: roles,
+        top_economy: [...countries].sort((a, b) => (b.economy || 0) - (a.economy || 0)).slice(0, 5)
+            .map(c => ({ name: c.name, economy: c.economy })),
+        top_military: [...countries].sort((a, b) => (b.army_strength || 0) - (a.army_strength || 0)).slice(0, 5)
+            .map(c => ({ name: c.name, army_strength: c.army_strength }))
+    };
+}
+
+function updateRolesChart() {
+    const roleCounts = currentStatistics().roles || {};
     
     const ctx = document.getElementById('rolesChart').getContext('2d');
     if (rolesChart) rolesChart.destroy();
@@ -223,11 +276,7 @@ function updateRolesChart() {
 }
 
 function updateEconomyChart() {
-    if (!currentData.countries) return;
-    
-    const topCountries = currentData.countries
-        .sort((a, b) => (b.economy || 0) - (a.economy || 0))
-        .slice(0, 5);
+    const topCountries = currentStatistics().top_economy || [];
     
     const ctx = document.getElementById('economyChart').getContext('2d');
     if (economyChart) economyChart.destroy();
@@ -280,12 +329,110 @@ function updateTables() {
     updateEventsTable();
 }
 
+// Tables paginées : seules la page visible et ses colonnes sont demandées au serveur (curseur keyset)
+const PAGE_SIZE = 50;
+const PAGED_TABLES = {
+  countries: { endpoint: '/api/countries', fields: 'name,leader_id,population,economy,army_strength,stability,is_locked', sort: 'name', render: renderCountriesRows },
+  players: { endpoint: '/api/players', fields: 'username,country_id,role,balance,created_at', sort: 'username', render: renderPlayersRows },
+  wars: { endpoint: '/api/wars', fields: 'attacker_id,defender_id,started_at,ended_at', sort: 'started_at', order: 'desc', render: renderWarsRows },
+};
+// Par table : curseurs des pages déjà vues, page courante, curseur suivant, lignes affichées
+const pageState = {};
+
+function getPageState(name) {
+  if (!pageState[name]) pageState[name] = { cursors: [null], index: 0, next: null, rows: [], q: '', dirty: true };
+  return pageState[name];
+}
+
+function isSectionVisible(name) {
+  const section = document.getElementById(name);
+  return !!section && section.style.display !== 'none';
+}
+
+function loadTablePage(name, move = 0) {
+  const config = PAGED_TABLES[name];
+  const state = getPageState(name);
+  if (move > 0 && !state.next) return;
+  if (move < 0 && state.index === 0) return;
+  if (move > 0) {
+    state.cursors[state.index + 1] = state.next;
+    state.index += 1;
+  } else if (move < 0) {
+    state.index -= 1;
+  }
+  // Section masquée : recharger à l'affichage seulement
+  if (!isSectionVisible(name)) {
+    state.dirty = true;
+    return;
+  }
+  state.dirty = false;
+  const params = new URLSearchParams({ limit: PAGE_SIZE, fields: config.fields, sort: config.sort });
+  if (config.order) params.set('order', config.order);
+  if (state.q) params.set('q', state.q);
+  const cursor = state.cursors[state.index];
+  if (cursor) params.set('cursor', cursor);
+  
+  fetch(`${config.endpoint}?${params}`)
+    .then(r => r.json())
+    .then(page => {
+      if (page.error) throw new Error(page.error);
+      state.rows = page.data || [];
+      state.next = page.next_cursor || null;
+      const tbody = document.getElementById(`${name}-table`);
+      if (tbody) tbody.innerHTML = config.render(state.rows);
+      updatePager(name);
+    })
+    .catch(err => console.error(`❌ Erreur chargement page ${name}:`, err));
+}
+
+function updatePager(name) {
+  const pager = document.getElementById(`${name}-pager`);
+  if (!pager) return;
+  const state = getPageState(name);
+  pager.querySelector('[data-page="prev"]').disabled = state.index === 0;
+  pager.querySelector('[data-page="next"]').disabled = !state.next;
+  pager.querySelector('[data-page-label]').textContent = `Page ${state.index + 1}`;
+}
+
+function resetTablePage(name) {
+  Object.assign(getPageState(name), { cursors: [null], index: 0, next: null });
+  loadTablePage(name);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  Object.keys(PAGED_TABLES).forEach(name => {
+    const pager = document.getElementById(`${name}-pager`);
+    pager?.querySelector('[data-page="prev"]')?.addEventListener('click', () => loadTablePage(name, -1));
+    pager?.querySelector('[data-page="next"]')?.addEventListener('click', () => loadTablePage(name, 1));
+    let searchTimer;
+    document.getElementById(`${name}-search`)?.addEventListener('input', (e) => {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(() => {
+        getPageState(name).q = e.target.value.trim();
+        resetTablePage(name);
+      }, 300);
+    });
+  });
+});
+
+// Affichage d'une section : charger sa page si des données ont changé entre-temps
+document.addEventListener('click', (e) => {
+  const btn = e.target.closest('.nav-link[data-section]');
+  const name = btn?.getAttribute('data-section');
+  if (name && PAGED_TABLES[name] && getPageState(name).dirty) loadTablePage(name);
+});
+
+// Ligne complète (flux Socket.IO) ou, à défaut, ligne projetée de la page affichée
+function findRow(table, id) {
+  return (currentData[table] || []).find(r => r.id === id) || (pageState[table]?.rows || []).find(r => r.id === id);
+}
+
 function updateCountriesTable() {
-    const tbody = document.getElementById('countries-table');
-    if (!currentData.countries) return;
-    
-    tbody.innerHTML = currentData.countries.map(country => {
-        const resources = country.resources || {};
+    loadTablePage('countries');
+}
+
+function renderCountriesRows(countries) {
+    return countries.map(country => {
         const leader = currentData.players ? currentData.players.find(p => p.id === country.leader_id) : null;
         
         return `
@@ -315,10 +462,11 @@ function updateCountriesTable() {
 }
 
 function updatePlayersTable() {
-    const tbody = document.getElementById('players-table');
-    if (!currentData.players) return;
-    
-    tbody.innerHTML = currentData.players.map(player => {
+    loadTablePage('players');
+}
+
+function renderPlayersRows(players) {
+    return players.map(player => {
         const country = currentData.countries ? currentData.countries.find(c => c.id === player.country_id) : null;
         
         return `
@@ -327,7 +475,7 @@ function updatePlayersTable() {
                 <td>${country ? country.name : 'Aucun pays'}</td>
                 <td><span class="badge bg-primary">${player.role || 'recruit'}</span></td>
                 <td>${formatNumber(player.balance || 0)} 💵</td>
-                <td>${formatDate(player.joined_at)}</td>
+                <td>${formatDate(player.created_at)}</td>
                 <td>
                     <button class="btn btn-sm btn-warning" onclick="editPlayer('${player.id}')">
                         <i class="fas fa-edit"></i>
@@ -342,10 +490,11 @@ function updatePlayersTable() {
 }
 
 function updateWarsTable() {
-    const tbody = document.getElementById('wars-table');
-    if (!currentData.wars) return;
-    
-    tbody.innerHTML = currentData.wars.map(war => {
+    loadTablePage('wars');
+}
+
+function renderWarsRows(wars) {
+    return wars.map(war => {
         const attacker = currentData.countries ? currentData.countries.find(c => c.id === war.attacker_id) : null;
         const defender = currentData.countries ? currentData.countries.find(c => c.id === war.defender_id) : null;
         const status = war.ended_at ? 'Terminée' : 'Active';
@@ -549,12 +698,12 @@ document.addEventListener('DOMContentLoaded', ()=>{
   document.getElementById('btn-filter-tx')?.addEventListener('click', loadTransactions);
   document.getElementById('btn-export-tx')?.addEventListener('click', exportTransactions);
   
-  // Auto-refresh optimisé (toutes les 2 minutes au lieu de 30s)
+  // Auto-refresh (toutes les 2 minutes) : seules les lignes modifiées transitent
   setInterval(() => {
     if (socket.connected) {
-      requestUpdate(); // Utilise le cache intelligent
+      requestUpdate();
     }
-  }, 120000); // 2 minutes au lieu de 30 secondes
+  }, 120000);
 });
 
 // ==================== COUNTRIES ====================
@@ -614,7 +763,7 @@ function createCountry() {
 }
 
 function editCountry(countryId) {
-    const country = currentData.countries.find(c => c.id === countryId);
+    const country = findRow('countries', countryId);
     if (!country) return;
     
     document.getElementById('editCountryId').value = country.id;
@@ -705,7 +854,7 @@ function deleteCountry(countryId) {
 // ==================== PLAYERS ====================
 
 function editPlayer(playerId) {
-    const player = currentData.players.find(p => p.id === playerId);
+    const player = findRow('players', playerId);
     if (!player) return;
     
     const newBalance = prompt(`Nouveau solde pour ${player.username}:`, player.balance || 0);
@@ -759,30 +908,11 @@ function deletePlayer(playerId) {
 }
 
 function exportPlayers() {
-    fetch('/api/players/export')
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            // Créer un fichier JSON à télécharger
-            const dataStr = JSON.stringify(data.data, null, 2);
-            const dataUri = 'data:application/json;charset=utf-8,'+ encodeURIComponent(dataStr);
-            
-            const exportFileDefaultName = `players_${new Date().toISOString().split('T')[0]}.json`;
-            
-            const linkElement = document.createElement('a');
-            linkElement.setAttribute('href', dataUri);
-            linkElement.setAttribute('download', exportFileDefaultName);
-            linkElement.click();
-            
-            showAlert('success', 'Joueurs exportés avec succès');
-        } else {
-            showAlert('danger', 'Erreur lors de l\'export');
-        }
-    })
-    .catch(error => {
-        console.error('Error:', error);
-        showAlert('danger', 'Erreur de connexion');
-    });
+    // Téléchargement direct : le serveur envoie le fichier en flux, rien n'est gardé en mémoire
+    const link = document.createElement('a');
+    link.setAttribute('href', '/api/players/export?format=csv');
+    link.click();
+    showAlert('success', 'Export des joueurs lancé');
 }
 
 // ==================== WARS ====================
@@ -889,19 +1019,16 @@ function triggerRandomEvent() {
 function generateReport() {
     showAlert('info', 'Génération du rapport...');
     
+    const stats = currentStatistics();
     const reportData = {
         date: new Date().toISOString(),
-        countries: currentData.countries.length,
-        players: currentData.players.length,
-        activeWars: currentData.wars.filter(w => !w.ended_at).length,
-        topEconomy: currentData.countries
-            .sort((a, b) => (b.economy || 0) - (a.economy || 0))
-            .slice(0, 5)
-            .map(c => ({ name: c.name, economy: c.economy })),
-        topMilitary: currentData.countries
-            .sort((a, b) => (b.army_strength || 0) - (a.army_strength || 0))
-            .slice(0, 5)
-            .map(c => ({ name: c.name, army_strength: c.army_strength }))
+        countries: stats.countries_count,
+        players: stats.players_count,
+        activeWars: stats.active_wars,
+        topEconomy: stats.top_economy,
+        topMilitary: stats.top_military,
+        roles: stats.roles,
+        resourcesTotal: stats.resources_total
     };
     
     const dataStr = JSON.stringify(reportData, null, 2);
@@ -962,23 +1089,15 @@ function resetAllStats() {
 }
 
 function backupDatabase() {
-    showAlert('info', 'Sauvegarde en cours...');
-    
-    fetch('/api/tools/backup', {
-        method: 'POST'
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            showAlert('success', `Sauvegarde créée: ${data.file}`);
-        } else {
-            showAlert('danger', 'Erreur lors de la sauvegarde');
-        }
-    })
-    .catch(error => {
-        console.error('Error:', error);
-        showAlert('danger', 'Erreur de connexion');
-    });
+    // Formulaire POST : la sauvegarde (NDJSON gzip) est téléchargée en flux par le navigateur
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/api/tools/backup';
+    form.style.display = 'none';
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+    showAlert('info', 'Sauvegarde en cours de téléchargement...');
 }
 
 function promoteAllCitizens() {
@@ -1137,23 +1256,15 @@ function resetAllStats() {
 }
 
 function backupDatabase() {
-    showAlert('info', 'Sauvegarde en cours...');
-    
-    fetch('/api/tools/backup', {
-        method: 'POST'
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.success) {
-            showAlert('success', 'Sauvegarde créée avec succès');
-        } else {
-            showAlert('danger', 'Erreur lors de la sauvegarde');
-        }
-    })
-    .catch(error => {
-        console.error('Error:', error);
-        showAlert('danger', 'Erreur de connexion');
-    });
+    // Formulaire POST : la sauvegarde (NDJSON gzip) est téléchargée en flux par le navigateur
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/api/tools/backup';
+    form.style.display = 'none';
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+    showAlert('info', 'Sauvegarde en cours de téléchargement...');
 }
 
 function promoteAllCitizens() {
@@ -0,0 +1,116 @@
+"""
+Statistiques matérialisées du panel : compteurs, classements, répartition des rôles et totaux
+de ressources tenus à jour ligne par ligne à partir du flux de changements
+"""
+import heapq
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+TOP_SIZE = 5
+DEFAULT_ROLE = 'recruit'
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _clean(value: float):
+    # Entiers affichés sans décimale (les colonnes sont entières pour la plupart)
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+class WorldStatistics:
+    """Agrégats du monde mis à jour en O(1) par ligne modifiée (abonné de ChangeFeed).
+
+    Seuls les classements sont recalculés, et seulement si un pays classable a changé ;
+    la réponse est ensuite servie telle quelle jusqu'au changement suivant.
+    """
+
+    def __init__(self, top_size: int = TOP_SIZE):
+        self.top_size = top_size
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._active_wars = 0
+        self._roles = Counter()
+        self._resources = Counter()
+        self._totals = Counter()
+        # id -> (nom, économie, armée) pour les classements
+        self._countries: Dict[str, tuple] = {}
+        self._rankings = {'top_economy': [], 'top_military': []}
+        self._rankings_dirty = False
+        self._cached: Optional[Dict[str, Any]] = None
+        self.version = 0
+        self.updated_at: Optional[float] = None
+
+    def apply(self, table: str, key: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """Retirer la contribution de l'ancienne ligne puis ajouter celle de la nouvelle"""
+        handler = getattr(self, f'_apply_{table}', None)
+        if handler is None:
+            return
+        with self._lock:
+            if old is not None:
+                handler(key, old, -1)
+            if new is not None:
+                handler(key, new, 1)
+            self.version += 1
+            self.updated_at = time.time()
+            self._cached = None
+
+    def _apply_countries(self, key: str, row: Dict[str, Any], sign: int):
+        self._counts['countries'] += sign
+        for column in ('economy', 'population', 'army_strength'):
+            self._totals[column] += sign * _number(row.get(column))
+        resources = row.get('resources')
+        if isinstance(resources, dict):
+            for resource, amount in resources.items():
+                self._resources[resource] += sign * _number(amount)
+        if sign > 0:
+            self._countries[key] = (row.get('name'), _number(row.get('economy')), _number(row.get('army_strength')))
+        else:
+            self._countries.pop(key, None)
+        self._rankings_dirty = True
+
+    def _apply_players(self, key: str, row: Dict[str, Any], sign: int):
+        self._counts['players'] += sign
+        self._roles[row.get('role') or DEFAULT_ROLE] += sign
+        self._totals['balance'] += sign * _number(row.get('balance'))
+
+    def _apply_wars(self, key: str, row: Dict[str, Any], sign: int):
+        self._counts['wars'] += sign
+        if not row.get('ended_at'):
+            self._active_wars += sign
+
+    def _rank(self):
+        countries = self._countries.values()
+        self._rankings = {
+            'top_economy': [{'name': name, 'economy': _clean(economy)}
+                            for name, economy, _ in heapq.nlargest(self.top_size, countries, key=lambda c: c[1])],
+            'top_military': [{'name': name, 'army_strength': _clean(army)}
+                             for name, _, army in heapq.nlargest(self.top_size, countries, key=lambda c: c[2])]
+        }
+        self._rankings_dirty = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Statistiques courantes (même objet tant que rien n'a changé : ne pas le modifier)"""
+        with self._lock:
+            if self._cached is None:
+                if self._rankings_dirty:
+                    self._rank()
+                self._cached = {
+                    'countries_count': self._counts['countries'],
+                    'players_count': self._counts['players'],
+                    'wars_count': self._counts['wars'],
+                    'active_wars': self._active_wars,
+                    **self._rankings,
+                    'roles': {role: count for role, count in self._roles.items() if count > 0},
+                    'resources_total': {name: _clean(total) for name, total in self._resources.items()},
+                    'total_economy': _clean(self._totals['economy']),
+                    'total_population': _clean(self._totals['population']),
+                    'total_army_strength': _clean(self._totals['army_strength']),
+                    'total_balance': _clean(self._totals['balance']),
+                    'version': self.version,
+                    'updated_at': self.updated_at
+                }
+            return self._cached
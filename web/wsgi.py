@@ -0,0 +1,19 @@
+"""
+Point d'entrée WSGI du panel web pour gunicorn (un seul worker : Socket.IO garde l'état
+des sessions en mémoire).
+
+    gunicorn -w 1 -k gthread --threads 100 web.wsgi:app                       (PANEL_ASYNC_MODE=threading)
+    PANEL_ASYNC_MODE=eventlet gunicorn -w 1 -k eventlet web.wsgi:app         (pip install eventlet)
+"""
+import os
+
+# Le monkey-patching doit précéder tout autre import (sockets, threads)
+_async_mode = os.getenv('PANEL_ASYNC_MODE', 'threading')
+if _async_mode == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif _async_mode == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from web.app import app, socketio  # noqa: E402